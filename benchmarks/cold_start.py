@@ -0,0 +1,195 @@
+"""Measure the cold start of the lambda: how long importing the handler module takes, and how long
+the first invocation of each route takes in a fresh process. Fails if either is over budget.
+
+USAGE:
+python -m benchmarks.cold_start [--repeat 5] [--budget-scale 1.0]
+
+Each measurement runs in its own python process, against a temporary sqlite database. POST routes
+find their song in a pre-filled song cache and compute sunlight locally, so no route touches the
+network, and their announcements go to a local sns stand-in.
+
+The budgets are generous multiples of the times measured when lazy imports were introduced. Use
+--budget-scale to loosen them on slow machines.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, TYPE_CHECKING, cast
+
+if TYPE_CHECKING:
+    from listens.definitions import ListenInput
+
+# milliseconds. 'import' is the import of the handler module, the rest are first invocations.
+BUDGETS_MS = {
+    'import': 150,
+    'GET /listens/{id}': 400,
+    'GET /listens': 400,
+    'POST /listens': 1000,
+    'POST /listens/batch': 1000
+}
+
+SONG_ID = '4rNGLh1y5Kkvr4bT28yfHU'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-scale', type=float, default=1.0)
+    parser.add_argument('--route', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.route:
+        # running as a measured child process.
+        print(json.dumps(measure_route(args.route)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        environ = prepare_environment(directory)
+        results = {
+            route: [run_child(route, environ) for _ in range(args.repeat)]
+            for route in BUDGETS_MS if route != 'import'
+        }
+
+    import_ms = statistics.median(
+        result['import_ms'] for route_results in results.values() for result in route_results
+    )
+    medians_ms = {'import': import_ms}
+    for route, route_results in results.items():
+        medians_ms[route] = statistics.median(result['invocation_ms'] for result in route_results)
+
+    over_budget = False
+    print(f'{"":<22} {"median (ms)":>12} {"budget (ms)":>12}')
+    for name, median_ms in medians_ms.items():
+        budget_ms = BUDGETS_MS[name] * args.budget_scale
+        over_budget = over_budget or median_ms > budget_ms
+        flag = '  OVER BUDGET' if median_ms > budget_ms else ''
+        print(f'{name:<22} {median_ms:>12.1f} {budget_ms:>12.0f}{flag}')
+
+    if over_budget:
+        sys.exit(1)
+
+
+def prepare_environment(directory: str) -> Dict[str, str]:
+    """Create the database and song cache every child shares, and return the children's
+    environment."""
+    from listens.definitions import MusicProvider
+    from listens.gateways import SqlAlchemyDbGateway, SqliteSongExistenceStore
+
+    iana_timezone = daytime_timezone()
+    database_connection_string = 'sqlite:///' + os.path.join(directory, 'listens.db')
+    db_gateway = SqlAlchemyDbGateway(database_connection_string)
+    db_gateway.persist_schema()
+    db_gateway.add_listen(listen_input_factory(iana_timezone))
+    db_gateway.close_connections()
+
+    song_cache_path = os.path.join(directory, 'song-cache.sqlite3')
+    SqliteSongExistenceStore(song_cache_path).set((SONG_ID, MusicProvider.SPOTIFY), True, 3600)
+
+    return {
+        **os.environ,
+        'AWS_DEFAULT_REGION': os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'),
+        'DATABASE_CONNECTION_STRING': database_connection_string,
+        'SUNLIGHT_SERVICE_API_KEY': 'cold start sunlight service api key',
+        'SPOTIFY_CLIENT_ID': 'cold start spotify client id',
+        'SPOTIFY_CLIENT_SECRET': 'cold start spotify client secret',
+        'LISTEN_ADDED_SNS_TOPIC': 'cold start listen added topic',
+        'SONG_CACHE_PATH': song_cache_path,
+        'SUNLIGHT_ENGINE': 'astronomical',
+        'COLD_START_TIMEZONE': iana_timezone
+    }
+
+
+def run_child(route: str, environ: Dict[str, str]) -> Dict:
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.cold_start', '--route', route],
+        env=environ,
+        stdout=subprocess.PIPE,
+        check=True
+    )
+    return cast(Dict, json.loads(completed.stdout.decode().splitlines()[-1]))
+
+
+def measure_route(route: str) -> Dict:
+    # this module only imports listens within functions, so nothing of the handler's is imported
+    # before it is measured.
+    started_at = time.perf_counter()
+    from listens.delivery.aws_lambda import rest
+    import_ms = (time.perf_counter() - started_at) * 1000
+
+    from unittest.mock import patch
+    from features.fixtures.sns import LocalSnsClient
+    event = build_event(route, os.environ['COLD_START_TIMEZONE'])
+
+    with patch('listens.gateways.sns_notification_gateway._sns_client',
+               return_value=LocalSnsClient()):
+        started_at = time.perf_counter()
+        response = rest.handler(event, {})
+        invocation_ms = (time.perf_counter() - started_at) * 1000
+
+    if response['statusCode'] != 200:
+        raise RuntimeError(f'{route} responded {response["statusCode"]}: {response["body"]}')
+
+    return {'import_ms': import_ms, 'invocation_ms': invocation_ms}
+
+
+def build_event(route: str, iana_timezone: str) -> Dict:
+    raw_listen_input = {
+        'song_id': SONG_ID,
+        'song_provider': 'SPOTIFY',
+        'listener_name': 'cold start',
+        'note': None,
+        'iana_timezone': iana_timezone
+    }
+    method, path = route.split(' ')
+    return {
+        'httpMethod': method,
+        'path': path.replace('{id}', '1'),
+        'pathParameters': {'id': '1'},
+        'queryStringParameters': {'limit': '20'},
+        'body': json.dumps(
+            {'items': [raw_listen_input] * 10} if path.endswith('batch') else raw_listen_input
+        )
+    }
+
+
+def daytime_timezone() -> str:
+    """A timezone in which it is currently day, so that submitted listens are accepted."""
+    from listens.entities import day as day_entity
+    from listens.gateways import AstronomicalSunlightGateway
+    from listens.gateways.astronomical_sunlight_gateway import timezone_coordinates
+
+    now_utc = datetime.utcnow()
+    sunlight_gateway = AstronomicalSunlightGateway()
+    for iana_timezone in sorted(timezone_coordinates()):
+        sunlight_window = sunlight_gateway.fetch_sunlight_window(
+            iana_timezone,
+            day_entity.local_date(now_utc, iana_timezone)
+        )
+        # leave a margin, in case the sun sets while the benchmark runs.
+        if (sunlight_window.sunrise_utc < now_utc
+                and (sunlight_window.sunset_utc - now_utc).total_seconds() > 3600):
+            return iana_timezone
+    raise RuntimeError('The sun isnt up anywhere.')
+
+
+def listen_input_factory(iana_timezone: str) -> 'ListenInput':
+    from listens.definitions import ListenInput, MusicProvider
+
+    return ListenInput(
+        song_id=SONG_ID,
+        song_provider=MusicProvider.SPOTIFY,
+        listener_name='cold start',
+        listen_time_utc=datetime.utcnow(),
+        note=None,
+        iana_timezone=iana_timezone
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Compare reading a page of listens through orm hydration against the core select fast path.
+
+USAGE:
+python -m benchmarks.fetch_listens [--listens 20000] [--repeat 5]
+
+Runs against an in-memory sqlite database, or against TEST_DATABASE_CONNECTION_STRING if set.
+"""
+import argparse
+import os
+import timeit
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, cast
+
+from listens.definitions import Listen, MusicProvider, SortOrder
+from listens.gateways import SqlAlchemyDbGateway
+from listens.gateways.sqlalchemy_db_gateway.models import SqlListen
+
+
+LIMITS = (20, 200, 2000, 20000)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--listens', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_gateway = SqlAlchemyDbGateway(os.environ.get('TEST_DATABASE_CONNECTION_STRING', 'sqlite://'))
+    db_gateway.persist_schema()
+    seed_listens(db_gateway, args.listens)
+
+    print(f'{"limit":>8} {"orm (ms)":>10} {"core (ms)":>10} {"speedup":>8}')
+    for limit in LIMITS:
+        orm_seconds = best_of(lambda: fetch_listens_orm(db_gateway, limit), args.repeat)
+        core_seconds = best_of(
+            lambda: db_gateway.fetch_listens(limit=limit, sort_time=SortOrder.DESCENDING),
+            args.repeat
+        )
+        print(f'{limit:>8} {orm_seconds * 1000:>10.2f} {core_seconds * 1000:>10.2f} '
+              f'{orm_seconds / core_seconds:>7.1f}x')
+
+
+def fetch_listens_orm(db_gateway: SqlAlchemyDbGateway, limit: int) -> List[Listen]:
+    """The orm read path that fetch_listens used before the core fast path."""
+    session = db_gateway.Session()
+    try:
+        query = session.query(SqlListen)
+        query = query.order_by(SqlListen.listen_time_utc.desc(), SqlListen.id.desc())
+        query = query.limit(limit)
+        return [
+            SqlAlchemyDbGateway._pluck_listen(sql_listen)
+            for sql_listen in cast(Iterable[SqlListen], query)
+        ]
+    finally:
+        session.close()
+
+
+def seed_listens(db_gateway: SqlAlchemyDbGateway, count: int) -> None:
+    first_listen_time_utc = datetime(2018, 11, 12, 12)
+    rows = [
+        {
+            'song_id': '4rNGLh1y5Kkvr4bT28yfHU',
+            'song_vendor': MusicProvider.SPOTIFY,
+            'listener_name': f'listener {i % 100}',
+            'listen_time_utc': first_listen_time_utc + timedelta(minutes=i),
+            'note': 'DAP is my friend from college!',
+            'iana_timezone': 'America/New_York'
+        }
+        for i in range(count)
+    ]
+    db_gateway.engine.execute(SqlListen.__table__.insert(), rows)
+
+
+def best_of(func: Callable, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Compare ways of finding the local date of a listen: the lmt offset local_date used to add, pytz
+conversion, zoneinfo conversion and the transition table resolver.
+
+USAGE:
+python -m benchmarks.local_date [--listens 100000] [--repeat 5]
+
+Listen times are spread over 2018, in every timezone listens are commonly submitted from. Each
+approach also reports how many of its dates differ from pytz conversion.
+"""
+import argparse
+import random
+import timeit
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from typing import Callable, Dict, List, Tuple, cast
+
+import pytz
+
+from listens.entities.timezone import local_date
+
+
+IANA_TIMEZONES = [
+    'America/New_York',
+    'America/Chicago',
+    'America/Los_Angeles',
+    'America/Sao_Paulo',
+    'Europe/London',
+    'Europe/Berlin',
+    'Africa/Lagos',
+    'Asia/Kolkata',
+    'Asia/Tokyo',
+    'Australia/Sydney'
+]
+
+ListenTime = Tuple[datetime, str]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--listens', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    listen_times = [
+        (datetime(2018, 1, 1) + timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+         rng.choice(IANA_TIMEZONES))
+        for _ in range(args.listens)
+    ]
+
+    approaches: Dict[str, Callable[[datetime, str], date]] = {
+        'lmt offset (before)': lmt_offset_local_date,
+        'pytz': pytz_local_date,
+        'transition table': local_date
+    }
+    try:
+        import zoneinfo  # noqa: F401
+        approaches['zoneinfo'] = zoneinfo_local_date
+    except ImportError:
+        pass
+
+    expected = run(pytz_local_date, listen_times)
+    print(f'{"":<20} {"ns per listen":>14} {"wrong dates":>12}')
+    for name, approach in approaches.items():
+        seconds = min(timeit.repeat(lambda: run(approach, listen_times), number=1,
+                                    repeat=args.repeat))
+        wrong = sum(1 for got, want in zip(run(approach, listen_times), expected) if got != want)
+        print(f'{name:<20} {seconds / len(listen_times) * 1e9:>14.0f} {wrong:>12}')
+
+
+def run(approach: Callable[[datetime, str], date], listen_times: List[ListenTime]) -> List[date]:
+    return [approach(datetime_utc, iana_timezone) for datetime_utc, iana_timezone in listen_times]
+
+
+def lmt_offset_local_date(datetime_utc: datetime, iana_timezone: str) -> date:
+    """How local_date worked before the transition table resolver."""
+    timezone = pytz.timezone(iana_timezone)
+    return (datetime_utc + timezone._utcoffset).date()  # type: ignore
+
+
+def pytz_local_date(datetime_utc: datetime, iana_timezone: str) -> date:
+    local_dt = pytz.utc.localize(datetime_utc).astimezone(pytz.timezone(iana_timezone))
+    return cast(date, local_dt.date())
+
+
+def zoneinfo_local_date(datetime_utc: datetime, iana_timezone: str) -> date:
+    import zoneinfo
+    zone = zoneinfo.ZoneInfo(iana_timezone)
+    return datetime_utc.replace(tzinfo=dt_timezone.utc).astimezone(zone).date()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""Benchmark the listens service, from its pure functions up to whole lambda invocations, and save
+the results as json so that runs can be compared across commits.
+
+USAGE:
+python -m benchmarks.suite [--output results.json] [--compare baseline.json] [--filter handler]
+                           [--latency-ms 0] [--database sqlite://] [--repeat 5]
+
+Handler benchmarks call the lambda handler with stub upstream gateways, each taking --latency-ms
+per call, and a real database: in-memory sqlite by default, or --database (e.g. a postgres
+connection string, whose listens table is emptied first).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import timeit
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, Iterator, NamedTuple, Optional
+from unittest.mock import patch
+
+from sqlalchemy import select
+from sqlalchemy.engine.url import make_url
+
+from benchmarks.cold_start import SONG_ID, build_event
+from benchmarks.fetch_listens import seed_listens
+
+from listens.context import Context
+from listens.definitions import ListenInput, MusicProvider, SortOrder, SunlightWindow
+from listens.delivery.aws_lambda import rest, util
+from listens.delivery.aws_lambda.util import LambdaConfig
+from listens.entities import day as day_entity, listen as listen_entity
+from listens.gateways import SqlAlchemyDbGateway
+from listens.gateways.sqlalchemy_db_gateway.models import SqlListen
+from listens.gateways.sqlalchemy_db_gateway.sqlalchemy_db_gateway import LISTEN_COLUMNS
+from listens.testing import (
+    ALWAYS_DAY,
+    StubMusicGateway,
+    StubNotificationGateway,
+    StubSunlightGateway
+)
+
+
+SEEDED_LISTENS = 1000
+ROUTES = ('POST /listens', 'POST /listens/batch', 'GET /listens', 'GET /listens/{id}')
+
+Benchmark = Callable[[], object]
+
+
+class Result(NamedTuple):
+    # calls per timed round.
+    iterations: int
+    best_us: float
+    median_us: float
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output', help='save the results to this json file')
+    parser.add_argument('--compare', help='compare the results with this earlier json file')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose names contain it')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--database', default='sqlite://')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_gateway = SqlAlchemyDbGateway(args.database)
+    db_gateway.persist_schema()
+    db_gateway.engine.execute(SqlListen.__table__.delete())
+    seed_listens(db_gateway, SEEDED_LISTENS)
+
+    benchmarks = {
+        **micro_benchmarks(db_gateway),
+        **handler_benchmarks()
+    }
+
+    results: Dict[str, Result] = {}
+    print(f'{"":<40} {"best (us)":>12} {"median (us)":>12}')
+    with serve_context(db_gateway, args.latency_ms / 1000):
+        for name, benchmark in benchmarks.items():
+            if args.filter not in name:
+                continue
+            results[name] = measure(benchmark, args.repeat)
+            print(f'{name:<40} {results[name].best_us:>12.1f} {results[name].median_us:>12.1f}')
+
+    db_gateway.close_connections()
+
+    report = {
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'database': make_url(args.database).get_backend_name(),
+        'latency_ms': args.latency_ms,
+        'results': {name: result._asdict() for name, result in results.items()}
+    }
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(json.load(baseline_file), report)
+
+
+def micro_benchmarks(db_gateway: SqlAlchemyDbGateway) -> Dict[str, Benchmark]:
+    listen_input = listen_input_factory()
+    listen_time_utc = listen_input.listen_time_utc
+    sunlight_window = SunlightWindow(
+        sunrise_utc=datetime(2018, 11, 12, 11, 40, 4),
+        sunset_utc=datetime(2018, 11, 12, 21, 40, 26)
+    )
+
+    rows = db_gateway.engine.execute(select(LISTEN_COLUMNS).limit(200)).fetchall()
+    listens = db_gateway.fetch_listens(limit=20, sort_time=SortOrder.ASCENDING)
+    events = {route: build_event(route, 'America/New_York') for route in ROUTES}
+
+    return {
+        'check_invalid': lambda: listen_entity.check_invalid(listen_input),
+        'local_date': lambda: day_entity.local_date(listen_time_utc, 'America/New_York'),
+        'is_day': lambda: day_entity.is_day(listen_time_utc, sunlight_window),
+        'pluck 200 listen rows': lambda: [
+            SqlAlchemyDbGateway._pluck_listen_row(row) for row in rows
+        ],
+        'build_listen': lambda: json.dumps(util.build_listen(listens[0])),
+        'build_listens_page of 20': lambda: json.dumps(util.build_listens_page(listens, 20)),
+        'router': lambda: [rest.router(event) for event in events.values()]
+    }
+
+
+def handler_benchmarks() -> Dict[str, Benchmark]:
+    benchmarks: Dict[str, Benchmark] = {
+        f'handler {route}': partial(rest.handler, build_event(route, 'America/New_York'), {})
+        for route in ROUTES
+    }
+
+    get_listen_event = build_event('GET /listens/{id}', 'America/New_York')
+
+    def get_uncached_listen() -> Dict:
+        rest.listen_body_cache.clear()
+        return rest.handler(get_listen_event, {})
+
+    benchmarks['handler GET /listens/{id} uncached'] = get_uncached_listen
+    return benchmarks
+
+
+class StaticContextCache:
+    """Stands in for the handler's ContextCache, always using the same context."""
+
+    def __init__(self, context: Context) -> None:
+        self.context = context
+
+    @contextmanager
+    def use(self, config: LambdaConfig) -> Iterator[Context]:
+        yield self.context
+
+
+@contextmanager
+def serve_context(db_gateway: SqlAlchemyDbGateway, latency_seconds: float) -> Iterator[None]:
+    """Have the lambda handler use `db_gateway` and stub upstream gateways."""
+    listens_context = Context(
+        db_gateway=db_gateway,
+        music_gateway=StubMusicGateway(SONG_ID, latency_seconds=latency_seconds),
+        notification_gateway=StubNotificationGateway(latency_seconds),
+        sunlight_gateway=StubSunlightGateway(ALWAYS_DAY, latency_seconds)
+    )
+    environ = {
+        'DATABASE_CONNECTION_STRING': 'unused',
+        'SUNLIGHT_SERVICE_API_KEY': 'unused',
+        'SPOTIFY_CLIENT_ID': 'unused',
+        'SPOTIFY_CLIENT_SECRET': 'unused',
+        'LISTEN_ADDED_SNS_TOPIC': 'unused'
+    }
+    with patch.dict(os.environ, environ), \
+            patch.object(rest, 'context_cache', StaticContextCache(listens_context)):
+        yield
+
+
+def measure(benchmark: Benchmark, repeat: int) -> Result:
+    timer = timeit.Timer(benchmark)
+    iterations, _ = timer.autorange()
+    round_seconds = timer.repeat(repeat=repeat, number=iterations)
+    call_us = [seconds / iterations * 1e6 for seconds in round_seconds]
+    return Result(iterations, min(call_us), statistics.median(call_us))
+
+
+def compare(baseline: Dict, report: Dict) -> None:
+    print(f'\ncompared with {baseline.get("commit") or "baseline"} (median us)')
+    for name, result in report['results'].items():
+        baseline_result = baseline['results'].get(name)
+        if not baseline_result:
+            print(f'{name:<40} {"":>12} {result["median_us"]:>12.1f}')
+            continue
+        change = result['median_us'] / baseline_result['median_us'] - 1
+        print(f'{name:<40} {baseline_result["median_us"]:>12.1f} {result["median_us"]:>12.1f} '
+              f'{change:>+8.1%}')
+
+
+def current_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.decode().strip()
+
+
+def listen_input_factory() -> ListenInput:
+    return ListenInput(
+        song_id=SONG_ID,
+        song_provider=MusicProvider.SPOTIFY,
+        listener_name='benchmark',
+        listen_time_utc=datetime(2018, 11, 12, 15, 30),
+        note='DAP is my friend from college!',
+        iana_timezone='America/New_York'
+    )
+
+
+if __name__ == '__main__':
+    main()
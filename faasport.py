@@ -14,8 +14,10 @@ import responses
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from features.fixtures.sns import LocalSnsClient
+
 from listens.definitions import MusicProvider, SunlightWindow
-from listens.delivery.aws_lambda.rest import handler
+from listens.delivery.aws_lambda.rest import context_cache, handler
 from listens.gateways import (
   SnsNotificationGateway,
   SpotifyGateway,
@@ -37,6 +39,7 @@ def always_() -> Generator:
     session.close_all()
     models.Base.metadata.drop_all(engine)
     models.Base.metadata.create_all(engine)
+    context_cache.clear()
 
     mock_env = {
         'DATABASE_CONNECTION_STRING': DATABASE_CONNECTION_STRING,
@@ -46,7 +49,7 @@ def always_() -> Generator:
         'LISTEN_ADDED_SNS_TOPIC': 'mock listen added sns topic'
     }
     with patch.dict(os.environ, mock_env):
-        with patch.object(SnsNotificationGateway, 'client'):
+        with patch.object(SnsNotificationGateway, 'client', LocalSnsClient()):
             with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
                 rsps.add(responses.POST, 'https://accounts.spotify.com/api/token',
                          json={'access_token': 'fake access token'})
@@ -89,7 +92,12 @@ def a_listen_exists(fields: Dict) -> Generator:
 def a_spotify_song_exists_with_the_id(id: str) -> Generator:
     with patch.object(SpotifyGateway,
                       'song_exists',
-                      side_effect=lambda song_id, provider: song_id == id):
+                      side_effect=lambda song_id, provider: song_id == id), \
+            patch.object(SpotifyGateway,
+                         'songs_exist',
+                         side_effect=lambda song_ids, provider: {
+                             song_id: song_id == id for song_id in song_ids
+                         }):
         yield
 
 
@@ -4,7 +4,8 @@ import behave
 
 from features.support.fixtures import (
     with_aws_lambda_environment_variables,
-    with_empty_db
+    with_empty_db,
+    with_fresh_context_cache
 )
 
 
@@ -20,6 +21,7 @@ def before_scenario(context: behave.runner.Context, scenario: behave.model.Scena
         context,
         TEST_DATABASE_CONNECTION_STRING
     )
+    behave.use_fixture(with_fresh_context_cache, context)
     behave.use_fixture(
         with_empty_db,
         context,
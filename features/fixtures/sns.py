@@ -0,0 +1,51 @@
+import threading
+from collections import defaultdict
+from typing import DefaultDict, Dict, List
+
+from botocore.exceptions import EndpointConnectionError
+
+
+class LocalSnsClient:
+    """An in-process stand-in for boto3's sns client that records published messages.
+
+    `fail_next_calls` simulates sns being unreachable for that many calls, and `reject_messages`
+    makes sns fail the entries carrying those messages.
+    """
+
+    def __init__(self) -> None:
+        self.published_messages: DefaultDict[str, List[str]] = defaultdict(list)
+        self.calls = 0
+        self.fail_next_calls = 0
+        self.reject_messages: List[str] = []
+        self._lock = threading.Lock()
+
+    def publish(self, TopicArn: str, Message: str) -> Dict:
+        with self._lock:
+            self._call()
+            self.published_messages[TopicArn].append(Message)
+            return {'MessageId': str(len(self.published_messages[TopicArn]))}
+
+    def publish_batch(self, TopicArn: str, PublishBatchRequestEntries: List[Dict]) -> Dict:
+        if len(PublishBatchRequestEntries) > 10:
+            raise ValueError('TooManyEntriesInBatchRequest')
+
+        with self._lock:
+            self._call()
+            successful, failed = [], []
+            for entry in PublishBatchRequestEntries:
+                if entry['Message'] in self.reject_messages:
+                    failed.append({
+                        'Id': entry['Id'],
+                        'Code': 'InternalError',
+                        'SenderFault': False
+                    })
+                    continue
+                self.published_messages[TopicArn].append(entry['Message'])
+                successful.append({'Id': entry['Id']})
+            return {'Successful': successful, 'Failed': failed}
+
+    def _call(self) -> None:
+        self.calls += 1
+        if self.fail_next_calls:
+            self.fail_next_calls -= 1
+            raise EndpointConnectionError(endpoint_url='https://sns.local')
@@ -1,7 +1,7 @@
 import json
 import os
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, timedelta
 from unittest.mock import patch
 
 from behave import given, then, when
@@ -12,11 +12,12 @@ from freezegun import freeze_time
 
 import responses
 
+from features.fixtures.sns import LocalSnsClient
 from features.fixtures.spotify import make_get_track_whispers_request, make_post_client_credentials
 
 from listens.definitions import MusicProvider
 from listens.delivery.aws_lambda.rest import handler as listens_handler
-from listens.gateways import SnsNotificationGateway
+from listens.gateways import SnsNotificationGateway, SqlAlchemyDbGateway
 from listens.gateways.sqlalchemy_db_gateway.models import SqlListen
 
 
@@ -67,14 +68,34 @@ def step_impl(context):
         'path': '/listens',
         'body': json.dumps(listen_input)
     }
+    if hasattr(context, 'idempotency_key'):
+        event['headers'] = {'Idempotency-Key': context.idempotency_key}
 
     with freeze_time(context.current_time_utc):
         with submit_listen_mock_network(context):
-            with patch.object(SnsNotificationGateway, 'client') as mock_sns_client:
+            local_sns_client = LocalSnsClient()
+            with patch.object(SnsNotificationGateway, 'client', local_sns_client):
                 response = listens_handler(event, {})
 
-    context.mock_sns_client = mock_sns_client
+    context.local_sns_client = local_sns_client
     context.response = response
+    context.event = event
+
+
+@given('I send an idempotency key with my listen')  # noqa: F811
+def step_impl(context):
+    context.idempotency_key = '8e03978e-40d5-43e8-bc93-6894a57f9324'
+
+
+@when('I retry submitting my listen a minute later')  # noqa: F811
+def step_impl(context):
+    # no network is mocked: a replayed listen doesn't look anything up.
+    with freeze_time(context.current_time_utc + timedelta(minutes=1)):
+        with responses.RequestsMock():
+            with patch.object(SnsNotificationGateway, 'client', context.local_sns_client):
+                response = listens_handler(context.event, {})
+
+    assert response == context.response
 
 
 @then('I get a response with my listen from morning.cd')  # noqa: F811
@@ -122,10 +143,35 @@ def step_impl(context):
 
 @then('my listen is announced to morning.cd')  # noqa: F811
 def step_impl(context):
-    context.mock_sns_client.publish.assert_called_with(
-        TopicArn=os.environ['LISTEN_ADDED_SNS_TOPIC'],
-        Message='{"listen_id": "1"}'
-    )
+    published_messages = context.local_sns_client.published_messages
+    assert published_messages[os.environ['LISTEN_ADDED_SNS_TOPIC']] == ['{"listen_id": "1"}']
+
+
+@then('I am able to view my listen on morning.cd')  # noqa: F811
+def step_impl(context):
+    event = {'httpMethod': 'GET', 'path': '/listens/1', 'pathParameters': {'id': '1'}}
+    response = listens_handler(event, {})
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['listener_name'] == context.name
+    assert 'immutable' in response['headers']['Cache-Control']
+    context.etag = response['headers']['ETag']
+
+
+@then('viewing my listen again doesn\'t download it again')  # noqa: F811
+def step_impl(context):
+    event = {
+        'httpMethod': 'GET',
+        'path': '/listens/1',
+        'pathParameters': {'id': '1'},
+        'headers': {'if-none-match': context.etag}
+    }
+    with patch.object(SqlAlchemyDbGateway, 'fetch_listen', side_effect=AssertionError):
+        response = listens_handler(event, {})
+
+    assert response['statusCode'] == 304
+    assert response['body'] == ''
+    assert response['headers']['ETag'] == context.etag
 
 
 @given('my name is "{number:d}" characters long')  # noqa: F811
@@ -170,13 +216,13 @@ def submit_listen_mock_network(context):
 
     with responses.RequestsMock() as mock_responses:
 
-        # spotify gateway eagerly fetches client credentials on creation
-        mock_responses.add(make_post_client_credentials())
-
         if hasattr(context, 'listen_invalid') and context.listen_invalid:
             yield mock_responses
             return
 
+        # spotify gateway lazily fetches client credentials before its first song lookup
+        mock_responses.add(make_post_client_credentials())
+
         # we check if the song is valid
         mock_responses.add(make_get_track_whispers_request())
 
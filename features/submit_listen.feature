@@ -9,6 +9,8 @@ Feature: Submit a listen to morning_cd
     Then I get a response with my listen from morning.cd
     And I am able to find my listen on morning.cd
     And my listen is announced to morning.cd
+    And I am able to view my listen on morning.cd
+    And viewing my listen again doesn't download it again
 
 Scenario: I submit a valid song to morning.cd during the day with no note
     Given my name is "Zach"
@@ -21,6 +23,19 @@ Scenario: I submit a valid song to morning.cd during the day with no note
     And I am able to find my listen on morning.cd
     And my listen is announced to morning.cd
 
+  Scenario: I retry submitting a valid song to morning.cd
+    Given my name is "Zach"
+    And I live in new york
+    And it's daytime at 10:30am on November 12th 2018
+    And the first song I listened to today was 'Whispers' by DAP The Contract
+    And I write the note "DAP is my friend from college!"
+    And I send an idempotency key with my listen
+    When I submit my listen to morning.cd
+    And I retry submitting my listen a minute later
+    Then I get a response with my listen from morning.cd
+    And I am able to find my listen on morning.cd
+    And my listen is announced to morning.cd
+
   Scenario: I submit a valid song to morning.cd after sunset
     Given my name is "Zach"
     And I live in new york
@@ -7,6 +7,8 @@ import behave
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from listens.delivery.aws_lambda.rest import context_cache, listen_body_cache
+from listens.gateways.spotify_gateway import SpotifyTokenManager
 from listens.gateways.sqlalchemy_db_gateway import models
 
 
@@ -35,3 +37,16 @@ def with_empty_db(context: behave.runner.Context, database_connection_string: st
 
     context.session.close_all()
     models.Base.metadata.drop_all(engine)
+
+
+@behave.fixture  # type: ignore
+def with_fresh_context_cache(context: behave.runner.Context) -> Generator:
+    """Scenarios shouldn't share gateways, tokens or listen bodies kept warm by a previous
+    scenario. Listen ids start over with each scenario's empty db."""
+    context_cache.clear()
+    listen_body_cache.clear()
+    SpotifyTokenManager.clear_shared()
+    yield
+    context_cache.clear()
+    listen_body_cache.clear()
+    SpotifyTokenManager.clear_shared()
@@ -1,3 +1,7 @@
+from .async_db_gateway import AsyncDbGateway
+from .async_music_gateway import AsyncMusicGateway
+from .async_notification_gateway import AsyncNotificationGateway
+from .async_sunlight_gateway import AsyncSunlightGateway
 from .db_gateway import DbGateway
 from .music_gateway import MusicGateway
 from .notification_gateway import NotificationGateway
@@ -0,0 +1,35 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional
+
+from listens.definitions import Listen, ListenCursor, ListenInput, SortOrder
+
+
+class AsyncDbGateway(ABC):
+
+    @abstractmethod
+    async def add_listen(self, listen_input: ListenInput) -> Listen:
+        ...
+
+    @abstractmethod
+    async def add_listens(self, listen_inputs: List[ListenInput]) -> List[Listen]:
+        """Add many listens at once, returning them in the order of `listen_inputs`."""
+        ...
+
+    @abstractmethod
+    async def fetch_listen(self, listen_id: str) -> Listen:
+        ...
+
+    @abstractmethod
+    async def fetch_listens(self,
+                            limit: int,
+                            sort_time: SortOrder,
+                            before_utc: Optional[datetime],
+                            after_utc: Optional[datetime],
+                            cursor: Optional[ListenCursor],
+                            listener_name: Optional[str],
+                            song_id: Optional[str]) -> List[Listen]:
+        """Fetch up to `limit` listens in `sort_time` order. If a `cursor` is given, only listens
+        after the cursor (in `sort_time` order) are fetched. If a `listener_name` or `song_id` is
+        given, only that listener's listens, or listens of that song, are fetched."""
+        ...
@@ -0,0 +1,10 @@
+from abc import ABC, abstractmethod
+
+from listens.definitions import MusicProvider
+
+
+class AsyncMusicGateway(ABC):
+
+    @abstractmethod
+    async def song_exists(self, song_id: str, song_provider: MusicProvider) -> bool:
+        ...
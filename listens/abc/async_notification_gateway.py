@@ -0,0 +1,10 @@
+from abc import ABC, abstractmethod
+
+from listens.definitions import Listen
+
+
+class AsyncNotificationGateway(ABC):
+
+    @abstractmethod
+    async def announce_listen_added(self, listen: Listen) -> None:
+        ...
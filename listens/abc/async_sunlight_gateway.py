@@ -0,0 +1,11 @@
+from abc import ABC, abstractmethod
+from datetime import date
+
+from listens.definitions import SunlightWindow
+
+
+class AsyncSunlightGateway(ABC):
+
+    @abstractmethod
+    async def fetch_sunlight_window(self, iana_timezone: str, on_date: date) -> SunlightWindow:
+        ...
@@ -1,8 +1,8 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from listens.definitions import Listen, ListenInput, SortOrder
+from listens.definitions import Listen, ListenCursor, ListenInput, SortOrder
 
 
 class DbGateway(ABC):
@@ -11,14 +11,42 @@ class DbGateway(ABC):
     def add_listen(self, listen_input: ListenInput) -> Listen:
         ...
 
+    @abstractmethod
+    def add_listens(self, listen_inputs: List[ListenInput]) -> List[Listen]:
+        """Add many listens at once, returning them in the order of `listen_inputs`."""
+        ...
+
+    @abstractmethod
+    def add_listen_with_idempotency_key(self,
+                                        listen_input: ListenInput,
+                                        idempotency_key: str) -> Tuple[Listen, bool]:
+        """Add a listen under an idempotency key, unless one was already added under it. Return
+        the listen under the key, and whether it was just added."""
+        ...
+
     @abstractmethod
     def fetch_listen(self, listen_id: str) -> Listen:
         ...
 
+    @abstractmethod
+    def fetch_listen_by_idempotency_key(self, idempotency_key: str) -> Optional[Listen]:
+        ...
+
     @abstractmethod
     def fetch_listens(self,
                       limit: int,
                       sort_time: SortOrder,
                       before_utc: Optional[datetime],
-                      after_utc: Optional[datetime]) -> List[Listen]:
+                      after_utc: Optional[datetime],
+                      cursor: Optional[ListenCursor],
+                      listener_name: Optional[str],
+                      song_id: Optional[str]) -> List[Listen]:
+        """Fetch up to `limit` listens in `sort_time` order. If a `cursor` is given, only listens
+        after the cursor (in `sort_time` order) are fetched. If a `listener_name` or `song_id` is
+        given, only that listener's listens, or listens of that song, are fetched."""
+        ...
+
+    def close_connections(self) -> None:
+        """Close any connections held open between calls. Gateways without any needn't override
+        this."""
         ...
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Dict, List
 
 from listens.definitions import MusicProvider
 
@@ -8,3 +9,8 @@ class MusicGateway(ABC):
     @abstractmethod
     def song_exists(self, song_id: str, song_provider: MusicProvider) -> bool:
         ...
+
+    @abstractmethod
+    def songs_exist(self, song_ids: List[str], song_provider: MusicProvider) -> Dict[str, bool]:
+        """Check many songs at once, returning whether each of `song_ids` exists."""
+        ...
@@ -0,0 +1,72 @@
+import threading
+import time
+from enum import Enum
+from typing import Callable
+
+
+class CircuitState(Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Stops calling an upstream that keeps failing, and lets a single trial call through now and
+    then to find out whether it has recovered.
+
+    The circuit starts closed. `failure_threshold` failures in a row open it, and while it is open
+    `allow_request` refuses every call. `reset_timeout_seconds` after opening, the circuit goes
+    half open and allows one trial call: its success closes the circuit, and its failure opens it
+    again. A trial that never reports back is replaced after another `reset_timeout_seconds`.
+
+    >>> circuit_breaker = CircuitBreaker(failure_threshold=2)
+    >>> circuit_breaker.record_failure(); circuit_breaker.record_failure()
+    >>> circuit_breaker.state, circuit_breaker.allow_request()
+    (<CircuitState.OPEN: 'open'>, False)
+    """
+
+    def __init__(self,
+                 failure_threshold: int = 5,
+                 reset_timeout_seconds: float = 30,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._changed_at = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state is CircuitState.CLOSED:
+                return True
+
+            if self.clock() - self._changed_at < self.reset_timeout_seconds:
+                return False
+
+            # this caller makes the trial call.
+            self._change(CircuitState.HALF_OPEN)
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state is not CircuitState.CLOSED:
+                self._change(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state is CircuitState.HALF_OPEN or (
+                self._state is CircuitState.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._change(CircuitState.OPEN)
+
+    def _change(self, state: CircuitState) -> None:
+        self._state = state
+        self._changed_at = self.clock()
@@ -1,12 +1,18 @@
-from typing import NamedTuple
+from concurrent.futures import Executor
+from typing import NamedTuple, Optional
 
 
 from listens.abc import (
+    AsyncDbGateway as AsyncDbGatewayABC,
+    AsyncMusicGateway as AsyncMusicGatewayABC,
+    AsyncNotificationGateway as AsyncNotificationGatewayABC,
+    AsyncSunlightGateway as AsyncSunlightGatewayABC,
     DbGateway as DbGatewayABC,
     MusicGateway as MusicGatewayABC,
     NotificationGateway as NotificationGatewayABC,
     SunlightGateway as SunlightGatewayABC
 )
+from listens.metrics import Metrics, NULL_METRICS
 
 
 class Context(NamedTuple):
@@ -14,3 +20,13 @@ class Context(NamedTuple):
     music_gateway: MusicGatewayABC
     notification_gateway: NotificationGatewayABC
     sunlight_gateway: SunlightGatewayABC
+    metrics: Metrics = NULL_METRICS
+    # runs lookups alongside the request that started them. None uses a small process-wide pool.
+    lookup_executor: Optional[Executor] = None
+
+
+class AsyncContext(NamedTuple):
+    db_gateway: AsyncDbGatewayABC
+    music_gateway: AsyncMusicGatewayABC
+    notification_gateway: AsyncNotificationGatewayABC
+    sunlight_gateway: AsyncSunlightGatewayABC
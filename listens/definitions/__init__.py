@@ -5,5 +5,7 @@ from .sort_order import SortOrder
 # definitions
 from .listen import Listen
 from .listen_input import ListenInput
+from .listen_cursor import ListenCursor
 from .invalid_reason import InvalidReason
 from .sunlight_window import SunlightWindow
+from .submission_result import SubmissionResult
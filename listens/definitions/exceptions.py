@@ -1,3 +1,6 @@
+from typing import Optional
+
+
 class ListensServiceException(Exception):
     """Base exception for listens service exceptions."""
 
@@ -14,6 +17,10 @@ class InvalidListenInputError(ListensServiceException):
     """Exception raised upon encountering an invalid listen input."""
 
 
+class BatchTooLargeError(ListensServiceException):
+    """Exception raised upon attempting to submit too many listens in one batch."""
+
+
 class SunlightError(ListensServiceException):
     """Exception raised upon encountering a day action attempted at night."""
 
@@ -22,9 +29,34 @@ class SunlightServiceError(ListensServiceException):
     """Exception raised upon encountering an error with the sunlight service."""
 
 
+class SunlightServiceRejectedError(SunlightServiceError):
+    """Exception raised when the sunlight service rejects a lookup as invalid, e.g. of a timezone
+    it doesnt know. The service itself is healthy."""
+
+
+class InvalidCursorError(ListensServiceException):
+    """Exception raised upon encountering a malformed listens cursor."""
+
+
 class ListenDoesntExistError(ListensServiceException):
     """Exception raised upon attempting to query a listen that doesnt exist."""
 
 
+class InvalidIdempotencyKeyError(ListensServiceException):
+    """Exception raised upon encountering a malformed idempotency key."""
+
+
+class IdempotencyKeyReusedError(ListensServiceException):
+    """Exception raised upon reusing an idempotency key for a different listen."""
+
+
 class SpotifyError(ListensServiceException):
     """Exception raised upon interacting with the Spotify service."""
+
+
+class SpotifyRateLimitedError(SpotifyError):
+    """Exception raised when Spotify, or our own budget for it, can't take another request yet."""
+
+    def __init__(self, message: str, retry_after_seconds: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
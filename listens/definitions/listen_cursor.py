@@ -0,0 +1,9 @@
+from datetime import datetime
+from typing import NamedTuple
+
+
+class ListenCursor(NamedTuple):
+    """The position of a listen in time order. Listens that share a listen_time_utc are ordered
+    by id."""
+    listen_time_utc: datetime
+    id: str
@@ -0,0 +1,11 @@
+from typing import NamedTuple, Optional
+
+from listens.definitions import Listen
+from listens.definitions.exceptions import ListensServiceException
+
+
+class SubmissionResult(NamedTuple):
+    """The outcome of submitting one listen of a batch: either the added listen or the error that
+    kept it from being added."""
+    listen: Optional[Listen]
+    error: Optional[ListensServiceException]
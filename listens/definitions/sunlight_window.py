@@ -5,3 +5,5 @@ from typing import NamedTuple
 class SunlightWindow(NamedTuple):
     sunrise_utc: datetime
     sunset_utc: datetime
+    # an earlier window served while the sunlight service is unavailable, rather than the real one.
+    stale: bool = False
@@ -0,0 +1,183 @@
+import json
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+from urllib.parse import parse_qsl
+
+from listens.context import AsyncContext
+from listens.definitions import exceptions
+from listens.delivery.aws_lambda import util
+from listens.use_listens import get_listen_async, get_listens_async, submit_listen_async
+
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    query: Dict[str, str]
+    body: bytes
+
+
+class Response(NamedTuple):
+    status: int
+    body: Dict
+
+
+Handler = Callable[[AsyncContext, Request], Awaitable[Response]]
+
+
+class ListensApp:
+    """An asgi app serving the listens routes of the aws_lambda delivery, with the same status
+    codes for listens service errors.
+
+    Each server worker opens its context once, on lifespan startup, so every request the worker
+    serves shares its pooled database connections and http clients. The context is closed on
+    lifespan shutdown, after the server has finished its in-flight requests.
+    """
+
+    def __init__(self,
+                 open_context: Callable[[], Awaitable[AsyncContext]],
+                 close_context: Callable[[AsyncContext], Awaitable[None]]) -> None:
+        self.open_context = open_context
+        self.close_context = close_context
+        self.context: Optional[AsyncContext] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+
+        elif scope['type'] == 'http':
+            request = await _read_request(scope, receive)
+            response = await self.respond(request)
+            await _send_response(response, send)
+
+        else:
+            raise RuntimeError(f'Unsupported scope type {scope["type"]}.')
+
+    async def respond(self, request: Request) -> Response:
+        handler = route(request.method, request.path)
+        if not handler:
+            return Response(404, {'message': f'No route for {request.method} {request.path}.'})
+
+        if not self.context:
+            return Response(503, {'message': 'The listens service is starting up.'})
+
+        try:
+            return await handler(self.context, request)
+        except Exception as e:
+            error = None
+            if isinstance(e, exceptions.ListensServiceException):
+                error = util.build_error(e)
+
+            if error:
+                status_code, body = error
+                return Response(status_code, body)
+
+            logger.exception(f'Unexpected error handling {request.method} {request.path}.')
+            return Response(500, {'message': 'Internal server error.'})
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    self.context = await self.open_context()
+                except Exception as e:
+                    logger.exception('Unable to open the listens context.')
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+
+            elif message['type'] == 'lifespan.shutdown':
+                if self.context:
+                    context, self.context = self.context, None
+                    await self.close_context(context)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+async def submit_listen_handler(context: AsyncContext, request: Request) -> Response:
+    current_time_utc = datetime.utcnow()
+    listen_input = util.pluck_listen_input(json.loads(request.body), current_time_utc)
+
+    submitted_listen = await submit_listen_async(context, listen_input)
+
+    return Response(200, util.build_listen(submitted_listen))
+
+
+async def get_listen_handler(context: AsyncContext, request: Request) -> Response:
+    listen_id = request.path.rstrip('/').split('/')[-1]
+
+    listen = await get_listen_async(context, listen_id)
+
+    return Response(200, util.build_listen(listen))
+
+
+async def get_listens_handler(context: AsyncContext, request: Request) -> Response:
+    get_listens_parameters = util.pluck_get_listens_params(request.query)
+
+    listens = await get_listens_async(context, **get_listens_parameters._asdict())
+
+    return Response(200, util.build_listens_page(listens, get_listens_parameters.limit))
+
+
+def route(method: str, path: str) -> Optional[Handler]:
+    """Find the handler of a request, or None if no route matches it.
+
+    >>> route('POST', '/listens')
+    <function submit_listen_handler at 0x...>
+
+    >>> route('GET', '/listens')
+    <function get_listens_handler at 0x...>
+
+    >>> route('GET', '/listens/1b23d')
+    <function get_listen_handler at 0x...>
+
+    >>> route('DELETE', '/listens/1b23d') is None
+    True
+    """
+    segments = path.strip('/').split('/')
+    if segments == ['listens']:
+        return {'POST': submit_listen_handler, 'GET': get_listens_handler}.get(method)
+
+    elif len(segments) == 2 and segments[0] == 'listens' and segments[1].isalnum():
+        return {'GET': get_listen_handler}.get(method)
+
+    else:
+        return None
+
+
+async def _read_request(scope: Scope, receive: Receive) -> Request:
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+
+    return Request(
+        method=scope['method'],
+        path=scope['path'],
+        query=dict(parse_qsl(scope.get('query_string', b'').decode())),
+        body=body
+    )
+
+
+async def _send_response(response: Response, send: Send) -> None:
+    body = json.dumps(response.body).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': response.status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode())
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,157 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from listens.context import AsyncContext
+from listens.definitions import Listen, ListenCursor, SortOrder
+from listens.delivery.asgi.app import ListensApp
+from listens.testing import (
+    ALWAYS_DAY,
+    AsyncInMemoryDbGateway,
+    AsyncStubMusicGateway,
+    AsyncStubNotificationGateway,
+    AsyncStubSunlightGateway
+)
+
+
+SONG_ID = '4rNGLh1y5Kkvr4bT28yfHU'
+
+
+class FailingDbGateway(AsyncInMemoryDbGateway):
+    """Fails to fetch pages of a negative length, standing in for an unexpected database error."""
+
+    async def fetch_listens(self,
+                            limit: int,
+                            sort_time: SortOrder,
+                            before_utc: Optional[datetime] = None,
+                            after_utc: Optional[datetime] = None,
+                            cursor: Optional[ListenCursor] = None,
+                            listener_name: Optional[str] = None,
+                            song_id: Optional[str] = None) -> List[Listen]:
+        if limit < 0:
+            raise RuntimeError('connection reset')
+        return await super().fetch_listens(limit, sort_time, before_utc, after_utc, cursor,
+                                           listener_name, song_id)
+
+
+class TestListensApp:
+
+    def test_opens_and_closes_its_context_with_the_server(self) -> None:
+        # Given
+        closed_contexts: List[AsyncContext] = []
+        app = app_factory(closed_contexts)
+
+        # When
+        asyncio.run(run_lifespan(app))
+
+        # Then
+        assert len(closed_contexts) == 1
+        assert app.context is None
+
+    def test_submits_and_gets_listens(self) -> None:
+        # Given
+        app = app_factory()
+
+        # When
+        async def submit_and_get_listen() -> List[Tuple[int, Dict]]:
+            await start(app)
+            return [
+                await request(app, 'POST', '/listens', body=raw_listen_input_factory()),
+                await request(app, 'GET', '/listens/1'),
+                await request(app, 'GET', '/listens', query_string=b'limit=1')
+            ]
+
+        responses = asyncio.run(submit_and_get_listen())
+
+        # Then
+        (submit_status, listen), (get_status, fetched_listen), (page_status, page) = responses
+        assert (submit_status, get_status, page_status) == (200, 200, 200)
+        assert listen == fetched_listen == page['items'][0]
+        assert page['next_cursor']
+
+    def test_maps_listens_service_errors_to_statuses(self) -> None:
+        # Given
+        app = app_factory()
+
+        # When
+        async def make_bad_requests() -> List[Tuple[int, Dict]]:
+            await start(app)
+            return [
+                await request(app, 'GET', '/listens/404'),
+                await request(app, 'POST', '/listens',
+                              body=raw_listen_input_factory(listener_name='a' * 31)),
+                await request(app, 'GET', '/listens', query_string=b'cursor=nonsense'),
+                await request(app, 'GET', '/listens', query_string=b'limit=-1'),
+                await request(app, 'DELETE', '/listens/1')
+            ]
+
+        statuses = [status for status, _ in asyncio.run(make_bad_requests())]
+
+        # Then
+        assert statuses == [404, 400, 400, 500, 404]
+
+
+def app_factory(closed_contexts: Optional[List[AsyncContext]] = None) -> ListensApp:
+    async def open_context() -> AsyncContext:
+        return AsyncContext(
+            db_gateway=FailingDbGateway(),
+            music_gateway=AsyncStubMusicGateway(SONG_ID),
+            notification_gateway=AsyncStubNotificationGateway(),
+            sunlight_gateway=AsyncStubSunlightGateway(ALWAYS_DAY)
+        )
+
+    async def close_context(context: AsyncContext) -> None:
+        if closed_contexts is not None:
+            closed_contexts.append(context)
+
+    return ListensApp(open_context, close_context)
+
+
+async def start(app: ListensApp) -> None:
+    app.context = await app.open_context()
+
+
+async def run_lifespan(app: ListensApp) -> None:
+    messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+    sent: List[Dict] = []
+
+    async def receive() -> Dict:
+        return messages.pop(0)
+
+    async def send(message: Dict) -> None:
+        sent.append(message)
+
+    await app({'type': 'lifespan'}, receive, send)
+    assert [message['type'] for message in sent] == [
+        'lifespan.startup.complete',
+        'lifespan.shutdown.complete'
+    ]
+
+
+async def request(app: ListensApp,
+                  method: str,
+                  path: str,
+                  body: Optional[Dict] = None,
+                  query_string: bytes = b'') -> Tuple[int, Any]:
+    sent: List[Dict] = []
+
+    async def receive() -> Dict:
+        return {'type': 'http.request', 'body': json.dumps(body).encode() if body else b''}
+
+    async def send(message: Dict) -> None:
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query_string}
+    await app(scope, receive, send)
+    return sent[0]['status'], json.loads(sent[1]['body'])
+
+
+def raw_listen_input_factory(*, listener_name: str = 'geez') -> Dict:
+    return {
+        'song_id': SONG_ID,
+        'song_provider': 'SPOTIFY',
+        'listener_name': listener_name,
+        'note': None,
+        'iana_timezone': 'America/New_York'
+    }
@@ -0,0 +1,92 @@
+"""Serve the listens service from a long-running, multi-worker asgi server.
+
+    $ pipenv sync --categories "packages asgi"
+    $ python -m listens.delivery.asgi.server
+
+Takes the same environment variables as the aws_lambda delivery, plus:
+
+    PORT                       port to listen on (8000)
+    WEB_CONCURRENCY            worker processes (one per cpu)
+    DATABASE_POOL_SIZE         pooled database connections per worker (10)
+    KEEP_ALIVE_SECONDS         how long idle keep-alive connections are kept open (75)
+    GRACEFUL_SHUTDOWN_SECONDS  how long in-flight requests get to finish on shutdown (30)
+    OUTBOX_FLUSH_SECONDS       how often unpublished announcements are retried (30)
+"""
+import os
+
+import httpx
+
+import uvicorn
+
+from listens.context import AsyncContext
+from listens.delivery.asgi.app import ListensApp
+from listens.delivery.aws_lambda import util
+from listens.gateways import SnsNotificationGateway
+from listens.gateways.aio import (
+    AsyncSnsNotificationGateway,
+    AsyncSpotifyGateway,
+    AsyncSunlightServiceGateway,
+    AsyncpgDbGateway
+)
+
+
+async def open_context() -> AsyncContext:
+    config = util.pluck_config(os.environ)
+    # one keep-alive client shared by both upstream http apis.
+    http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(5.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    )
+    return AsyncContext(
+        db_gateway=AsyncpgDbGateway(
+            config.database_connection_string,
+            max_pool_size=int(os.environ.get('DATABASE_POOL_SIZE', 10))
+        ),
+        music_gateway=AsyncSpotifyGateway(
+            client_id=config.spotify_client_id,
+            client_secret=config.spotify_client_secret,
+            client=http_client
+        ),
+        notification_gateway=AsyncSnsNotificationGateway(
+            SnsNotificationGateway(
+                config.listen_added_topic_arn,
+                outbox_path=config.notification_outbox_path
+            ),
+            flush_interval_seconds=float(os.environ.get('OUTBOX_FLUSH_SECONDS', 30))
+        ),
+        sunlight_gateway=AsyncSunlightServiceGateway(
+            config.sunlight_service_api_key,
+            client=http_client
+        )
+    )
+
+
+async def close_context(context: AsyncContext) -> None:
+    """Publish any queued announcements, then close pooled connections."""
+    if isinstance(context.notification_gateway, AsyncSnsNotificationGateway):
+        await context.notification_gateway.aclose()
+
+    if isinstance(context.db_gateway, AsyncpgDbGateway):
+        await context.db_gateway.close_connections()
+
+    if isinstance(context.music_gateway, AsyncSpotifyGateway):
+        await context.music_gateway.aclose()
+
+
+app = ListensApp(open_context, close_context)
+
+
+def main() -> None:
+    uvicorn.run(
+        'listens.delivery.asgi.server:app',
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 8000)),
+        workers=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)),
+        lifespan='on',
+        timeout_keep_alive=int(os.environ.get('KEEP_ALIVE_SECONDS', 75)),
+        timeout_graceful_shutdown=int(os.environ.get('GRACEFUL_SHUTDOWN_SECONDS', 30))
+    )
+
+
+if __name__ == '__main__':
+    main()
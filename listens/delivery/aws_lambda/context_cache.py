@@ -0,0 +1,312 @@
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional, TYPE_CHECKING, Tuple, cast
+
+from listens import gateways
+from listens.abc import (
+    DbGateway as DbGatewayABC,
+    MusicGateway as MusicGatewayABC,
+    NotificationGateway as NotificationGatewayABC,
+    SunlightGateway as SunlightGatewayABC
+)
+from listens.circuit_breaker import CircuitBreaker
+from listens.context import Context
+from listens.definitions import exceptions
+from listens.delivery.aws_lambda.util import LambdaConfig
+from listens.lru_cache import LruCache
+from listens.metrics import EmfMetrics, MeteredGateway, Metrics, NULL_METRICS
+
+if TYPE_CHECKING:
+    from listens.definitions import SunlightWindow
+    from listens.gateways.caching_music_gateway import SongKey
+    from listens.gateways.caching_sunlight_gateway import SunlightKey
+    from listens.gateways.circuit_breaking_sunlight_gateway import StaleSunlightWindow
+
+
+DEFAULT_MAX_AGE_SECONDS = 15 * 60
+
+
+class LazyGateway:
+    """Stands in for a gateway that is only built, and its modules imported, when it is first
+    used. A route that never touches a gateway never pays for it.
+    """
+
+    def __init__(self, build: Callable[[], Any]) -> None:
+        self._build = build
+        self._gateway: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        return self._gateway is not None
+
+    def resolve(self) -> Any:
+        if self._gateway is None:
+            with self._lock:
+                if self._gateway is None:
+                    self._gateway = self._build()
+        return self._gateway
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+
+class _CachedGateway(NamedTuple):
+    gateway: LazyGateway
+    config_key: Tuple
+    created_at: float
+
+
+class ContextCache:
+    """Keeps a listens Context's gateways alive across warm lambda invocations.
+
+    Each gateway is cached separately against the slice of config it was built from, and is
+    rebuilt when that config changes, when it is older than `max_age_seconds` or after it has
+    been invalidated by a failed invocation.
+
+    Gateways are built lazily, on first use within an invocation. The caches of songs and sunlight
+    windows, the sunlight service's circuit breaker, and the last known sunlight windows served
+    while it is open, outlive the gateways, so rebuilding a gateway doesn't start them over.
+    """
+
+    def __init__(self,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self.sunlight_circuit_breaker = CircuitBreaker()
+        self.stale_sunlight_windows: LruCache[str, 'StaleSunlightWindow'] = LruCache(1024)
+        self.song_cache: LruCache['SongKey', bool] = LruCache(10_000)
+        self.sunlight_cache: LruCache['SunlightKey', 'SunlightWindow'] = LruCache(1024)
+        self._gateways: Dict[str, _CachedGateway] = {}
+        self._metrics: Dict[str, Metrics] = {}
+        self._lookup_executors: Dict[int, Executor] = {}
+
+    def get(self, config: LambdaConfig) -> Context:
+        metrics = self._metrics.get(config.metrics)
+        if not metrics:
+            metrics = self._metrics.setdefault(config.metrics, _build_metrics(config.metrics))
+
+        lookup_executor = self._lookup_executors.get(config.max_concurrent_lookups)
+        if not lookup_executor:
+            lookup_executor = self._lookup_executors.setdefault(
+                config.max_concurrent_lookups,
+                ThreadPoolExecutor(max_workers=config.max_concurrent_lookups,
+                                   thread_name_prefix='listens-lookup')
+            )
+
+        listens_context = Context(
+            db_gateway=cast(DbGatewayABC, self._gateway(
+                'db_gateway',
+                (
+                    config.database_connection_string,
+                    config.database_pool_size,
+                    config.database_external_pooler,
+                    config.recent_listens_capacity,
+                    config.recent_listens_max_age_seconds
+                ),
+                lambda: _build_db_gateway(config)
+            )),
+            music_gateway=cast(MusicGatewayABC, self._gateway(
+                'music_gateway',
+                (
+                    config.spotify_client_id,
+                    config.spotify_client_secret,
+                    config.song_cache_path,
+                    config.metrics,
+                    config.spotify_rate_limit
+                ),
+                lambda: _build_music_gateway(config, self.song_cache, metrics)
+            )),
+            notification_gateway=cast(NotificationGatewayABC, self._gateway(
+                'notification_gateway',
+                (config.listen_added_topic_arn, config.notification_outbox_path),
+                lambda: gateways.SnsNotificationGateway(
+                    config.listen_added_topic_arn,
+                    outbox_path=config.notification_outbox_path
+                )
+            )),
+            sunlight_gateway=cast(SunlightGatewayABC, self._gateway(
+                'sunlight_gateway',
+                (config.sunlight_service_api_key, config.sunlight_engine, config.metrics),
+                lambda: gateways.CachingSunlightGateway(
+                    _build_sunlight_gateway(
+                        config,
+                        self.sunlight_circuit_breaker,
+                        self.stale_sunlight_windows,
+                        metrics
+                    ),
+                    metrics=metrics,
+                    cache=self.sunlight_cache
+                )
+            )),
+            metrics=metrics,
+            lookup_executor=lookup_executor
+        )
+        if metrics is NULL_METRICS:
+            return listens_context
+
+        # time every gateway call. left out entirely when metrics are off.
+        return listens_context._replace(
+            db_gateway=cast(DbGatewayABC, MeteredGateway(
+                listens_context.db_gateway, 'db_gateway', metrics
+            )),
+            music_gateway=cast(MusicGatewayABC, MeteredGateway(
+                listens_context.music_gateway, 'music_gateway', metrics
+            )),
+            notification_gateway=cast(NotificationGatewayABC, MeteredGateway(
+                listens_context.notification_gateway, 'notification_gateway', metrics
+            )),
+            sunlight_gateway=cast(SunlightGatewayABC, MeteredGateway(
+                listens_context.sunlight_gateway, 'sunlight_gateway', metrics
+            ))
+        )
+
+    @contextmanager
+    def use(self, config: LambdaConfig) -> Iterator[Context]:
+        """Yield a cached Context for the length of one invocation.
+
+        Errors from a specific upstream invalidate that upstream's gateway (except being rate
+        limited by it, or having a lookup rejected by it), and unexpected errors invalidate every
+        gateway. Expected listens service errors (invalid input, night time, etc.) say nothing
+        about the health of a gateway, so they leave the cache intact.
+
+        Announcements queued during the invocation, and its metrics, are flushed before it ends,
+        either way.
+        """
+        listens_context = self.get(config)
+        try:
+            yield listens_context
+        except exceptions.SpotifyRateLimitedError:
+            # spotify is healthy, just busy. keep the gateway and its cache of songs.
+            raise
+        except exceptions.SpotifyError:
+            self.invalidate('music_gateway')
+            raise
+        except exceptions.SunlightServiceRejectedError:
+            # the sunlight service is healthy, it just rejected this lookup.
+            raise
+        except exceptions.SunlightServiceError:
+            self.invalidate('sunlight_gateway')
+            raise
+        except exceptions.ListensServiceException:
+            raise
+        except Exception:
+            self.invalidate()
+            raise
+        finally:
+            notification_gateway = cast(LazyGateway, listens_context.notification_gateway)
+            if notification_gateway.built:
+                notification_gateway.flush()
+            listens_context.metrics.flush()
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop the gateway cached under `name`, or every gateway if no name is given."""
+        if name is None:
+            names = list(self._gateways)
+        else:
+            names = [name]
+
+        for name_ in names:
+            cached = self._gateways.pop(name_, None)
+            if cached and name_ == 'db_gateway' and cached.gateway.built:
+                cached.gateway.close_connections()
+
+    def clear(self) -> None:
+        """Drop every gateway, and everything kept across them."""
+        self.invalidate()
+        self.sunlight_circuit_breaker = CircuitBreaker()
+        self.stale_sunlight_windows.clear()
+        self.song_cache.clear()
+        self.sunlight_cache.clear()
+
+    def _gateway(self, name: str, config_key: Tuple, build: Callable[[], Any]) -> LazyGateway:
+        cached = self._gateways.get(name)
+        now = self.clock()
+        if cached and cached.config_key == config_key and not self._expired(cached, now):
+            return cached.gateway
+
+        self.invalidate(name)
+        gateway = LazyGateway(build)
+        self._gateways[name] = _CachedGateway(gateway, config_key, now)
+        return gateway
+
+    def _expired(self, cached: _CachedGateway, now: float) -> bool:
+        age = now - cached.created_at
+        return age < 0 or age > self.max_age_seconds
+
+
+def _build_db_gateway(config: LambdaConfig) -> DbGatewayABC:
+    from listens.gateways.sqlalchemy_db_gateway import PoolConfig
+
+    sqlalchemy_db_gateway = gateways.SqlAlchemyDbGateway(
+        config.database_connection_string,
+        pool_config=PoolConfig(
+            pool_size=config.database_pool_size,
+            max_overflow=0,
+            external_pooler=config.database_external_pooler
+        )
+    )
+    if not config.recent_listens_capacity:
+        return sqlalchemy_db_gateway
+    return gateways.RecentListensDbGateway(
+        sqlalchemy_db_gateway,
+        capacity=config.recent_listens_capacity,
+        max_age_seconds=config.recent_listens_max_age_seconds
+    )
+
+
+def _build_metrics(name: str) -> Metrics:
+    if name == 'none':
+        return NULL_METRICS
+
+    elif name == 'emf':
+        return EmfMetrics()
+
+    else:
+        raise ValueError(f'Unknown metrics {name}.')
+
+
+def _build_music_gateway(config: LambdaConfig,
+                         cache: LruCache['SongKey', bool],
+                         metrics: Metrics) -> MusicGatewayABC:
+    spotify_gateway = gateways.SpotifyGateway(
+        client_id=config.spotify_client_id,
+        client_secret=config.spotify_client_secret,
+        rate_per_second=config.spotify_rate_limit,
+        burst=2 * config.spotify_rate_limit,
+        metrics=metrics
+    )
+    store = None
+    if config.song_cache_path:
+        store = gateways.SqliteSongExistenceStore(config.song_cache_path)
+    return gateways.CachingMusicGateway(spotify_gateway, store=store, metrics=metrics,
+                                        cache=cache)
+
+
+def _build_sunlight_gateway(config: LambdaConfig,
+                            circuit_breaker: CircuitBreaker,
+                            stale_windows: LruCache[str, 'StaleSunlightWindow'],
+                            metrics: Metrics) -> SunlightGatewayABC:
+    sunlight_service_gateway = gateways.CircuitBreakingSunlightGateway(
+        gateways.SunlightServiceGateway(config.sunlight_service_api_key),
+        circuit_breaker=circuit_breaker,
+        stale_windows=stale_windows,
+        metrics=metrics
+    )
+    if config.sunlight_engine == 'service':
+        return sunlight_service_gateway
+
+    elif config.sunlight_engine == 'astronomical':
+        return gateways.AstronomicalSunlightGateway(fallback=sunlight_service_gateway)
+
+    elif config.sunlight_engine == 'astronomical-verified':
+        return gateways.AstronomicalSunlightGateway(
+            fallback=sunlight_service_gateway,
+            verify_with=sunlight_service_gateway
+        )
+
+    else:
+        raise ValueError(f'Unknown sunlight engine {config.sunlight_engine}.')
@@ -0,0 +1,169 @@
+from typing import Any, Generator
+from unittest.mock import patch
+
+import pytest
+
+from listens.definitions import MusicProvider, exceptions
+from listens.delivery.aws_lambda.context_cache import ContextCache
+from listens.delivery.aws_lambda.util import LambdaConfig
+from listens.testing import FakeClock
+
+
+class FakeGateway:
+    built = 0
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        FakeGateway.built += 1
+
+    def close_connections(self) -> None:
+        ...
+
+    def flush(self) -> None:
+        ...
+
+
+@pytest.fixture(autouse=True)  # type: ignore
+def mock_gateways() -> Generator:
+    module = 'listens.gateways'
+    with patch(f'{module}.SqlAlchemyDbGateway', FakeGateway), \
+            patch(f'{module}.SpotifyGateway', FakeGateway), \
+            patch(f'{module}.SnsNotificationGateway', FakeGateway), \
+            patch(f'{module}.SunlightServiceGateway', FakeGateway):
+        yield
+
+
+class TestContextCache:
+
+    def test_reuses_gateways_across_invocations(self) -> None:
+        # Given
+        context_cache = ContextCache()
+
+        # When
+        first_context = context_cache.get(config_factory())
+        second_context = context_cache.get(config_factory())
+
+        # Then
+        assert first_context == second_context
+
+    def test_builds_only_the_gateways_an_invocation_uses(self) -> None:
+        # Given
+        context_cache = ContextCache()
+        FakeGateway.built = 0
+
+        # When
+        with context_cache.use(config_factory()) as listens_context:
+            listens_context.db_gateway.close_connections()
+
+        # Then
+        assert FakeGateway.built == 1
+
+    def test_rebuilds_only_gateways_whose_config_changed(self) -> None:
+        # Given
+        context_cache = ContextCache()
+        first_context = context_cache.get(config_factory())
+
+        # When
+        second_context = context_cache.get(config_factory(spotify_client_secret='rotated'))
+
+        # Then
+        assert first_context.music_gateway is not second_context.music_gateway
+        assert first_context.db_gateway is second_context.db_gateway
+        assert first_context.sunlight_gateway is second_context.sunlight_gateway
+
+    def test_rebuilds_gateways_past_max_age(self) -> None:
+        # Given
+        clock = FakeClock()
+        context_cache = ContextCache(max_age_seconds=60, clock=clock)
+        first_context = context_cache.get(config_factory())
+
+        # When
+        clock.now = 61
+        second_context = context_cache.get(config_factory())
+
+        # Then
+        assert first_context.db_gateway is not second_context.db_gateway
+
+    def test_upstream_error_invalidates_only_that_gateway(self) -> None:
+        # Given
+        context_cache = ContextCache()
+
+        # When
+        with pytest.raises(exceptions.SpotifyError):
+            with context_cache.use(config_factory()) as first_context:
+                raise exceptions.SpotifyError('500: oh no')
+        second_context = context_cache.get(config_factory())
+
+        # Then
+        assert first_context.music_gateway is not second_context.music_gateway
+        assert first_context.db_gateway is second_context.db_gateway
+
+    def test_rebuilt_gateways_keep_their_caches(self) -> None:
+        # Given
+        context_cache = ContextCache()
+        with context_cache.use(config_factory()) as first_context:
+            first_context.music_gateway.cache.set(  # type: ignore
+                ('4rNGLh1y5Kkvr4bT28yfHU', MusicProvider.SPOTIFY), True
+            )
+
+        # When
+        with pytest.raises(exceptions.SpotifyError):
+            with context_cache.use(config_factory()):
+                raise exceptions.SpotifyError('500: oh no')
+        with context_cache.use(config_factory()) as second_context:
+            song_exists = second_context.music_gateway.song_exists('4rNGLh1y5Kkvr4bT28yfHU',
+                                                                   MusicProvider.SPOTIFY)
+
+        # Then
+        assert first_context.music_gateway is not second_context.music_gateway
+        assert song_exists
+        assert first_context.sunlight_gateway.cache is context_cache.sunlight_cache  # type: ignore
+
+    def test_being_rate_limited_doesnt_invalidate_the_music_gateway(self) -> None:
+        # Given
+        context_cache = ContextCache()
+
+        # When
+        with pytest.raises(exceptions.SpotifyRateLimitedError):
+            with context_cache.use(config_factory()) as first_context:
+                raise exceptions.SpotifyRateLimitedError('429: slow down', retry_after_seconds=1)
+        second_context = context_cache.get(config_factory())
+
+        # Then
+        assert first_context.music_gateway is second_context.music_gateway
+
+    def test_expected_service_errors_dont_invalidate_gateways(self) -> None:
+        # Given
+        context_cache = ContextCache()
+
+        # When
+        with pytest.raises(exceptions.SunlightError):
+            with context_cache.use(config_factory()) as first_context:
+                raise exceptions.SunlightError('its night')
+        second_context = context_cache.get(config_factory())
+
+        # Then
+        assert first_context == second_context
+
+    def test_unexpected_errors_invalidate_every_gateway(self) -> None:
+        # Given
+        context_cache = ContextCache()
+
+        # When
+        with pytest.raises(RuntimeError):
+            with context_cache.use(config_factory()) as first_context:
+                raise RuntimeError('connection reset')
+        second_context = context_cache.get(config_factory())
+
+        # Then
+        for name in ('db_gateway', 'music_gateway', 'notification_gateway', 'sunlight_gateway'):
+            assert getattr(first_context, name) is not getattr(second_context, name)
+
+
+def config_factory(*, spotify_client_secret: str = 'spotify client secret') -> LambdaConfig:
+    return LambdaConfig(
+        database_connection_string='sqlite://',
+        sunlight_service_api_key='sunlight service api key',
+        spotify_client_id='spotify client id',
+        spotify_client_secret=spotify_client_secret,
+        listen_added_topic_arn='listen added topic arn'
+    )
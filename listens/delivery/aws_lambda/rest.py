@@ -4,26 +4,42 @@ import re
 from datetime import datetime
 from typing import Dict, cast
 
-from aws_xray_sdk.core import patch as xray_patch
-
-import sentry_sdk
-from sentry_sdk.integrations.aws_lambda import AwsLambdaIntegration
-
 from listens.delivery.aws_lambda import util
-from listens.gateways import SqlAlchemyDbGateway
-from listens.use_listens import get_listen, get_listens, submit_listen
+from listens.delivery.aws_lambda.context_cache import ContextCache
+from listens.lru_cache import LruCache
+from listens.use_listens import get_listen, get_listens, submit_listen, submit_listens
 
 
 if os.environ.get('AWS_EXECUTION_ENV'):
+    import sentry_sdk
+    import wrapt
+    from sentry_sdk.integrations.aws_lambda import AwsLambdaIntegration
+
     # setup sentry
     sentry_sdk.init(
         dsn="https://aaf4d2452f84464cafdc6004d89c1724@sentry.io/1357179",
         integrations=[AwsLambdaIntegration()]
     )
 
-    # setup xray patching
-    libraries = ('requests', 'boto3', 'botocore', 'psycopg2')
-    xray_patch(libraries)
+    # setup xray patching. each library is patched when it is first imported, rather than
+    # importing every library up front, so routes that dont need a library dont load it.
+    def _xray_patch_on_import(library: str) -> None:
+        def xray_patch(module: object) -> None:
+            from aws_xray_sdk.core import patch as xray_patch_
+            xray_patch_([library])
+        wrapt.register_post_import_hook(xray_patch, library)
+
+    for library in ('requests', 'boto3', 'botocore', 'psycopg2'):
+        _xray_patch_on_import(library)
+
+
+# gateways are kept alive at module level so that warm invocations can reuse them.
+context_cache = ContextCache()
+
+# listens never change once added, so a listen's serialized body is kept for as long as the
+# container lives, and repeat requests for it are served without a context or a query.
+LISTEN_BODY_CACHE_CAPACITY = 10000
+listen_body_cache: LruCache[str, util.CachedListenBody] = LruCache(LISTEN_BODY_CACHE_CAPACITY)
 
 
 def handler(event: Dict, context: Dict) -> Dict:
@@ -34,26 +50,12 @@ def handler(event: Dict, context: Dict) -> Dict:
 
 @util.catch_listens_service_errors
 def submit_listen_handler(event: Dict, context: Dict) -> Dict:
-    database_connection_string = os.environ['DATABASE_CONNECTION_STRING']
-    sunlight_service_api_key = os.environ['SUNLIGHT_SERVICE_API_KEY']
-    spotify_client_id = os.environ['SPOTIFY_CLIENT_ID']
-    spotify_client_secret = os.environ['SPOTIFY_CLIENT_SECRET']
-    listen_added_topic_arn = os.environ['LISTEN_ADDED_SNS_TOPIC']
-
     current_time_utc = datetime.utcnow()
     listen_input = util.pluck_listen_input(json.loads(event['body']), current_time_utc)
-    listens_context = util.create_default_context(
-        database_connection_string,
-        sunlight_service_api_key,
-        spotify_client_id,
-        spotify_client_secret,
-        listen_added_topic_arn
-    )
+    idempotency_key = util.pluck_idempotency_key(event.get('headers'))
 
-    submitted_listen = submit_listen(listens_context, listen_input)
-
-    if isinstance(listens_context.db_gateway, SqlAlchemyDbGateway):
-        listens_context.db_gateway.close_connections()
+    with context_cache.use(util.pluck_config(os.environ)) as listens_context:
+        submitted_listen = submit_listen(listens_context, listen_input, idempotency_key)
 
     return {
         'statusCode': 200,
@@ -62,58 +64,45 @@ def submit_listen_handler(event: Dict, context: Dict) -> Dict:
 
 
 @util.catch_listens_service_errors
-def get_listen_handler(event: Dict, context: Dict) -> Dict:
-    database_connection_string = os.environ['DATABASE_CONNECTION_STRING']
-    sunlight_service_api_key = os.environ['SUNLIGHT_SERVICE_API_KEY']
-    spotify_client_id = os.environ['SPOTIFY_CLIENT_ID']
-    spotify_client_secret = os.environ['SPOTIFY_CLIENT_SECRET']
-    listen_added_topic_arn = os.environ['LISTEN_ADDED_SNS_TOPIC']
-
-    listen_id = cast(str, event['pathParameters']['id'])
-    listens_context = util.create_default_context(
-        database_connection_string,
-        sunlight_service_api_key,
-        spotify_client_id,
-        spotify_client_secret,
-        listen_added_topic_arn
-    )
-
-    listen = get_listen(listens_context, listen_id)
+def submit_listens_handler(event: Dict, context: Dict) -> Dict:
+    current_time_utc = datetime.utcnow()
+    listen_inputs = util.pluck_listen_inputs(json.loads(event['body']), current_time_utc)
 
-    if isinstance(listens_context.db_gateway, SqlAlchemyDbGateway):
-        listens_context.db_gateway.close_connections()
+    with context_cache.use(util.pluck_config(os.environ)) as listens_context:
+        submission_results = submit_listens(listens_context, listen_inputs)
 
     return {
         'statusCode': 200,
-        'body': json.dumps(util.build_listen(listen))
+        'body': json.dumps({
+            'items': [util.build_submission_result(result) for result in submission_results]
+        })
     }
 
 
 @util.catch_listens_service_errors
-def get_listens_handler(event: Dict, context: Dict) -> Dict:
-    database_connection_string = os.environ['DATABASE_CONNECTION_STRING']
-    sunlight_service_api_key = os.environ['SUNLIGHT_SERVICE_API_KEY']
-    spotify_client_id = os.environ['SPOTIFY_CLIENT_ID']
-    spotify_client_secret = os.environ['SPOTIFY_CLIENT_SECRET']
-    listen_added_topic_arn = os.environ['LISTEN_ADDED_SNS_TOPIC']
+def get_listen_handler(event: Dict, context: Dict) -> Dict:
+    listen_id = cast(str, event['pathParameters']['id'])
 
-    get_listens_parameters = util.pluck_get_listens_params(event['queryStringParameters'] or {})
-    listens_context = util.create_default_context(
-        database_connection_string,
-        sunlight_service_api_key,
-        spotify_client_id,
-        spotify_client_secret,
-        listen_added_topic_arn
-    )
+    cached_listen_body = listen_body_cache.get(listen_id)
+    if cached_listen_body is None:
+        with context_cache.use(util.pluck_config(os.environ)) as listens_context:
+            listen = get_listen(listens_context, listen_id)
+        cached_listen_body = util.build_cached_listen_body(listen)
+        listen_body_cache.set(listen_id, cached_listen_body)
 
-    listens = get_listens(listens_context, **get_listens_parameters._asdict())
+    return util.build_cached_listen_response(cached_listen_body, event.get('headers'))
 
-    if isinstance(listens_context.db_gateway, SqlAlchemyDbGateway):
-        listens_context.db_gateway.close_connections()
+
+@util.catch_listens_service_errors
+def get_listens_handler(event: Dict, context: Dict) -> Dict:
+    get_listens_parameters = util.pluck_get_listens_params(event['queryStringParameters'] or {})
+
+    with context_cache.use(util.pluck_config(os.environ)) as listens_context:
+        listens = get_listens(listens_context, **get_listens_parameters._asdict())
 
     return {
         'statusCode': 200,
-        'body': json.dumps({'items': [util.build_listen(listen) for listen in listens]})
+        'body': json.dumps(util.build_listens_page(listens, get_listens_parameters.limit))
     }
 
 
@@ -123,6 +112,9 @@ def router(event: Dict) -> util.AwsHandler:
     >>> router({'httpMethod': 'POST', 'path': '/listens'})
     <function submit_listen_handler at 0x...>
 
+    >>> router({'httpMethod': 'POST', 'path': '/listens/batch'})
+    <function submit_listens_handler at 0x...>
+
     >>> router({'httpMethod': 'GET', 'path': '/listens'})
     <function get_listens_handler at 0x...>
 
@@ -132,6 +124,9 @@ def router(event: Dict) -> util.AwsHandler:
     if event['httpMethod'] == 'POST' and event['path'] == '/listens':
         return submit_listen_handler
 
+    elif event['httpMethod'] == 'POST' and event['path'] == '/listens/batch':
+        return submit_listens_handler
+
     elif event['httpMethod'] == 'GET' and event['path'] == '/listens':
         return get_listens_handler
 
@@ -0,0 +1,44 @@
+import json
+import os
+from typing import Generator
+from unittest.mock import patch
+
+import pytest
+
+from listens.delivery.aws_lambda import rest, util
+
+
+@pytest.fixture(autouse=True)  # type: ignore
+def lambda_environment() -> Generator:
+    mock_env = {
+        # no tables, so any query would fail.
+        'DATABASE_CONNECTION_STRING': 'sqlite://',
+        'SUNLIGHT_SERVICE_API_KEY': 'sunlight service api key',
+        'SPOTIFY_CLIENT_ID': 'spotify client id',
+        'SPOTIFY_CLIENT_SECRET': 'spotify client secret',
+        'LISTEN_ADDED_SNS_TOPIC': 'listen added topic arn'
+    }
+    with patch.dict(os.environ, mock_env):
+        rest.context_cache.clear()
+        rest.listen_body_cache.clear()
+        yield
+        rest.context_cache.clear()
+        rest.listen_body_cache.clear()
+
+
+class TestGetListenHandler:
+
+    @pytest.mark.parametrize('listen_id', ['abc', '0', '99999999999'])  # type: ignore
+    def test_ids_that_cant_be_listens_dont_exist(self, listen_id: str) -> None:
+        # Given
+        config = util.pluck_config(os.environ)
+        db_gateway = rest.context_cache.get(config).db_gateway
+
+        # When
+        response = rest.get_listen_handler({'pathParameters': {'id': listen_id}}, {})
+
+        # Then
+        assert response['statusCode'] == 404
+        assert json.loads(response['body'])['message'] == \
+            f'Listen with id {listen_id} doesnt exist.'
+        assert rest.context_cache.get(config).db_gateway is db_gateway
@@ -1,17 +1,59 @@
+import base64
+import binascii
+import hashlib
 import json
+import math
 from datetime import datetime
 from functools import wraps
-from typing import Dict, NamedTuple, Optional
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
 
-from listens.context import Context
-from listens.definitions import Listen, ListenInput, MusicProvider, SortOrder, exceptions
-from listens.delivery.aws_lambda.types import AwsHandler
-from listens.gateways import (
-  SnsNotificationGateway,
-  SpotifyGateway,
-  SqlAlchemyDbGateway,
-  SunlightServiceGateway
+from listens.definitions import (
+    Listen,
+    ListenCursor,
+    ListenInput,
+    MusicProvider,
+    SortOrder,
+    SubmissionResult,
+    exceptions
 )
+from listens.delivery.aws_lambda.types import AwsHandler
+
+
+# a year, the longest max-age caches are expected to honor.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# the length of SqlIdempotencyKey.idempotency_key.
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+class LambdaConfig(NamedTuple):
+    database_connection_string: str
+    sunlight_service_api_key: str
+    spotify_client_id: str
+    spotify_client_secret: str
+    listen_added_topic_arn: str
+    song_cache_path: Optional[str] = None
+    notification_outbox_path: Optional[str] = None
+    sunlight_engine: str = 'service'
+    # a lambda container serves one request at a time, so it only needs a connection or two.
+    database_pool_size: int = 1
+    database_external_pooler: bool = False
+    # how many of the latest listens each container keeps in memory. off (0) by default: a
+    # container that serves a page of listens now and then would reload the whole ring for it.
+    recent_listens_capacity: int = 0
+    # how long listens added by other containers can be missing from pages of the latest listens.
+    recent_listens_max_age_seconds: float = 10
+    # where to send timings and counts: 'none', or 'emf' for cloudwatch embedded metric format.
+    metrics: str = 'none'
+    # requests per second each container allows itself to make to spotify. 0 turns it off.
+    spotify_rate_limit: float = 10
+    # how many lookups each container runs alongside the requests that started them.
+    max_concurrent_lookups: int = 4
+
+
+class CachedListenBody(NamedTuple):
+    body: str
+    etag: str
 
 
 class GetListensParams(NamedTuple):
@@ -19,25 +61,38 @@ class GetListensParams(NamedTuple):
     sort_order: SortOrder
     before_utc: Optional[datetime] = None
     after_utc: Optional[datetime] = None
+    cursor: Optional[ListenCursor] = None
+    listener_name: Optional[str] = None
+    song_id: Optional[str] = None
 
 
-def create_default_context(db_connection_string: str,
-                           sunlight_service_api_key: str,
-                           spotify_client_id: str,
-                           spotify_client_secret: str,
-                           listen_added_topic_arn: str) -> Context:
-    return Context(
-        db_gateway=SqlAlchemyDbGateway(db_connection_string),
-        music_gateway=SpotifyGateway(
-            client_id=spotify_client_id,
-            client_secret=spotify_client_secret
-        ),
-        notification_gateway=SnsNotificationGateway(listen_added_topic_arn),
-        sunlight_gateway=SunlightServiceGateway(sunlight_service_api_key)
+def pluck_config(environ: Mapping[str, str]) -> LambdaConfig:
+    return LambdaConfig(
+        database_connection_string=environ['DATABASE_CONNECTION_STRING'],
+        sunlight_service_api_key=environ['SUNLIGHT_SERVICE_API_KEY'],
+        spotify_client_id=environ['SPOTIFY_CLIENT_ID'],
+        spotify_client_secret=environ['SPOTIFY_CLIENT_SECRET'],
+        listen_added_topic_arn=environ['LISTEN_ADDED_SNS_TOPIC'],
+        song_cache_path=environ.get('SONG_CACHE_PATH'),
+        notification_outbox_path=environ.get('NOTIFICATION_OUTBOX_PATH'),
+        sunlight_engine=environ.get('SUNLIGHT_ENGINE', 'service'),
+        database_pool_size=int(environ.get('DATABASE_POOL_SIZE', 1)),
+        database_external_pooler=environ.get('DATABASE_EXTERNAL_POOLER', '').lower() == 'true',
+        recent_listens_capacity=int(environ.get('RECENT_LISTENS_CAPACITY', 0)),
+        recent_listens_max_age_seconds=float(environ.get('RECENT_LISTENS_MAX_AGE_SECONDS', 10)),
+        metrics=environ.get('METRICS', 'none'),
+        spotify_rate_limit=float(environ.get('SPOTIFY_RATE_LIMIT', 10)),
+        max_concurrent_lookups=int(environ.get('MAX_CONCURRENT_LOOKUPS', 4))
     )
 
 
 def pluck_get_listens_params(query_string_parameters: Dict[str, str]) -> GetListensParams:
+    """Pluck the parameters of a page of listens from a query string.
+
+    >>> params = pluck_get_listens_params({'listener_name': 'Zach', 'sort_order': 'descending'})
+    >>> params.listener_name, params.song_id, params.sort_order
+    ('Zach', None, <SortOrder.DESCENDING: 1>)
+    """
     limit = int(query_string_parameters.get('limit', 20))
     sort_order = SortOrder[query_string_parameters.get('sort_order', 'ascending').upper()]
     before_utc: Optional[datetime] = None
@@ -46,7 +101,41 @@ def pluck_get_listens_params(query_string_parameters: Dict[str, str]) -> GetList
     after_utc: Optional[datetime] = None
     if 'after_utc' in query_string_parameters:
         after_utc = _pluck_datetime(query_string_parameters['after_utc'])
-    return GetListensParams(limit, sort_order, before_utc, after_utc)
+    cursor: Optional[ListenCursor] = None
+    if 'cursor' in query_string_parameters:
+        cursor = pluck_cursor(query_string_parameters['cursor'])
+    listener_name = query_string_parameters.get('listener_name')
+    song_id = query_string_parameters.get('song_id')
+    return GetListensParams(limit, sort_order, before_utc, after_utc, cursor, listener_name,
+                            song_id)
+
+
+def pluck_cursor(raw_cursor: str) -> ListenCursor:
+    """Decode an opaque cursor made by `build_cursor`.
+
+    >>> pluck_cursor('WyIyMDE4LTExLTEyVDE1OjMwOjAwIiwgIjEiXQ')
+    ListenCursor(listen_time_utc=datetime.datetime(2018, 11, 12, 15, 30), id='1')
+    """
+    try:
+        padding = '=' * (-len(raw_cursor) % 4)
+        raw_listen_time_utc, listen_id = json.loads(base64.urlsafe_b64decode(raw_cursor + padding))
+        return ListenCursor(
+            listen_time_utc=_pluck_datetime(raw_listen_time_utc),
+            id=str(int(listen_id))
+        )
+    except (binascii.Error, TypeError, ValueError):
+        raise exceptions.InvalidCursorError(f'Invalid cursor {raw_cursor}.')
+
+
+def build_cursor(listen: Listen) -> str:
+    """Encode the position of `listen` as an opaque, url safe cursor.
+
+    >>> listen_time_utc = datetime(2018, 11, 12, 15, 30)
+    >>> build_cursor(Listen('1', '', MusicProvider.SPOTIFY, '', listen_time_utc, None, ''))
+    'WyIyMDE4LTExLTEyVDE1OjMwOjAwIiwgIjEiXQ'
+    """
+    raw_cursor = json.dumps([listen.listen_time_utc.isoformat(), listen.id])
+    return base64.urlsafe_b64encode(raw_cursor.encode()).decode().rstrip('=')
 
 
 def _pluck_datetime(dt_str: str) -> datetime:
@@ -65,6 +154,65 @@ def build_listen(listen: Listen) -> Dict:
     }
 
 
+def build_cached_listen_body(listen: Listen) -> CachedListenBody:
+    """Serialize a listen along with a strong etag of its body. Listens are never changed once
+    they are added, so the body of a listen id can be cached, by us and by clients, forever."""
+    body = json.dumps(build_listen(listen))
+    return CachedListenBody(body, f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"')
+
+
+def build_cached_listen_response(cached_listen_body: CachedListenBody,
+                                 request_headers: Optional[Mapping[str, str]]) -> Dict:
+    """A response with the cached body, or an empty 304 if the request's If-None-Match already
+    has it."""
+    headers = {'ETag': cached_listen_body.etag, 'Cache-Control': IMMUTABLE_CACHE_CONTROL}
+    if etag_matches(_pluck_header(request_headers or {}, 'If-None-Match'), cached_listen_body.etag):
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+
+    return {
+        'statusCode': 200,
+        'headers': {**headers, 'Content-Type': 'application/json'},
+        'body': cached_listen_body.body
+    }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag`, using the weak comparison http specifies
+    for If-None-Match.
+
+    >>> etag_matches('"a1", W/"b2"', '"b2"'), etag_matches('*', '"b2"')
+    (True, True)
+
+    >>> etag_matches('"a1"', '"b2"'), etag_matches(None, '"b2"')
+    (False, False)
+    """
+    if not if_none_match:
+        return False
+
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or any(
+        (candidate[2:] if candidate.startswith('W/') else candidate) == etag
+        for candidate in candidates
+    )
+
+
+def _pluck_header(headers: Mapping[str, str], name: str) -> Optional[str]:
+    # api gateway passes headers through with the case the client sent them in.
+    return next((value for key, value in headers.items() if key.lower() == name.lower()), None)
+
+
+def build_listens_page(listens: List[Listen], limit: int) -> Dict:
+    # a full page may be followed by more listens. a short page is the last.
+    next_cursor = None
+    if listens and len(listens) == limit:
+        next_cursor = build_cursor(listens[-1])
+
+    return {
+        'items': [build_listen(listen) for listen in listens],
+        'next_cursor': next_cursor
+    }
+
+
 def pluck_listen_input(raw_listen_input: Dict, current_time_utc: datetime) -> ListenInput:
     return ListenInput(
         song_id=raw_listen_input['song_id'],
@@ -76,36 +224,107 @@ def pluck_listen_input(raw_listen_input: Dict, current_time_utc: datetime) -> Li
     )
 
 
+def pluck_idempotency_key(request_headers: Optional[Mapping[str, str]]) -> Optional[str]:
+    """Pluck a request's Idempotency-Key header, if it has one.
+
+    >>> pluck_idempotency_key({'idempotency-key': '8e03978e-40d5-43e8-bc93-6894a57f9324'})
+    '8e03978e-40d5-43e8-bc93-6894a57f9324'
+    """
+    idempotency_key = _pluck_header(request_headers or {}, 'Idempotency-Key')
+    if idempotency_key is None:
+        return None
+
+    if not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise exceptions.InvalidIdempotencyKeyError(
+            f'Idempotency keys must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters long.'
+        )
+    return idempotency_key
+
+
+def pluck_listen_inputs(raw_batch: Dict, current_time_utc: datetime) -> List[ListenInput]:
+    """Pluck the listen inputs of a batch. Unlike a single submission, listens imported from
+    elsewhere may carry their own `listen_time_utc`."""
+    return [
+        pluck_listen_input(
+            raw_listen_input,
+            _pluck_datetime(raw_listen_input['listen_time_utc'])
+            if raw_listen_input.get('listen_time_utc') else current_time_utc
+        )
+        for raw_listen_input in raw_batch['items']
+    ]
+
+
+def build_submission_result(submission_result: SubmissionResult) -> Dict:
+    if submission_result.listen:
+        return {'status': 200, 'listen': build_listen(submission_result.listen)}
+
+    if not submission_result.error:
+        raise ValueError('A submission result has neither a listen nor an error.')
+
+    error = build_error(submission_result.error)
+    if not error:
+        raise submission_result.error
+    status_code, body = error
+    return {'status': status_code, **body}
+
+
+def build_error(e: exceptions.ListensServiceException) -> Optional[Tuple[int, Dict]]:
+    """Return the http status code and body of an expected listens service error, or None if the
+    error is unexpected."""
+    if isinstance(e, (exceptions.InvalidIanaTimezoneError,
+                      exceptions.InvalidSongError,
+                      exceptions.InvalidCursorError,
+                      exceptions.InvalidIdempotencyKeyError,
+                      exceptions.BatchTooLargeError)):
+        return 400, {'message': str(e)}
+
+    elif isinstance(e, exceptions.IdempotencyKeyReusedError):
+        return 422, {'message': str(e)}
+
+    elif isinstance(e, exceptions.SunlightError):
+        return 428, {'message': str(e)}
+
+    elif isinstance(e, exceptions.ListenDoesntExistError):
+        return 404, {'message': str(e)}
+
+    elif isinstance(e, exceptions.InvalidListenInputError):
+        return 400, {'message': 'Invalid listen input.', 'invalid_fields': e.args[0]}
+
+    elif isinstance(e, exceptions.SpotifyRateLimitedError):
+        return 503, {'message': 'Too busy to check songs right now. Try again shortly.'}
+
+    elif isinstance(e, exceptions.SpotifyError):
+        return 503, {'message': 'Unable to check songs right now. Try again shortly.'}
+
+    elif isinstance(e, exceptions.SunlightServiceRejectedError):
+        return 400, {'message': 'Unable to check the time of day of this listen.'}
+
+    elif isinstance(e, exceptions.SunlightServiceError):
+        return 503, {'message': 'Unable to check the time of day right now. Try again shortly.'}
+
+    else:
+        return None
+
+
 def catch_listens_service_errors(func: AwsHandler) -> AwsHandler:
 
     @wraps(func)
     def inner(event: Dict, context: Dict) -> Dict:
         try:
             return func(event, context)
-        except (exceptions.InvalidIanaTimezoneError, exceptions.InvalidSongError) as e:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'message': str(e)})
-            }
-        except exceptions.SunlightError as e:
-            return {
-                'statusCode': 428,
-                'body': json.dumps({'message': str(e)})
-            }
-        except exceptions.ListenDoesntExistError as e:
-            return {
-                'statusCode': 404,
-                'body': json.dumps({'message': str(e)})
-            }
-        except exceptions.InvalidListenInputError as e:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({
-                    'message': 'Invalid listen input.',
-                    'invalid_fields': e.args[0]
-                })
-            }
-        except Exception:
+        except Exception as e:
+            error = build_error(e) if isinstance(e, exceptions.ListensServiceException) else None
+            if error:
+                status_code, body = error
+                response = {
+                    'statusCode': status_code,
+                    'body': json.dumps(body)
+                }
+                retry_after_seconds = getattr(e, 'retry_after_seconds', None)
+                if retry_after_seconds is not None:
+                    response['headers'] = {'Retry-After': str(math.ceil(retry_after_seconds))}
+                return response
+
             import traceback
             import logging
             logger = logging.getLogger(__name__)
@@ -1,9 +1,7 @@
 from datetime import date, datetime
-from typing import cast
 
-import pytz
-
-from listens.definitions import SunlightWindow, exceptions
+from listens.definitions import SunlightWindow
+from listens.entities import timezone as timezone_entity
 
 
 def is_day(datetime_utc: datetime, sunlight_window: SunlightWindow) -> bool:
@@ -20,12 +18,13 @@ def local_date(datetime_utc: datetime, iana_timezone: str) -> date:
     # but 'ere in new york, it's still 10-7
     >>> local_date(datetime(2018, 10, 7, 23, 00, 0), 'America/New_York')
     datetime.date(2018, 10, 7)
+
+    # new york is utc-4 during daylight saving time, so 04:30 utc is already the next day,
+    >>> local_date(datetime(2018, 7, 1, 4, 30), 'America/New_York')
+    datetime.date(2018, 7, 1)
+
+    # and utc-5 outside of it, when 04:30 utc is still the day before.
+    >>> local_date(datetime(2018, 12, 1, 4, 30), 'America/New_York')
+    datetime.date(2018, 11, 30)
     """
-    # there must be a better way to do this.
-    try:
-        timezone = pytz.timezone(iana_timezone)
-    except pytz.UnknownTimeZoneError:
-        raise exceptions.InvalidIanaTimezoneError(f'{iana_timezone} is not a known iana timezone.')
-
-    local_dt = datetime_utc + timezone._utcoffset  # type: ignore
-    return cast(date, local_dt.date())
+    return timezone_entity.local_date(datetime_utc, iana_timezone)
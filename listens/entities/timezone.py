@@ -0,0 +1,79 @@
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, tzinfo
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, cast
+
+import pytz
+
+from listens.definitions import exceptions
+
+
+class TransitionTable(NamedTuple):
+    """When, in utc, each of a timezone's utc offsets took effect, oldest first. The first
+    transition is at datetime.min, so every datetime_utc falls after one of them."""
+    transition_times_utc: List[datetime]
+    utc_offsets: List[timedelta]
+
+
+@lru_cache(maxsize=None)
+def transition_table(iana_timezone: str) -> Optional[TransitionTable]:
+    """Compile the transition table of an iana_timezone, once per process.
+
+    The table is read from pytz's compiled tzfile, which isn't part of its public api. Returns None
+    if this version of pytz doesn't keep it the way we expect.
+
+    >>> table = transition_table('America/New_York')
+    >>> table.transition_times_utc[0], table.utc_offsets[0]
+    (datetime.datetime(1, 1, 1, 0, 0), datetime.timedelta(days=-1, seconds=68640))
+
+    # zones without transitions have a single offset.
+    >>> transition_table('UTC')
+    TransitionTable(transition_times_utc=[datetime.datetime(1, 1, 1, 0, 0)], utc_offsets=[datetime.timedelta(0)])
+    """  # noqa: E501
+    timezone = _pytz_timezone(iana_timezone)
+    if not isinstance(timezone, pytz.tzinfo.DstTzInfo):
+        return TransitionTable([datetime.min], [cast(timedelta, timezone.utcoffset(datetime.min))])
+
+    # pytz keeps the compiled tzfile of zones with transitions on DstTzInfo instances.
+    transition_times_utc = getattr(timezone, '_utc_transition_times', None)
+    transition_info = getattr(timezone, '_transition_info', None)
+    if (not transition_times_utc or not transition_info
+            or len(transition_times_utc) != len(transition_info)):
+        return None
+
+    try:
+        return TransitionTable(
+            transition_times_utc=[datetime.min] + list(transition_times_utc[1:]),
+            utc_offsets=[utc_offset for utc_offset, _, _ in transition_info]
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def utc_offset(datetime_utc: datetime, iana_timezone: str) -> timedelta:
+    """Return the utc offset of an iana_timezone at the specified datetime_utc.
+
+    >>> utc_offset(datetime(2018, 3, 11, 6, 59), 'America/New_York')
+    datetime.timedelta(days=-1, seconds=68400)
+
+    >>> utc_offset(datetime(2018, 3, 11, 7, 0), 'America/New_York')
+    datetime.timedelta(days=-1, seconds=72000)
+    """
+    table = transition_table(iana_timezone)
+    if not table:
+        local_datetime = pytz.utc.localize(datetime_utc).astimezone(_pytz_timezone(iana_timezone))
+        return cast(timedelta, local_datetime.utcoffset())
+
+    return table.utc_offsets[bisect_right(table.transition_times_utc, datetime_utc) - 1]
+
+
+def local_date(datetime_utc: datetime, iana_timezone: str) -> date:
+    return (datetime_utc + utc_offset(datetime_utc, iana_timezone)).date()
+
+
+def _pytz_timezone(iana_timezone: str) -> tzinfo:
+    try:
+        timezone: tzinfo = pytz.timezone(iana_timezone)
+    except pytz.UnknownTimeZoneError:
+        raise exceptions.InvalidIanaTimezoneError(f'{iana_timezone} is not a known iana timezone.')
+    return timezone
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+import pytest
+
+from listens.definitions import exceptions
+from listens.entities import timezone as timezone_entity
+from listens.entities.timezone import local_date, transition_table, utc_offset
+
+IANA_TIMEZONES = [
+    'America/New_York',
+    'America/Los_Angeles',
+    'Europe/London',
+    'Europe/Berlin',
+    'Australia/Sydney',
+    'Australia/Lord_Howe',
+    'Pacific/Chatham',
+    'Asia/Kolkata',
+    'Asia/Tokyo',
+    'UTC'
+]
+
+
+class TestUtcOffset:
+
+    @pytest.mark.parametrize('datetime_utc, iana_timezone, expected_offset', [  # type: ignore
+        (datetime(2018, 3, 11, 6, 59, 59), 'America/New_York', timedelta(hours=-5)),
+        (datetime(2018, 3, 11, 7), 'America/New_York', timedelta(hours=-4)),
+        (datetime(2018, 11, 4, 5, 59, 59), 'America/New_York', timedelta(hours=-4)),
+        (datetime(2018, 11, 4, 6), 'America/New_York', timedelta(hours=-5)),
+        (datetime(2018, 3, 25, 0, 59, 59), 'Europe/London', timedelta(0)),
+        (datetime(2018, 3, 25, 1), 'Europe/London', timedelta(hours=1)),
+        (datetime(2018, 10, 28, 0, 59, 59), 'Europe/London', timedelta(hours=1)),
+        (datetime(2018, 10, 28, 1), 'Europe/London', timedelta(0)),
+        (datetime(2018, 3, 31, 15, 59, 59), 'Australia/Sydney', timedelta(hours=11)),
+        (datetime(2018, 3, 31, 16), 'Australia/Sydney', timedelta(hours=10)),
+        (datetime(2018, 10, 6, 15, 59, 59), 'Australia/Sydney', timedelta(hours=10)),
+        (datetime(2018, 10, 6, 16), 'Australia/Sydney', timedelta(hours=11)),
+        (datetime(2018, 3, 31, 14, 59, 59), 'Australia/Lord_Howe', timedelta(hours=11)),
+        (datetime(2018, 3, 31, 15), 'Australia/Lord_Howe', timedelta(hours=10, minutes=30)),
+        (datetime(2018, 3, 31, 13, 59, 59), 'Pacific/Chatham', timedelta(hours=13, minutes=45)),
+        (datetime(2018, 3, 31, 14), 'Pacific/Chatham', timedelta(hours=12, minutes=45)),
+        (datetime(2018, 6, 15, 12), 'Asia/Kolkata', timedelta(hours=5, minutes=30)),
+        (datetime(2018, 6, 15, 12), 'Asia/Tokyo', timedelta(hours=9)),
+        (datetime(2018, 6, 15, 12), 'UTC', timedelta(0))
+    ])
+    def test_known_offsets_across_dst_boundaries(self,
+                                                 datetime_utc: datetime,
+                                                 iana_timezone: str,
+                                                 expected_offset: timedelta) -> None:
+        # When
+        offset = utc_offset(datetime_utc, iana_timezone)
+
+        # Then
+        assert offset == expected_offset
+        assert local_date(datetime_utc, iana_timezone) == (datetime_utc + expected_offset).date()
+
+    @pytest.mark.parametrize('iana_timezone', IANA_TIMEZONES)  # type: ignore
+    def test_agrees_with_zoneinfo_across_dst_boundaries(self, iana_timezone: str) -> None:
+        # Given
+        zoneinfo = pytest.importorskip('zoneinfo')
+        zone = zoneinfo.ZoneInfo(iana_timezone)
+
+        for datetime_utc in boundary_datetimes_utc(iana_timezone):
+            # When
+            offset = utc_offset(datetime_utc, iana_timezone)
+
+            # Then
+            local_datetime = datetime_utc.replace(tzinfo=timezone.utc).astimezone(zone)
+            assert offset == local_datetime.utcoffset(), datetime_utc
+            assert local_date(datetime_utc, iana_timezone) == local_datetime.date()
+
+    def test_falls_back_to_pytz_without_a_transition_table(self, monkeypatch: Any) -> None:
+        # Given a pytz that doesn't keep its compiled tzfile the way we expect
+        monkeypatch.setattr(timezone_entity, 'transition_table', lambda iana_timezone: None)
+
+        # When
+        offset = utc_offset(datetime(2018, 3, 11, 7, 0), 'America/New_York')
+
+        # Then
+        assert offset == timedelta(hours=-4)
+
+    def test_raises_for_unknown_timezones(self) -> None:
+        # When / Then
+        with pytest.raises(exceptions.InvalidIanaTimezoneError):
+            utc_offset(datetime(2018, 10, 7, 23), 'America/Gotham')
+
+
+def boundary_datetimes_utc(iana_timezone: str) -> Iterator[datetime]:
+    """A second either side of each of the timezone's transitions, plus midnight and noon utc of
+    every day, from 2000 through 2030."""
+    start_utc, end_utc = datetime(2000, 1, 1), datetime(2031, 1, 1)
+
+    table = transition_table(iana_timezone)
+    assert table, iana_timezone
+    for transition_time_utc in table.transition_times_utc:
+        if start_utc <= transition_time_utc < end_utc:
+            yield transition_time_utc - timedelta(seconds=1)
+            yield transition_time_utc
+
+    datetime_utc = start_utc
+    while datetime_utc < end_utc:
+        yield datetime_utc
+        datetime_utc += timedelta(hours=12)
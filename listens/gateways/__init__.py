@@ -1,4 +1,40 @@
-from .sns_notification_gateway import SnsNotificationGateway
-from .spotify_gateway import SpotifyGateway
-from .sqlalchemy_db_gateway import SqlAlchemyDbGateway
-from .sunlight_service_gateway import SunlightServiceGateway
+# gateways are imported on first use, so that an invocation only imports the gateways (and the
+# libraries behind them) that its route needs. see PEP 562.
+import importlib
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .astronomical_sunlight_gateway import AstronomicalSunlightGateway
+    from .caching_music_gateway import CachingMusicGateway, SqliteSongExistenceStore
+    from .caching_sunlight_gateway import CachingSunlightGateway
+    from .circuit_breaking_sunlight_gateway import CircuitBreakingSunlightGateway
+    from .recent_listens_db_gateway import RecentListensDbGateway
+    from .sns_notification_gateway import SnsNotificationGateway
+    from .spotify_gateway import SpotifyGateway
+    from .sqlalchemy_db_gateway import SqlAlchemyDbGateway
+    from .sunlight_service_gateway import SunlightServiceGateway
+
+
+_MODULE_BY_NAME = {
+    'AstronomicalSunlightGateway': '.astronomical_sunlight_gateway',
+    'CachingMusicGateway': '.caching_music_gateway',
+    'SqliteSongExistenceStore': '.caching_music_gateway',
+    'CachingSunlightGateway': '.caching_sunlight_gateway',
+    'CircuitBreakingSunlightGateway': '.circuit_breaking_sunlight_gateway',
+    'RecentListensDbGateway': '.recent_listens_db_gateway',
+    'SnsNotificationGateway': '.sns_notification_gateway',
+    'SpotifyGateway': '.spotify_gateway',
+    'SqlAlchemyDbGateway': '.sqlalchemy_db_gateway',
+    'SunlightServiceGateway': '.sunlight_service_gateway'
+}
+
+__all__ = list(_MODULE_BY_NAME)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _MODULE_BY_NAME:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(_MODULE_BY_NAME[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,5 @@
+# kept out of listens.gateways, so that the lambda doesnt need httpx or asyncpg.
+from .asyncpg_db_gateway import AsyncpgDbGateway
+from .sns_notification_gateway import AsyncSnsNotificationGateway
+from .spotify_gateway import AsyncSpotifyGateway
+from .sunlight_service_gateway import AsyncSunlightServiceGateway
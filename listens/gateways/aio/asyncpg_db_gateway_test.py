@@ -0,0 +1,29 @@
+import asyncio
+from typing import Any, List
+from unittest.mock import patch
+
+from listens.gateways.aio.asyncpg_db_gateway import AsyncpgDbGateway
+
+
+class TestAsyncpgDbGateway:
+
+    def test_opens_one_pool_for_concurrent_first_requests(self) -> None:
+        # Given
+        gateway = AsyncpgDbGateway('postgresql+psycopg2://zach@localhost/listens')
+        created_dsns: List[str] = []
+
+        async def create_pool(dsn: str, **kwargs: Any) -> object:
+            created_dsns.append(dsn)
+            await asyncio.sleep(0.01)
+            return object()
+
+        # When
+        async def open_pools() -> List[object]:
+            return list(await asyncio.gather(*[gateway._connection_pool() for _ in range(3)]))
+
+        with patch('asyncpg.create_pool', create_pool):
+            pools = asyncio.run(open_pools())
+
+        # Then
+        assert created_dsns == ['postgresql://zach@localhost/listens']
+        assert pools[0] is pools[1] is pools[2]
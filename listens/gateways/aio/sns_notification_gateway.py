@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from typing import Optional
+
+from listens.abc import AsyncNotificationGateway as AsyncNotificationGatewayABC
+from listens.definitions import Listen
+from listens.gateways.sns_notification_gateway import SnsNotificationGateway
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSnsNotificationGateway(AsyncNotificationGatewayABC):
+    """Announces listens through an SnsNotificationGateway's background publisher.
+
+    Queueing an announcement never blocks, so it happens inline. Only `flush`, which waits on sns,
+    runs in the event loop's default executor.
+
+    A long-running server has no invocation to flush after, so once the first announcement is
+    queued the outbox is flushed every `flush_interval_seconds`, until `aclose`.
+    """
+
+    def __init__(self,
+                 sns_notification_gateway: SnsNotificationGateway,
+                 flush_interval_seconds: float = 30) -> None:
+        self.sns_notification_gateway = sns_notification_gateway
+        self.flush_interval_seconds = flush_interval_seconds
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def announce_listen_added(self, listen: Listen) -> None:
+        self.sns_notification_gateway.announce_listen_added(listen)
+        if not self._flush_task:
+            self._flush_task = asyncio.ensure_future(self._flush_periodically())
+
+    async def flush(self) -> None:
+        """Not part of the AsyncNotificationGatewayABC."""
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.sns_notification_gateway.flush)
+
+    async def aclose(self) -> None:
+        """Not part of the AsyncNotificationGatewayABC.
+
+        Stop flushing periodically, and flush one last time.
+        """
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception('Unable to flush listen announcements.')
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Generator
+from unittest.mock import patch
+
+import pytest
+
+from features.fixtures.sns import LocalSnsClient
+
+from listens.gateways.aio.sns_notification_gateway import AsyncSnsNotificationGateway
+from listens.gateways.sns_notification_gateway import SnsNotificationGateway
+from listens.gateways.sns_notification_gateway_test import (
+    TOPIC_ARN,
+    listen_factory,
+    published_listen_ids
+)
+
+
+@pytest.fixture  # type: ignore
+def local_sns_client() -> Generator:
+    local_sns_client = LocalSnsClient()
+    with patch.object(SnsNotificationGateway, 'client', local_sns_client):
+        yield local_sns_client
+
+
+class TestAsyncSnsNotificationGateway:
+
+    def test_replays_the_outbox_periodically(self, local_sns_client: LocalSnsClient) -> None:
+        # Given an announcement that sns rejected once
+        gateway = AsyncSnsNotificationGateway(
+            SnsNotificationGateway(TOPIC_ARN, max_attempts=1, sleep=lambda _: None),
+            flush_interval_seconds=0.01
+        )
+        local_sns_client.fail_next_calls = 1
+
+        # When
+        async def announce_and_wait() -> None:
+            await gateway.announce_listen_added(listen_factory('1'))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if published_listen_ids(local_sns_client):
+                    break
+            await gateway.aclose()
+
+        asyncio.run(announce_and_wait())
+
+        # Then
+        assert published_listen_ids(local_sns_client) == ['1']
+        assert gateway.sns_notification_gateway.outbox_size() == 0
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Callable, Optional
+
+import httpx
+
+from listens.abc import AsyncMusicGateway as AsyncMusicGatewayABC
+from listens.definitions import MusicProvider
+from listens.definitions.exceptions import SpotifyError
+from listens.gateways.spotify_gateway import SpotifyGateway, SpotifyToken, SpotifyTokenManager
+
+
+class AsyncSpotifyGateway(AsyncMusicGatewayABC):
+    base_url = SpotifyGateway.base_url
+
+    def __init__(self,
+                 client_id: str,
+                 client_secret: str,
+                 client: Optional[httpx.AsyncClient] = None) -> None:
+        self.client = client or httpx.AsyncClient()
+        self.token_manager = AsyncSpotifyTokenManager(client_id, client_secret, self.client)
+
+    async def song_exists(self,
+                          song_id: str,
+                          song_provider: MusicProvider = MusicProvider.SPOTIFY) -> bool:
+        bearer_token = await self.token_manager.bearer_token()
+        r = await self._get_track(song_id, bearer_token)
+
+        if r.status_code == httpx.codes.UNAUTHORIZED:
+            # our token may have been revoked early. try once more with a fresh one.
+            self.token_manager.invalidate(bearer_token)
+            r = await self._get_track(song_id, await self.token_manager.bearer_token())
+
+        if r.status_code == httpx.codes.OK:
+            return True
+
+        elif r.status_code in (httpx.codes.BAD_REQUEST, httpx.codes.NOT_FOUND):
+            return False
+
+        else:
+            raise SpotifyError(f'Unexpected error code from spotify. "{r.status_code}: {r.text}"')
+
+    async def _get_track(self, song_id: str, bearer_token: str) -> httpx.Response:
+        return await self.client.get(f'{self.base_url}/tracks/{song_id}',
+                                     headers={'Authorization': f'Bearer {bearer_token}'})
+
+    async def aclose(self) -> None:
+        """Not part of the AsyncMusicGatewayABC."""
+        await self.client.aclose()
+
+
+class AsyncSpotifyTokenManager:
+    """The asyncio counterpart of SpotifyTokenManager. Only one task fetches a token at a time;
+    concurrent callers wait for its result.
+    """
+    auth_url = SpotifyTokenManager.auth_url
+    default_expires_in = SpotifyTokenManager.default_expires_in
+    refresh_margin_seconds = SpotifyTokenManager.refresh_margin_seconds
+
+    def __init__(self,
+                 client_id: str,
+                 client_secret: str,
+                 client: httpx.AsyncClient,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.client = client
+        self.clock = clock
+        self._token: Optional[SpotifyToken] = None
+        # created on first use, so that it belongs to the running event loop.
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def bearer_token(self) -> str:
+        token = self._token
+        if token and not self._needs_refresh(token):
+            return token.access_token
+
+        if not self._lock:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            # another task may have refreshed the token while we waited on the lock.
+            token = self._token
+            if not token or self._needs_refresh(token):
+                token = await self._fetch_token()
+                self._token = token
+
+        return token.access_token
+
+    def invalidate(self, bearer_token: str) -> None:
+        """Forget `bearer_token`, unless it has already been replaced by a newer token."""
+        if self._token and self._token.access_token == bearer_token:
+            self._token = None
+
+    def _needs_refresh(self, token: SpotifyToken) -> bool:
+        return self.clock() >= token.expires_at - self.refresh_margin_seconds
+
+    async def _fetch_token(self) -> SpotifyToken:
+        requested_at = self.clock()
+        r = await self.client.post(
+            self.auth_url,
+            auth=(self.client_id, self.client_secret),
+            data={'grant_type': 'client_credentials'}
+        )
+
+        if not r.status_code == httpx.codes.OK:
+            raise SpotifyError(f'Unexpected error code from spotify. "{r.status_code}: {r.text}"')
+
+        raw_token = r.json()
+        return SpotifyToken(
+            access_token=raw_token['access_token'],
+            expires_at=requested_at + raw_token.get('expires_in', self.default_expires_in)
+        )
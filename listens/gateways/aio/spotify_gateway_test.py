@@ -0,0 +1,65 @@
+import asyncio
+from typing import List
+
+import httpx
+
+from listens.gateways.aio.spotify_gateway import AsyncSpotifyGateway
+
+
+AUTH_URL = 'https://accounts.spotify.com/api/token'
+TRACK_URL = 'https://api.spotify.com/v1/tracks/4rNGLh1y5Kkvr4bT28yfHU'
+
+
+class FakeSpotify:
+
+    def __init__(self, *track_statuses: int) -> None:
+        self.track_statuses = list(track_statuses)
+        self.requests: List[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if str(request.url) == AUTH_URL:
+            return httpx.Response(200, json={'access_token': f'token {len(self.requests)}'})
+        return httpx.Response(self.track_statuses.pop(0))
+
+
+class TestAsyncSpotifyGateway:
+
+    def test_fetches_one_token_for_concurrent_lookups(self) -> None:
+        # Given
+        fake_spotify = FakeSpotify(200, 200, 404)
+        gateway = AsyncSpotifyGateway(
+            'client id',
+            'client secret',
+            client=httpx.AsyncClient(transport=httpx.MockTransport(fake_spotify))
+        )
+
+        # When
+        async def look_up_songs() -> List[bool]:
+            return list(await asyncio.gather(*[
+                gateway.song_exists('4rNGLh1y5Kkvr4bT28yfHU') for _ in range(3)
+            ]))
+
+        songs_exist = asyncio.run(look_up_songs())
+
+        # Then
+        assert sorted(songs_exist) == [False, True, True]
+        assert [str(request.url) for request in fake_spotify.requests].count(AUTH_URL) == 1
+
+    def test_retries_once_with_a_new_token_on_unauthorized(self) -> None:
+        # Given
+        fake_spotify = FakeSpotify(401, 200)
+        gateway = AsyncSpotifyGateway(
+            'client id',
+            'client secret',
+            client=httpx.AsyncClient(transport=httpx.MockTransport(fake_spotify))
+        )
+
+        # When
+        song_exists = asyncio.run(gateway.song_exists('4rNGLh1y5Kkvr4bT28yfHU'))
+
+        # Then
+        assert song_exists
+        assert [request.method for request in fake_spotify.requests] == [
+            'POST', 'GET', 'POST', 'GET'
+        ]
@@ -0,0 +1,43 @@
+from datetime import date
+from typing import Optional
+
+import httpx
+
+from listens.abc import AsyncSunlightGateway as AsyncSunlightGatewayABC
+from listens.definitions import SunlightWindow
+from listens.gateways.sunlight_service_gateway import (
+    SunlightServiceGateway,
+    build_sunlight_service_error,
+    pluck_sunlight_window
+)
+
+
+class AsyncSunlightServiceGateway(AsyncSunlightGatewayABC):
+    endpoint = SunlightServiceGateway.endpoint
+
+    def __init__(self, api_key: str, client: Optional[httpx.AsyncClient] = None) -> None:
+        self.api_key = api_key
+        self.client = client or httpx.AsyncClient()
+
+    async def fetch_sunlight_window(self, iana_timezone: str, on_date: date) -> SunlightWindow:
+        r = await self.client.get(
+            self.endpoint,
+            params={
+                'iana_timezone': iana_timezone,
+                'on_date': on_date.isoformat()
+            },
+            headers={'x-api-key': self.api_key}
+        )
+
+        if not r.status_code == httpx.codes.OK:
+            try:
+                message = r.json()['message']
+            except (KeyError, ValueError):
+                message = ''
+            raise build_sunlight_service_error(r.status_code, message)
+
+        return pluck_sunlight_window(r.json())
+
+    async def aclose(self) -> None:
+        """Not part of the AsyncSunlightGatewayABC."""
+        await self.client.aclose()
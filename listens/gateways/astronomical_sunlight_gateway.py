@@ -0,0 +1,245 @@
+import logging
+import math
+import re
+from array import array
+from datetime import date, datetime, timedelta, tzinfo
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import pytz
+
+from listens.abc import SunlightGateway as SunlightGatewayABC
+from listens.definitions import SunlightWindow, exceptions
+
+
+logger = logging.getLogger(__name__)
+
+Coordinates = Tuple[float, float]
+
+# the sun's center is 0.833 degrees below the horizon at sunrise and sunset, due to refraction
+# and the radius of the sun's disc.
+SUNRISE_ZENITH = 90.833
+
+
+class AstronomicalSunlightGateway(SunlightGatewayABC):
+    """Computes sunlight windows locally with NOAA's solar position algorithm, from the
+    representative coordinates the tz database lists for each timezone.
+
+    The windows of a timezone are precomputed a year at a time into a compact array of second
+    offsets from utc midnight, so lookups after the first are a couple of array reads. Timezones
+    without coordinates (e.g. 'UTC' or links like 'US/Eastern') are delegated to `fallback`.
+
+    If `verify_with` is given, every lookup is also made against that gateway and disagreements
+    beyond `tolerance_seconds` are logged. The computed window is always the one returned.
+    """
+
+    def __init__(self,
+                 fallback: Optional[SunlightGatewayABC] = None,
+                 verify_with: Optional[SunlightGatewayABC] = None,
+                 tolerance_seconds: int = 120) -> None:
+        self.fallback = fallback
+        self.verify_with = verify_with
+        self.tolerance_seconds = tolerance_seconds
+        self._windows_by_year: Dict[Tuple[str, int], array] = {}
+
+    def fetch_sunlight_window(self, iana_timezone: str, on_date: date) -> SunlightWindow:
+        coordinates = timezone_coordinates().get(iana_timezone)
+        if not coordinates:
+            if self.fallback:
+                return self.fallback.fetch_sunlight_window(iana_timezone, on_date)
+            raise exceptions.SunlightServiceError(f'No coordinates known for {iana_timezone}.')
+
+        key = (iana_timezone, on_date.year)
+        windows = self._windows_by_year.get(key)
+        if windows is None:
+            windows = precompute_year(coordinates, on_date.year, pytz.timezone(iana_timezone))
+            self._windows_by_year[key] = windows
+
+        day_index = on_date.timetuple().tm_yday - 1
+        utc_midnight = datetime(on_date.year, on_date.month, on_date.day)
+        sunlight_window = SunlightWindow(
+            sunrise_utc=utc_midnight + timedelta(seconds=windows[2 * day_index]),
+            sunset_utc=utc_midnight + timedelta(seconds=windows[2 * day_index + 1])
+        )
+
+        if self.verify_with:
+            self._verify(iana_timezone, on_date, sunlight_window)
+
+        return sunlight_window
+
+    def _verify(self, iana_timezone: str, on_date: date, sunlight_window: SunlightWindow) -> None:
+        assert self.verify_with
+        try:
+            expected_window = self.verify_with.fetch_sunlight_window(iana_timezone, on_date)
+        except exceptions.SunlightServiceError:
+            logger.exception(f'Unable to verify sunlight window of {iana_timezone} on {on_date}.')
+            return
+
+        drift_seconds = max(
+            abs((sunlight_window.sunrise_utc - expected_window.sunrise_utc).total_seconds()),
+            abs((sunlight_window.sunset_utc - expected_window.sunset_utc).total_seconds())
+        )
+        if drift_seconds > self.tolerance_seconds:
+            logger.warning(
+                f'Computed sunlight window of {iana_timezone} on {on_date} is off by '
+                f'{drift_seconds:.0f}s. computed: {sunlight_window}, expected: {expected_window}.'
+            )
+
+
+def precompute_year(coordinates: Coordinates, year: int, timezone: tzinfo = pytz.utc) -> array:
+    """Return the sunrise and sunset of every local day of `year` in `timezone` at `coordinates`,
+    flattened into an array of [sunrise_0, sunset_0, sunrise_1, sunset_1, ...] second offsets
+    from utc midnight of each date.
+    """
+    latitude, longitude = coordinates
+    windows = array('i')
+    on_date = date(year, 1, 1)
+    while on_date.year == year:
+        local_noon = datetime(on_date.year, on_date.month, on_date.day, 12)
+        utc_offset = timezone.utcoffset(local_noon) or timedelta()
+        sunrise_seconds, sunset_seconds = sunlight_seconds(
+            on_date,
+            latitude,
+            longitude,
+            utc_offset_minutes=utc_offset.total_seconds() / 60
+        )
+        windows.append(sunrise_seconds)
+        windows.append(sunset_seconds)
+        on_date += timedelta(days=1)
+    return windows
+
+
+def sunlight_seconds(on_date: date,
+                     latitude: float,
+                     longitude: float,
+                     utc_offset_minutes: float = 0) -> Tuple[int, int]:
+    """Return the sunrise and sunset on `on_date` as second offsets from that date's utc midnight.
+
+    `on_date` is the local date of a timezone `utc_offset_minutes` ahead of utc, so the window
+    returned is the one around that timezone's local noon. Near the date line it can fall mostly
+    on the previous or next utc date.
+
+    Polar nights are returned as an empty window at solar noon, and polar days as a window of a
+    full day centered on solar noon.
+
+    >>> sunlight_seconds(date(2018, 11, 12), 40.7142, -74.0064, utc_offset_minutes=-300)
+    (41957, 78035)
+
+    # apia is west of the date line but 13 hours ahead of utc, so its day starts on the previous
+    # utc date.
+    >>> sunlight_seconds(date(2018, 6, 15), -13.8333, -171.7333, utc_offset_minutes=780)
+    (-22330, 18406)
+    """
+    sunrise_minutes = _sun_event_minutes(on_date, latitude, longitude, utc_offset_minutes,
+                                         rising=True)
+    sunset_minutes = _sun_event_minutes(on_date, latitude, longitude, utc_offset_minutes,
+                                        rising=False)
+    return round(sunrise_minutes * 60), round(sunset_minutes * 60)
+
+
+def _sun_event_minutes(on_date: date,
+                       latitude: float,
+                       longitude: float,
+                       utc_offset_minutes: float,
+                       rising: bool) -> float:
+    # julian day at utc midnight of on_date
+    julian_day = on_date.toordinal() + 1721424.5
+
+    # solar noon at the longitude recurs every 1440 minutes. use the one nearest the local noon
+    # of on_date, in minutes from utc midnight of on_date.
+    local_noon_minutes = 720 - utc_offset_minutes
+    day_shift_minutes = 1440 * round((local_noon_minutes - (720 - 4 * longitude)) / 1440)
+
+    # first approximate the event at local solar noon, then refine it at the approximate event.
+    event_minutes = 720 - 4 * longitude + day_shift_minutes
+    for _ in range(2):
+        julian_century = (julian_day + event_minutes / 1440 - 2451545) / 36525
+        equation_of_time, declination = _solar_position(julian_century)
+        hour_angle = _sunrise_hour_angle(latitude, declination)
+        solar_noon_minutes = 720 - 4 * longitude - equation_of_time + day_shift_minutes
+        if rising:
+            event_minutes = solar_noon_minutes - 4 * hour_angle
+        else:
+            event_minutes = solar_noon_minutes + 4 * hour_angle
+    return event_minutes
+
+
+def _solar_position(julian_century: float) -> Tuple[float, float]:
+    """Return the equation of time (in minutes) and the sun's declination (in degrees)."""
+    t = julian_century
+    geom_mean_long = math.radians((280.46646 + t * (36000.76983 + t * 0.0003032)) % 360)
+    geom_mean_anomaly = math.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+    eccentricity = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+
+    equation_of_center = math.radians(
+        math.sin(geom_mean_anomaly) * (1.914602 - t * (0.004817 + 0.000014 * t))
+        + math.sin(2 * geom_mean_anomaly) * (0.019993 - 0.000101 * t)
+        + math.sin(3 * geom_mean_anomaly) * 0.000289
+    )
+    true_long = geom_mean_long + equation_of_center
+    omega = math.radians(125.04 - 1934.136 * t)
+    apparent_long = true_long - math.radians(0.00569 + 0.00478 * math.sin(omega))
+
+    mean_obliquity = 23 + (26 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60) / 60
+    obliquity = math.radians(mean_obliquity + 0.00256 * math.cos(omega))
+    declination = math.asin(math.sin(obliquity) * math.sin(apparent_long))
+
+    y = math.tan(obliquity / 2) ** 2
+    equation_of_time = 4 * math.degrees(
+        y * math.sin(2 * geom_mean_long)
+        - 2 * eccentricity * math.sin(geom_mean_anomaly)
+        + 4 * eccentricity * y * math.sin(geom_mean_anomaly) * math.cos(2 * geom_mean_long)
+        - 0.5 * y * y * math.sin(4 * geom_mean_long)
+        - 1.25 * eccentricity * eccentricity * math.sin(2 * geom_mean_anomaly)
+    )
+    return equation_of_time, math.degrees(declination)
+
+
+def _sunrise_hour_angle(latitude: float, declination: float) -> float:
+    latitude_radians = math.radians(latitude)
+    declination_radians = math.radians(declination)
+    cos_hour_angle = (
+        math.cos(math.radians(SUNRISE_ZENITH))
+        / (math.cos(latitude_radians) * math.cos(declination_radians))
+        - math.tan(latitude_radians) * math.tan(declination_radians)
+    )
+    # the sun never rises (polar night) or never sets (polar day).
+    cos_hour_angle = min(1.0, max(-1.0, cos_hour_angle))
+    return math.degrees(math.acos(cos_hour_angle))
+
+
+@lru_cache(maxsize=1)
+def timezone_coordinates() -> Dict[str, Coordinates]:
+    """Return the (latitude, longitude) of each timezone in the tz database's zone.tab, which is
+    bundled with pytz.
+    """
+    coordinates_by_timezone: Dict[str, Coordinates] = {}
+    with pytz.open_resource('zone.tab') as zone_tab:
+        for raw_line in zone_tab:
+            line = raw_line.decode('utf-8')
+            if line.startswith('#'):
+                continue
+            _, raw_coordinates, iana_timezone = line.rstrip('\n').split('\t')[:3]
+            coordinates_by_timezone[iana_timezone] = _pluck_coordinates(raw_coordinates)
+    return coordinates_by_timezone
+
+
+def _pluck_coordinates(raw_coordinates: str) -> Coordinates:
+    """Parse iso 6709 coordinates as written in zone.tab.
+
+    >>> _pluck_coordinates('+404251-0740023')
+    (40.71416666666667, -74.00638888888889)
+    """
+    match = re.fullmatch(r'([+-]\d{4,6})([+-]\d{5,7})', raw_coordinates)
+    if not match:
+        raise ValueError(f'Invalid coordinates {raw_coordinates}.')
+    return _pluck_degrees(match.group(1), 2), _pluck_degrees(match.group(2), 3)
+
+
+def _pluck_degrees(raw_degrees: str, degree_digits: int) -> float:
+    sign = -1 if raw_degrees[0] == '-' else 1
+    digits = raw_degrees[1:]
+    degrees = int(digits[:degree_digits])
+    minutes = int(digits[degree_digits:degree_digits + 2])
+    seconds = int(digits[degree_digits + 2:] or 0)
+    return sign * (degrees + minutes / 60 + seconds / 3600)
@@ -0,0 +1,102 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any
+
+import pytest
+
+import pytz
+
+from listens.definitions import SunlightWindow, exceptions
+from listens.gateways.astronomical_sunlight_gateway import AstronomicalSunlightGateway
+from listens.testing import StubSunlightGateway
+
+
+class TestAstronomicalSunlightGateway:
+
+    @pytest.mark.parametrize('iana_timezone, on_date, expected_window', [  # type: ignore
+        pytest.param(
+            'America/New_York',
+            date(2018, 11, 12),
+            SunlightWindow(datetime(2018, 11, 12, 11, 40, 4), datetime(2018, 11, 12, 21, 40, 26)),
+            id='new york'
+        ),
+        pytest.param(
+            'Asia/Tokyo',
+            date(2018, 10, 8),
+            SunlightWindow(datetime(2018, 10, 7, 20, 41, 0), datetime(2018, 10, 8, 8, 16, 0)),
+            id='tokyo, where the sun rises on the previous utc date'
+        )
+    ])
+    def test_agrees_with_known_sunlight_windows(self,
+                                                iana_timezone: str,
+                                                on_date: date,
+                                                expected_window: SunlightWindow) -> None:
+        # When
+        sunlight_window = AstronomicalSunlightGateway().fetch_sunlight_window(
+            iana_timezone,
+            on_date
+        )
+
+        # Then
+        tolerance = timedelta(minutes=2)
+        assert abs(sunlight_window.sunrise_utc - expected_window.sunrise_utc) < tolerance
+        assert abs(sunlight_window.sunset_utc - expected_window.sunset_utc) < tolerance
+
+    @pytest.mark.parametrize('iana_timezone', [  # type: ignore
+        'Pacific/Apia',
+        'Pacific/Tongatapu',
+        'Pacific/Kiritimati'
+    ])
+    def test_windows_of_date_line_timezones_are_for_their_local_date(self,
+                                                                     iana_timezone: str) -> None:
+        # Given timezones west of 180 degrees that are 13 or 14 hours ahead of utc
+        on_date = date(2018, 6, 15)
+        local_noon = pytz.timezone(iana_timezone).localize(datetime(2018, 6, 15, 12))
+        local_noon_utc = local_noon.astimezone(pytz.utc).replace(tzinfo=None)
+
+        # When
+        sunlight_window = AstronomicalSunlightGateway().fetch_sunlight_window(
+            iana_timezone,
+            on_date
+        )
+
+        # Then
+        assert sunlight_window.sunrise_utc < local_noon_utc < sunlight_window.sunset_utc
+
+    def test_polar_night_has_no_daylight(self) -> None:
+        # When
+        sunlight_window = AstronomicalSunlightGateway().fetch_sunlight_window(
+            'Arctic/Longyearbyen',
+            date(2018, 12, 21)
+        )
+
+        # Then
+        assert sunlight_window.sunrise_utc == sunlight_window.sunset_utc
+
+    def test_delegates_timezones_without_coordinates_to_fallback(self) -> None:
+        # Given
+        fallback_window = SunlightWindow(datetime(2018, 11, 12, 6), datetime(2018, 11, 12, 18))
+        gateway = AstronomicalSunlightGateway(fallback=StubSunlightGateway(fallback_window))
+
+        # When
+        sunlight_window = gateway.fetch_sunlight_window('UTC', date(2018, 11, 12))
+
+        # Then
+        assert sunlight_window == fallback_window
+
+    def test_raises_for_timezones_without_coordinates_without_fallback(self) -> None:
+        with pytest.raises(exceptions.SunlightServiceError):
+            AstronomicalSunlightGateway().fetch_sunlight_window('UTC', date(2018, 11, 12))
+
+    def test_logs_disagreements_with_verification_gateway(self, caplog: Any) -> None:
+        # Given
+        wrong_window = SunlightWindow(datetime(2018, 11, 12, 6), datetime(2018, 11, 12, 18))
+        gateway = AstronomicalSunlightGateway(verify_with=StubSunlightGateway(wrong_window))
+
+        # When
+        with caplog.at_level(logging.WARNING):
+            sunlight_window = gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 12))
+
+        # Then the computed window is returned, but the disagreement is logged
+        assert sunlight_window != wrong_window
+        assert 'America/New_York' in caplog.text
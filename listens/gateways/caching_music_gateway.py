@@ -0,0 +1,161 @@
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from listens.abc import MusicGateway as MusicGatewayABC
+from listens.definitions import MusicProvider
+from listens.lru_cache import CacheStats, LruCache
+from listens.metrics import Metrics, NULL_METRICS
+
+
+SongKey = Tuple[str, MusicProvider]
+
+
+class SongExistenceStore(ABC):
+    """A backing store for song existence that outlives a single process."""
+
+    @abstractmethod
+    def get(self, key: SongKey) -> Optional[Tuple[bool, float]]:
+        """Return whether the song exists and the remaining seconds that answer is good for."""
+        ...
+
+    @abstractmethod
+    def set(self, key: SongKey, exists: bool, ttl_seconds: float) -> None:
+        ...
+
+
+class CachingMusicGateway(MusicGatewayABC):
+    """Wraps a MusicGateway, remembering which songs exist.
+
+    Songs that exist are remembered for `found_ttl_seconds`, and songs that don't for the (usually
+    shorter) `not_found_ttl_seconds`. Errors from the wrapped gateway are never cached.
+
+    A `cache` can be passed in to keep it across gateways, e.g. when the wrapped one is rebuilt.
+    """
+
+    def __init__(self,
+                 music_gateway: MusicGatewayABC,
+                 capacity: int = 10_000,
+                 found_ttl_seconds: float = 24 * 60 * 60,
+                 not_found_ttl_seconds: float = 60 * 60,
+                 store: Optional[SongExistenceStore] = None,
+                 metrics: Metrics = NULL_METRICS,
+                 cache: Optional[LruCache[SongKey, bool]] = None) -> None:
+        self.music_gateway = music_gateway
+        self.found_ttl_seconds = found_ttl_seconds
+        self.not_found_ttl_seconds = not_found_ttl_seconds
+        self.store = store
+        self.metrics = metrics
+        self.cache: LruCache[SongKey, bool] = cache if cache is not None else LruCache(capacity)
+
+    def song_exists(self, song_id: str, song_provider: MusicProvider) -> bool:
+        cached = self._cached(song_id, song_provider)
+        if cached is not None:
+            return cached
+
+        self.metrics.increment('song_cache.miss')
+        exists = self.music_gateway.song_exists(song_id, song_provider)
+        self._cache(song_id, song_provider, exists)
+        return exists
+
+    def songs_exist(self, song_ids: List[str], song_provider: MusicProvider) -> Dict[str, bool]:
+        songs_exist: Dict[str, bool] = {}
+        uncached_song_ids: List[str] = []
+        for song_id in dict.fromkeys(song_ids):
+            cached = self._cached(song_id, song_provider)
+            if cached is None:
+                uncached_song_ids.append(song_id)
+            else:
+                songs_exist[song_id] = cached
+
+        if uncached_song_ids:
+            self.metrics.increment('song_cache.miss', len(uncached_song_ids))
+            looked_up = self.music_gateway.songs_exist(uncached_song_ids, song_provider)
+            for song_id, exists in looked_up.items():
+                self._cache(song_id, song_provider, exists)
+            songs_exist.update(looked_up)
+
+        return songs_exist
+
+    def stats(self) -> CacheStats:
+        """Not part of the MusicGatewayABC."""
+        return self.cache.stats()
+
+    def _cached(self, song_id: str, song_provider: MusicProvider) -> Optional[bool]:
+        key = (song_id, song_provider)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.metrics.increment('song_cache.hit')
+            return cached
+
+        if self.store:
+            stored = self.store.get(key)
+            if stored is not None:
+                exists, remaining_ttl_seconds = stored
+                self.cache.set(key, exists, remaining_ttl_seconds)
+                self.metrics.increment('song_cache.hit')
+                return exists
+
+        return None
+
+    def _cache(self, song_id: str, song_provider: MusicProvider, exists: bool) -> None:
+        key = (song_id, song_provider)
+        ttl_seconds = self.found_ttl_seconds if exists else self.not_found_ttl_seconds
+        self.cache.set(key, exists, ttl_seconds)
+        if self.store:
+            self.store.set(key, exists, ttl_seconds)
+
+
+class SqliteSongExistenceStore(SongExistenceStore):
+    """Keeps song existence in a local sqlite file (e.g. on /tmp), so that it survives a
+    container restart and can be shared by processes on the same host.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.connection = sqlite3.connect(path, timeout=1, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS song_existence ('
+                'song_id TEXT NOT NULL, '
+                'song_provider TEXT NOT NULL, '
+                'song_exists INTEGER NOT NULL, '
+                'expires_at REAL NOT NULL, '
+                'PRIMARY KEY (song_id, song_provider))'
+            )
+
+    def get(self, key: SongKey) -> Optional[Tuple[bool, float]]:
+        song_id, song_provider = key
+        try:
+            with self._lock:
+                row = self.connection.execute(
+                    'SELECT song_exists, expires_at FROM song_existence '
+                    'WHERE song_id = ? AND song_provider = ?',
+                    (song_id, song_provider.name)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+
+        if not row:
+            return None
+
+        song_exists, expires_at = row
+        remaining_ttl_seconds = expires_at - time.time()
+        if remaining_ttl_seconds <= 0:
+            return None
+
+        return bool(song_exists), remaining_ttl_seconds
+
+    def set(self, key: SongKey, exists: bool, ttl_seconds: float) -> None:
+        song_id, song_provider = key
+        try:
+            with self._lock, self.connection:
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO song_existence VALUES (?, ?, ?, ?)',
+                    (song_id, song_provider.name, int(exists), time.time() + ttl_seconds)
+                )
+        except sqlite3.Error:
+            # the store is only an optimization; losing a write just costs a future lookup.
+            pass
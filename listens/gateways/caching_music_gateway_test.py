@@ -0,0 +1,95 @@
+import os
+import tempfile
+
+import pytest
+
+from listens.definitions import MusicProvider
+from listens.definitions.exceptions import SpotifyError
+from listens.gateways.caching_music_gateway import CachingMusicGateway, SqliteSongExistenceStore
+from listens.testing import FakeClock, StubMusicGateway
+
+
+class TestCachingMusicGateway:
+
+    def test_caches_found_and_not_found_songs_with_separate_ttls(self) -> None:
+        # Given
+        stub_gateway = StubMusicGateway('found')
+        gateway = CachingMusicGateway(stub_gateway, found_ttl_seconds=100, not_found_ttl_seconds=10)
+        clock = FakeClock()
+        gateway.cache.clock = clock
+        gateway.song_exists('found', MusicProvider.SPOTIFY)
+        gateway.song_exists('missing', MusicProvider.SPOTIFY)
+
+        # When
+        clock.now = 50
+        gateway.song_exists('found', MusicProvider.SPOTIFY)
+        gateway.song_exists('missing', MusicProvider.SPOTIFY)
+
+        # Then only the not found song was looked up again
+        assert stub_gateway.lookups == ['found', 'missing', 'missing']
+        assert gateway.stats().hits == 1
+
+    def test_evicts_least_recently_used_songs_past_capacity(self) -> None:
+        # Given
+        stub_gateway = StubMusicGateway('a', 'b', 'c')
+        gateway = CachingMusicGateway(stub_gateway, capacity=2)
+        for song_id in ('a', 'b', 'a', 'c'):
+            gateway.song_exists(song_id, MusicProvider.SPOTIFY)
+
+        # When
+        gateway.song_exists('b', MusicProvider.SPOTIFY)
+
+        # Then
+        assert stub_gateway.lookups == ['a', 'b', 'c', 'b']
+        assert gateway.stats().evictions == 2
+
+    def test_only_looks_up_uncached_songs_of_a_batch(self) -> None:
+        # Given
+        stub_gateway = StubMusicGateway('a', 'c')
+        gateway = CachingMusicGateway(stub_gateway)
+        gateway.song_exists('a', MusicProvider.SPOTIFY)
+
+        # When
+        songs_exist = gateway.songs_exist(['a', 'b', 'c', 'b'], MusicProvider.SPOTIFY)
+
+        # Then
+        assert songs_exist == {'a': True, 'b': False, 'c': True}
+        assert stub_gateway.batch_lookups == [['b', 'c']]
+        assert gateway.songs_exist(['b', 'c'], MusicProvider.SPOTIFY) == {'b': False, 'c': True}
+        assert len(stub_gateway.batch_lookups) == 1
+
+    def test_doesnt_cache_errors(self) -> None:
+        # Given
+        stub_gateway = StubMusicGateway('a')
+        stub_gateway.error = SpotifyError('503: try again later')
+        gateway = CachingMusicGateway(stub_gateway)
+        with pytest.raises(SpotifyError):
+            gateway.song_exists('a', MusicProvider.SPOTIFY)
+
+        # When
+        stub_gateway.error = None
+        song_exists = gateway.song_exists('a', MusicProvider.SPOTIFY)
+
+        # Then
+        assert song_exists
+        assert stub_gateway.lookups == ['a', 'a']
+
+    def test_sqlite_store_outlives_the_in_memory_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            # Given a song was looked up by a gateway in a previous container
+            path = os.path.join(directory, 'song-cache.sqlite3')
+            CachingMusicGateway(
+                StubMusicGateway('a'),
+                store=SqliteSongExistenceStore(path)
+            ).song_exists('a', MusicProvider.SPOTIFY)
+
+            # When
+            stub_gateway = StubMusicGateway('a')
+            song_exists = CachingMusicGateway(
+                stub_gateway,
+                store=SqliteSongExistenceStore(path)
+            ).song_exists('a', MusicProvider.SPOTIFY)
+
+            # Then
+            assert song_exists
+            assert stub_gateway.lookups == []
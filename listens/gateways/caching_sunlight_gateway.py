@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple, cast
+
+from listens.abc import SunlightGateway as SunlightGatewayABC
+from listens.definitions import SunlightWindow
+from listens.lru_cache import CacheStats, LruCache
+from listens.metrics import Metrics, NULL_METRICS
+
+
+SunlightKey = Tuple[str, date]
+
+
+class CachingSunlightGateway(SunlightGatewayABC):
+    """Wraps a SunlightGateway, remembering the sunlight window of each timezone's local date.
+
+    A sunlight window never changes, so entries don't expire; instead, dates that have passed
+    everywhere on earth are evicted. Stale windows are never cached, so that the real window is
+    looked up again once the wrapped gateway recovers. Concurrent lookups of the same uncached
+    window share a single request to the wrapped gateway.
+
+    A `cache` can be passed in to keep it across gateways, e.g. when the wrapped one is rebuilt.
+    """
+
+    def __init__(self,
+                 sunlight_gateway: SunlightGatewayABC,
+                 capacity: int = 1024,
+                 utc_today: Callable[[], date] = lambda: datetime.utcnow().date(),
+                 metrics: Metrics = NULL_METRICS,
+                 cache: Optional[LruCache[SunlightKey, SunlightWindow]] = None) -> None:
+        self.sunlight_gateway = sunlight_gateway
+        self.utc_today = utc_today
+        self.metrics = metrics
+        self.cache: LruCache[SunlightKey, SunlightWindow] = (
+            cache if cache is not None else LruCache(capacity)
+        )
+        self._in_flight: Dict[SunlightKey, Future] = {}
+        self._lock = threading.Lock()
+
+    def fetch_sunlight_window(self, iana_timezone: str, on_date: date) -> SunlightWindow:
+        key = (iana_timezone, on_date)
+        sunlight_window = self.cache.get(key)
+        if sunlight_window:
+            self.metrics.increment('sunlight_cache.hit')
+            return sunlight_window
+
+        with self._lock:
+            # the window may have been cached since our lookup above.
+            sunlight_window = self.cache.get(key)
+            if sunlight_window:
+                self.metrics.increment('sunlight_cache.hit')
+                return sunlight_window
+
+            in_flight = self._in_flight.get(key)
+            if not in_flight:
+                future: Future = Future()
+                self._in_flight[key] = future
+
+        if in_flight:
+            self.metrics.increment('sunlight_cache.hit')
+            return cast(SunlightWindow, in_flight.result())
+
+        self.metrics.increment('sunlight_cache.miss')
+
+        try:
+            sunlight_window = self.sunlight_gateway.fetch_sunlight_window(iana_timezone, on_date)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            if not sunlight_window.stale:
+                self._evict_past_dates()
+                self.cache.set(key, sunlight_window)
+            future.set_result(sunlight_window)
+            return sunlight_window
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self) -> CacheStats:
+        """Not part of the SunlightGatewayABC."""
+        return self.cache.stats()
+
+    def _evict_past_dates(self) -> None:
+        # the furthest behind timezones are about a day behind utc.
+        earliest_local_date = self.utc_today() - timedelta(days=1)
+        self.cache.evict_where(lambda key: key[1] < earliest_local_date)
@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from listens.gateways.caching_sunlight_gateway import CachingSunlightGateway
+from listens.testing import StubSunlightGateway
+
+
+class TestCachingSunlightGateway:
+
+    def test_looks_up_each_timezone_and_date_once(self) -> None:
+        # Given
+        stub_gateway = StubSunlightGateway()
+        gateway = CachingSunlightGateway(stub_gateway, utc_today=lambda: date(2018, 11, 12))
+
+        # When
+        for _ in range(3):
+            gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 12))
+            gateway.fetch_sunlight_window('Asia/Tokyo', date(2018, 11, 12))
+
+        # Then
+        assert stub_gateway.lookups == [
+            ('America/New_York', date(2018, 11, 12)),
+            ('Asia/Tokyo', date(2018, 11, 12))
+        ]
+
+    def test_evicts_dates_that_have_passed_everywhere(self) -> None:
+        # Given
+        today = date(2018, 11, 12)
+        gateway = CachingSunlightGateway(StubSunlightGateway(), utc_today=lambda: today)
+        gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 10))
+        gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 11))
+
+        # When
+        today = date(2018, 11, 13)
+        gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 13))
+
+        # Then
+        assert gateway.stats().size == 1
+
+    def test_coalesces_concurrent_lookups_of_the_same_window(self) -> None:
+        # Given
+        stub_gateway = StubSunlightGateway()
+        stub_gateway.released.clear()
+        gateway = CachingSunlightGateway(stub_gateway, utc_today=lambda: date(2018, 11, 12))
+
+        # When
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(gateway.fetch_sunlight_window,
+                                'America/New_York',
+                                date(2018, 11, 12))
+                for _ in range(8)
+            ]
+            stub_gateway.released.set()
+            sunlight_windows = {future.result() for future in futures}
+
+        # Then
+        assert len(stub_gateway.lookups) == 1
+        assert len(sunlight_windows) == 1
@@ -0,0 +1,96 @@
+import logging
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+from listens.abc import SunlightGateway as SunlightGatewayABC
+from listens.circuit_breaker import CircuitBreaker, CircuitState
+from listens.definitions import SunlightWindow, exceptions
+from listens.lru_cache import LruCache
+from listens.metrics import Metrics, NULL_METRICS
+
+
+logger = logging.getLogger(__name__)
+
+# the date a timezone's last known sunlight window is for, and the window.
+StaleSunlightWindow = Tuple[date, SunlightWindow]
+
+# sunrise and sunset move up to a few minutes a day, so a window is only served this far from
+# the date it was known for.
+MAX_STALE_DAYS = 3
+
+
+class CircuitBreakingSunlightGateway(SunlightGatewayABC):
+    """Wraps a SunlightGateway in a circuit breaker, so that submissions fail fast instead of
+    waiting on a sunlight service that is down.
+
+    While the circuit is open, a timezone's last known sunlight window is served instead, moved
+    to the requested date. Sunrise and sunset only move a few minutes a day, so a window that is
+    a little stale is still a safe answer, and it is marked stale so that it isn't cached as the
+    real one. Timezones without a window known within `max_stale_days` of the requested date fail
+    fast with a SunlightServiceError.
+
+    Lookups the service rejects as invalid (SunlightServiceRejectedError) don't count as failures.
+
+    The circuit breaker and stale windows are meant to outlive the gateway, so that they survive
+    it being rebuilt after an error.
+    """
+
+    def __init__(self,
+                 sunlight_gateway: SunlightGatewayABC,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 stale_windows: Optional[LruCache[str, StaleSunlightWindow]] = None,
+                 max_stale_days: int = MAX_STALE_DAYS,
+                 metrics: Metrics = NULL_METRICS) -> None:
+        self.sunlight_gateway = sunlight_gateway
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.stale_windows: LruCache[str, StaleSunlightWindow] = (
+            stale_windows if stale_windows is not None else LruCache(1024)
+        )
+        self.max_stale_days = max_stale_days
+        self.metrics = metrics
+
+    def fetch_sunlight_window(self, iana_timezone: str, on_date: date) -> SunlightWindow:
+        if not self.circuit_breaker.allow_request():
+            self.metrics.increment('sunlight_circuit.rejected')
+            return self._stale_window(iana_timezone, on_date)
+
+        try:
+            sunlight_window = self.sunlight_gateway.fetch_sunlight_window(iana_timezone, on_date)
+        except exceptions.SunlightServiceRejectedError:
+            # the service answered, it just won't look this window up.
+            self.circuit_breaker.record_success()
+            raise
+        except exceptions.SunlightServiceError:
+            self.circuit_breaker.record_failure()
+            if self.circuit_breaker.state is CircuitState.OPEN:
+                return self._stale_window(iana_timezone, on_date)
+            raise
+
+        self.circuit_breaker.record_success()
+        self.stale_windows.set(iana_timezone, (on_date, sunlight_window))
+        return sunlight_window
+
+    def _stale_window(self, iana_timezone: str, on_date: date) -> SunlightWindow:
+        stale = self.stale_windows.get(iana_timezone)
+        if not stale:
+            raise exceptions.SunlightServiceError(
+                f'The sunlight service is unavailable, and no earlier sunlight window of '
+                f'{iana_timezone} is known.'
+            )
+
+        known_date, sunlight_window = stale
+        shift = on_date - known_date
+        if abs(shift) > timedelta(days=self.max_stale_days):
+            raise exceptions.SunlightServiceError(
+                f'The sunlight service is unavailable, and the last known sunlight window of '
+                f'{iana_timezone}, on {known_date}, is too old to serve for {on_date}.'
+            )
+
+        logger.warning(f'The sunlight service is unavailable. Served the sunlight window of '
+                       f'{iana_timezone} on {known_date} for {on_date}.')
+        self.metrics.increment('sunlight_circuit.stale')
+        return SunlightWindow(
+            sunrise_utc=sunlight_window.sunrise_utc + shift,
+            sunset_utc=sunlight_window.sunset_utc + shift,
+            stale=True
+        )
@@ -0,0 +1,172 @@
+from datetime import date, datetime
+
+import pytest
+
+from listens.circuit_breaker import CircuitBreaker, CircuitState
+from listens.definitions import SunlightWindow, exceptions
+from listens.gateways.caching_sunlight_gateway import CachingSunlightGateway
+from listens.gateways.circuit_breaking_sunlight_gateway import CircuitBreakingSunlightGateway
+from listens.metrics import InMemoryMetrics
+from listens.testing import FakeClock, StubSunlightGateway
+
+
+class TestCircuitBreakingSunlightGateway:
+
+    def test_serves_the_last_known_window_shifted_to_the_date_while_open(self) -> None:
+        # Given
+        stub_gateway = StubSunlightGateway()
+        metrics = InMemoryMetrics()
+        gateway = CircuitBreakingSunlightGateway(
+            stub_gateway,
+            circuit_breaker=CircuitBreaker(failure_threshold=2),
+            metrics=metrics
+        )
+        gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 12))
+        stub_gateway.down = True
+        with pytest.raises(exceptions.SunlightServiceError):
+            gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 13))
+
+        # When
+        opening_window = gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 13))
+        open_window = gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 14))
+
+        # Then
+        assert opening_window.sunrise_utc == datetime(2018, 11, 13, 6)
+        assert open_window == SunlightWindow(
+            sunrise_utc=datetime(2018, 11, 14, 6),
+            sunset_utc=datetime(2018, 11, 14, 18),
+            stale=True
+        )
+        assert len(stub_gateway.lookups) == 3
+        assert metrics.counters == {'sunlight_circuit.rejected': 1, 'sunlight_circuit.stale': 2}
+
+    def test_fails_fast_without_a_known_window_while_open(self) -> None:
+        # Given
+        stub_gateway = StubSunlightGateway()
+        stub_gateway.down = True
+        gateway = CircuitBreakingSunlightGateway(
+            stub_gateway,
+            circuit_breaker=CircuitBreaker(failure_threshold=1)
+        )
+        with pytest.raises(exceptions.SunlightServiceError):
+            gateway.fetch_sunlight_window('Asia/Tokyo', date(2018, 11, 12))
+
+        # When / Then
+        with pytest.raises(exceptions.SunlightServiceError):
+            gateway.fetch_sunlight_window('Asia/Tokyo', date(2018, 11, 12))
+        assert len(stub_gateway.lookups) == 1
+
+    def test_doesnt_serve_windows_known_too_long_before_the_date(self) -> None:
+        # Given
+        stub_gateway = StubSunlightGateway()
+        gateway = CircuitBreakingSunlightGateway(
+            stub_gateway,
+            circuit_breaker=CircuitBreaker(failure_threshold=1),
+            max_stale_days=3
+        )
+        gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 12))
+        stub_gateway.down = True
+
+        # When
+        stale_window = gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 15))
+
+        # Then
+        assert stale_window.stale
+        with pytest.raises(exceptions.SunlightServiceError):
+            gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 16))
+
+    def test_rejected_lookups_dont_open_the_circuit(self) -> None:
+        # Given
+        stub_gateway = StubSunlightGateway()
+        stub_gateway.unknown_timezones.add('America/Gotham')
+        circuit_breaker = CircuitBreaker(failure_threshold=2)
+        gateway = CircuitBreakingSunlightGateway(stub_gateway, circuit_breaker=circuit_breaker)
+
+        # When
+        for _ in range(3):
+            with pytest.raises(exceptions.SunlightServiceRejectedError):
+                gateway.fetch_sunlight_window('America/Gotham', date(2018, 11, 12))
+
+        # Then
+        assert circuit_breaker.state is CircuitState.CLOSED
+        assert len(stub_gateway.lookups) == 3
+
+    def test_a_successful_trial_closes_the_circuit(self) -> None:
+        # Given
+        clock = FakeClock()
+        stub_gateway = StubSunlightGateway()
+        stub_gateway.down = True
+        circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=30,
+                                         clock=clock)
+        gateway = CircuitBreakingSunlightGateway(stub_gateway, circuit_breaker=circuit_breaker)
+        with pytest.raises(exceptions.SunlightServiceError):
+            gateway.fetch_sunlight_window('Asia/Tokyo', date(2018, 11, 12))
+
+        # When
+        stub_gateway.down = False
+        clock.now = 30
+        gateway.fetch_sunlight_window('Asia/Tokyo', date(2018, 11, 12))
+
+        # Then
+        assert circuit_breaker.state is CircuitState.CLOSED
+        assert len(stub_gateway.lookups) == 2
+
+    def test_serves_the_real_window_through_a_cache_once_the_service_recovers(self) -> None:
+        # Given
+        clock = FakeClock()
+        stub_gateway = StubSunlightGateway()
+        circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=30,
+                                         clock=clock)
+        gateway = CachingSunlightGateway(
+            CircuitBreakingSunlightGateway(stub_gateway, circuit_breaker=circuit_breaker),
+            utc_today=lambda: date(2018, 11, 12)
+        )
+        gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 12))
+        stub_gateway.down = True
+        stale_window = gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 13))
+
+        # When
+        stub_gateway.down = False
+        clock.now = 30
+        recovered_window = gateway.fetch_sunlight_window('America/New_York', date(2018, 11, 13))
+
+        # Then
+        assert stale_window.stale
+        assert not recovered_window.stale
+        assert circuit_breaker.state is CircuitState.CLOSED
+        assert stub_gateway.lookups[-1] == ('America/New_York', date(2018, 11, 13))
+        assert gateway.stats().size == 2
+
+
+class TestCircuitBreaker:
+
+    def test_a_failed_trial_opens_the_circuit_again(self) -> None:
+        # Given
+        clock = FakeClock()
+        circuit_breaker = CircuitBreaker(failure_threshold=3, reset_timeout_seconds=30,
+                                         clock=clock)
+        for _ in range(3):
+            circuit_breaker.record_failure()
+        clock.now = 30
+        assert circuit_breaker.allow_request()
+        assert not circuit_breaker.allow_request()
+
+        # When
+        circuit_breaker.record_failure()
+
+        # Then
+        assert circuit_breaker.state is CircuitState.OPEN
+        clock.now = 59
+        assert not circuit_breaker.allow_request()
+
+    def test_successes_reset_the_failure_count(self) -> None:
+        # Given
+        circuit_breaker = CircuitBreaker(failure_threshold=2)
+        circuit_breaker.record_failure()
+
+        # When
+        circuit_breaker.record_success()
+        circuit_breaker.record_failure()
+
+        # Then
+        assert circuit_breaker.state is CircuitState.CLOSED
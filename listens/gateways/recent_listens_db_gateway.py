@@ -0,0 +1,225 @@
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from listens.abc import DbGateway as DbGatewayABC
+from listens.definitions import Listen, ListenCursor, ListenInput, SortOrder
+
+
+# listens are ordered by (listen_time_utc, id), as the database orders them.
+ListenKey = Tuple[datetime, int]
+
+
+class RecentListensDbGateway(DbGatewayABC):
+    """Wraps a DbGateway, keeping the `capacity` latest listens in memory so that pages of the
+    newest listens are answered without a query.
+
+    The ring of recent listens is loaded on first use, and kept current with the listens added
+    through this gateway. Listens added by other workers are only seen when the ring is reloaded,
+    `max_age_seconds` after it was loaded.
+
+    Pages answered from the ring are therefore only eventually consistent: a listen added by
+    another worker (e.g. another lambda container) can be missing from them for up to
+    `max_age_seconds`. Callers that can't accept that should pass a smaller `max_age_seconds`, or
+    not use this gateway.
+
+    Unfiltered descending pages that fall inside the ring are answered from it. Every other
+    fetch, and any page that might reach past the oldest listen in the ring, goes to the wrapped
+    gateway.
+    """
+
+    def __init__(self,
+                 db_gateway: DbGatewayABC,
+                 capacity: int = 500,
+                 max_age_seconds: float = 10,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1.')
+        self.db_gateway = db_gateway
+        self.capacity = capacity
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._load_lock = threading.RLock()
+        self._keys: List[ListenKey] = []
+        self._listens: List[Listen] = []
+        self._loaded_at: Optional[float] = None
+        # whether the ring holds every listen there is, not just the latest.
+        self._holds_every_listen = False
+        # listens added while a load is in flight, which the load may have missed.
+        self._added_during_load: Optional[List[Listen]] = None
+
+    def add_listen(self, listen_input: ListenInput) -> Listen:
+        listen = self.db_gateway.add_listen(listen_input)
+        self._record([listen])
+        return listen
+
+    def add_listens(self, listen_inputs: List[ListenInput]) -> List[Listen]:
+        listens = self.db_gateway.add_listens(listen_inputs)
+        self._record(listens)
+        return listens
+
+    def add_listen_with_idempotency_key(self,
+                                        listen_input: ListenInput,
+                                        idempotency_key: str) -> Tuple[Listen, bool]:
+        listen, added = self.db_gateway.add_listen_with_idempotency_key(listen_input,
+                                                                        idempotency_key)
+        if added:
+            self._record([listen])
+        return listen, added
+
+    def fetch_listen(self, listen_id: str) -> Listen:
+        return self.db_gateway.fetch_listen(listen_id)
+
+    def fetch_listen_by_idempotency_key(self, idempotency_key: str) -> Optional[Listen]:
+        return self.db_gateway.fetch_listen_by_idempotency_key(idempotency_key)
+
+    def fetch_listens(self,
+                      limit: int,
+                      sort_time: SortOrder,
+                      before_utc: Optional[datetime] = None,
+                      after_utc: Optional[datetime] = None,
+                      cursor: Optional[ListenCursor] = None,
+                      listener_name: Optional[str] = None,
+                      song_id: Optional[str] = None) -> List[Listen]:
+        # the ring holds the latest listens of everyone, so a filtered page might reach past it.
+        unfiltered = listener_name is None and song_id is None
+        if unfiltered and sort_time == SortOrder.DESCENDING and 0 <= limit <= self.capacity:
+            if not self._fresh():
+                with self._load_lock:
+                    # another request may have loaded the ring while we waited.
+                    if not self._fresh():
+                        self.load()
+
+            recent_listens = self._fetch_recent(limit, before_utc, after_utc, cursor)
+            if recent_listens is not None:
+                return recent_listens
+
+        return self.db_gateway.fetch_listens(
+            limit=limit,
+            sort_time=sort_time,
+            before_utc=before_utc,
+            after_utc=after_utc,
+            cursor=cursor,
+            listener_name=listener_name,
+            song_id=song_id
+        )
+
+    def load(self) -> None:
+        """Not part of the DbGatewayABC.
+
+        (Re)load the ring with the latest listens from the wrapped gateway.
+        """
+        with self._load_lock:
+            with self._lock:
+                self._added_during_load = []
+            loaded_at = self.clock()
+
+            try:
+                listens = self.db_gateway.fetch_listens(
+                    limit=self.capacity,
+                    sort_time=SortOrder.DESCENDING,
+                    before_utc=None,
+                    after_utc=None,
+                    cursor=None,
+                    listener_name=None,
+                    song_id=None
+                )
+            except BaseException:
+                with self._lock:
+                    self._added_during_load = None
+                raise
+
+            with self._lock:
+                listens.reverse()
+                self._keys = [_listen_key(listen) for listen in listens]
+                self._listens = listens
+                self._holds_every_listen = len(listens) < self.capacity
+                self._loaded_at = loaded_at
+
+                added_during_load, self._added_during_load = self._added_during_load or [], None
+                self._insert(added_during_load)
+
+    def invalidate(self) -> None:
+        """Not part of the DbGatewayABC.
+
+        Drop the ring, so that it is reloaded on next use.
+        """
+        with self._lock:
+            self._loaded_at = None
+
+    def close_connections(self) -> None:
+        self.invalidate()
+        self.db_gateway.close_connections()
+
+    def _fresh(self) -> bool:
+        with self._lock:
+            if self._loaded_at is None:
+                return False
+            age = self.clock() - self._loaded_at
+            return 0 <= age <= self.max_age_seconds
+
+    def _fetch_recent(self,
+                      limit: int,
+                      before_utc: Optional[datetime],
+                      after_utc: Optional[datetime],
+                      cursor: Optional[ListenCursor]) -> Optional[List[Listen]]:
+        """Return a descending page from the ring, or None if the ring can't be sure it has every
+        listen on the page."""
+        with self._lock:
+            if self._loaded_at is None:
+                return None
+
+            end = len(self._keys)
+            if cursor:
+                end = bisect_left(self._keys, (cursor.listen_time_utc, int(cursor.id)))
+            if before_utc:
+                end = min(end, bisect_left(self._keys, (before_utc, -1)))
+
+            start = 0
+            if after_utc:
+                start = bisect_right(self._keys, (after_utc, sys.maxsize))
+
+            # a page that stops short of the oldest listen in the ring is complete, as is any page
+            # of a ring that holds every listen.
+            if end - start >= limit:
+                return self._listens[end - limit:end][::-1]
+            elif start > 0 or self._holds_every_listen:
+                return self._listens[start:end][::-1]
+            else:
+                return None
+
+    def _record(self, listens: List[Listen]) -> None:
+        with self._lock:
+            if self._added_during_load is not None:
+                self._added_during_load += listens
+            if self._loaded_at is not None:
+                self._insert(listens)
+
+    def _insert(self, listens: Iterable[Listen]) -> None:
+        """Insert listens into the ring, dropping the oldest listens past capacity. Listens older
+        than the ring's oldest can't be told apart from listens it never held, so they're skipped,
+        as are listens it already holds. Call with the lock held."""
+        for listen in listens:
+            key = _listen_key(listen)
+            if not self._holds_every_listen and (not self._keys or key < self._keys[0]):
+                continue
+
+            index = bisect_left(self._keys, key)
+            if index < len(self._keys) and self._keys[index] == key:
+                continue
+            self._keys.insert(index, key)
+            self._listens.insert(index, listen)
+
+        overflow = len(self._keys) - self.capacity
+        if overflow > 0:
+            del self._keys[:overflow]
+            del self._listens[:overflow]
+            self._holds_every_listen = False
+
+
+def _listen_key(listen: Listen) -> ListenKey:
+    return listen.listen_time_utc, int(listen.id)
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+from listens.definitions import ListenCursor, ListenInput, MusicProvider, SortOrder
+from listens.gateways.recent_listens_db_gateway import RecentListensDbGateway
+from listens.testing import FakeClock, InMemoryDbGateway
+
+
+FIRST_LISTEN_TIME_UTC = datetime(2018, 11, 12, 12)
+
+
+class TestRecentListensDbGateway:
+
+    def test_answers_pages_inside_the_ring_without_a_query(self) -> None:
+        # Given
+        db_gateway = InMemoryDbGateway()
+        db_gateway.add_listens([listen_input_factory(minutes=i) for i in range(30)])
+        gateway = RecentListensDbGateway(db_gateway, capacity=10)
+        gateway.load()
+        db_gateway.fetches = 0
+
+        # When
+        first_page = gateway.fetch_listens(limit=5, sort_time=SortOrder.DESCENDING)
+        cursor = ListenCursor(first_page[-1].listen_time_utc, first_page[-1].id)
+        second_page = gateway.fetch_listens(
+            limit=5,
+            sort_time=SortOrder.DESCENDING,
+            cursor=cursor
+        )
+
+        # Then
+        assert db_gateway.fetches == 0
+        assert first_page + second_page == db_gateway.fetch_listens(10, SortOrder.DESCENDING)
+
+    def test_falls_back_to_the_db_past_the_ring(self) -> None:
+        # Given
+        db_gateway = InMemoryDbGateway()
+        db_gateway.add_listens([listen_input_factory(minutes=i) for i in range(30)])
+        gateway = RecentListensDbGateway(db_gateway, capacity=10)
+        gateway.load()
+        db_gateway.fetches = 0
+
+        # When
+        listens = gateway.fetch_listens(
+            limit=5,
+            sort_time=SortOrder.DESCENDING,
+            before_utc=FIRST_LISTEN_TIME_UTC + timedelta(minutes=22)
+        )
+        ascending_listens = gateway.fetch_listens(limit=5, sort_time=SortOrder.ASCENDING)
+
+        # Then
+        assert db_gateway.fetches == 2
+        assert [listen.id for listen in listens] == ['22', '21', '20', '19', '18']
+        assert [listen.id for listen in ascending_listens] == ['1', '2', '3', '4', '5']
+
+    def test_leaves_filtered_pages_to_the_db(self) -> None:
+        # Given
+        db_gateway = InMemoryDbGateway()
+        db_gateway.add_listens([listen_input_factory(minutes=i) for i in range(30)])
+        gateway = RecentListensDbGateway(db_gateway, capacity=10)
+        gateway.load()
+        db_gateway.fetches = 0
+
+        # When
+        listens = gateway.fetch_listens(limit=5, sort_time=SortOrder.DESCENDING,
+                                        listener_name='someone else')
+
+        # Then
+        assert db_gateway.fetches == 1
+        assert listens == []
+
+    def test_keeps_the_ring_current_with_added_listens(self) -> None:
+        # Given
+        db_gateway = InMemoryDbGateway()
+        db_gateway.add_listens([listen_input_factory(minutes=i) for i in range(10)])
+        gateway = RecentListensDbGateway(db_gateway, capacity=10)
+        gateway.load()
+
+        # When
+        gateway.add_listen(listen_input_factory(minutes=10))
+        gateway.add_listens([listen_input_factory(minutes=11), listen_input_factory(minutes=12)])
+        db_gateway.fetches = 0
+        listens = gateway.fetch_listens(limit=10, sort_time=SortOrder.DESCENDING)
+
+        # Then
+        assert db_gateway.fetches == 0
+        assert listens == db_gateway.fetch_listens(10, SortOrder.DESCENDING)
+
+    def test_reloads_to_see_listens_added_by_other_workers(self) -> None:
+        # Given
+        clock = FakeClock()
+        db_gateway = InMemoryDbGateway()
+        gateway = RecentListensDbGateway(db_gateway, capacity=10, max_age_seconds=10, clock=clock)
+        gateway.fetch_listens(limit=5, sort_time=SortOrder.DESCENDING)
+
+        # When
+        db_gateway.add_listen(listen_input_factory(minutes=0))
+        stale_listens = gateway.fetch_listens(limit=5, sort_time=SortOrder.DESCENDING)
+        clock.now = 11
+        fresh_listens = gateway.fetch_listens(limit=5, sort_time=SortOrder.DESCENDING)
+
+        # Then
+        assert stale_listens == []
+        assert [listen.id for listen in fresh_listens] == ['1']
+
+    def test_listens_added_by_other_workers_are_missing_for_at_most_max_age_seconds(self) -> None:
+        # Given a ring loaded at 0s
+        clock = FakeClock()
+        db_gateway = InMemoryDbGateway()
+        gateway = RecentListensDbGateway(db_gateway, capacity=10, max_age_seconds=10, clock=clock)
+        gateway.load()
+
+        # When another worker adds a listen
+        db_gateway.add_listen(listen_input_factory(minutes=0))
+
+        # Then the ring misses it until it is older than max_age_seconds
+        clock.now = 10
+        assert gateway.fetch_listens(limit=5, sort_time=SortOrder.DESCENDING) == []
+        clock.now = 10.001
+        assert gateway.fetch_listens(limit=5, sort_time=SortOrder.DESCENDING) == db_gateway.listens
+
+
+def listen_input_factory(minutes: int) -> ListenInput:
+    return ListenInput(
+        song_id='4rNGLh1y5Kkvr4bT28yfHU',
+        song_provider=MusicProvider.SPOTIFY,
+        listener_name='Zach',
+        listen_time_utc=FIRST_LISTEN_TIME_UTC + timedelta(minutes=minutes),
+        note=None,
+        iana_timezone='America/New_York'
+    )
@@ -1,20 +1,257 @@
 import json
-
-import boto3
+import logging
+import os
+import queue
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
 
 from listens.abc import NotificationGateway as NotificationGatewayABC
 from listens.definitions import Listen
 
 
+logger = logging.getLogger(__name__)
+
+# the most entries sns accepts in a single publish_batch call.
+PUBLISH_BATCH_SIZE = 10
+
+# botocore waits 60s to connect and to read, and retries on its own, by default. announcements
+# are retried (and kept in the outbox) here instead, so each call fails fast.
+SNS_CONNECT_TIMEOUT_SECONDS = 1
+SNS_READ_TIMEOUT_SECONDS = 2
+
+
 class SnsNotificationGateway(NotificationGatewayABC):
-    client = boto3.client('sns')
+    """Announces listens to sns from a background worker, off the request path.
 
-    def __init__(self, listen_added_topic_arn: str) -> None:
+    `announce_listen_added` only queues an announcement. The worker publishes queued announcements
+    with `publish_batch`, up to ten at a time, and retries failed entries with exponential backoff.
+    Announcements that still can't be published are kept in a local outbox (a file at
+    `outbox_path`, or memory) and are published again on the next `flush`.
+
+    While sns is down the outbox keeps only the latest `max_outbox_size` announcements. Older
+    ones are dropped and logged, and `flush` returns within about `max_flush_seconds`.
+
+    The worker can be frozen along with the rest of a lambda between invocations, so `flush`
+    should be called before an invocation returns.
+    """
+
+    def __init__(self,
+                 listen_added_topic_arn: str,
+                 outbox_path: Optional[str] = None,
+                 max_attempts: int = 3,
+                 backoff_seconds: float = 0.1,
+                 max_outbox_size: int = 1000,
+                 max_flush_seconds: float = 1,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic) -> None:
         self.listen_added_topic_arn = listen_added_topic_arn
+        self.outbox_path = outbox_path
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_outbox_size = max_outbox_size
+        self.max_flush_seconds = max_flush_seconds
+        self.sleep = sleep
+        self.clock = clock
+        self._queue: queue.Queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._outbox_lock = threading.Lock()
+        self._outbox: List[str] = []
+
+    @property
+    def client(self) -> Any:
+        return _sns_client()
 
     def announce_listen_added(self, listen: Listen) -> None:
         payload = {'listen_id': listen.id}
-        self.client.publish(
-            TopicArn=self.listen_added_topic_arn,
-            Message=json.dumps(payload)
-        )
+        self._queue.put(json.dumps(payload))
+        self._start_worker()
+
+    def flush(self) -> None:
+        """Not part of the NotificationGatewayABC.
+
+        Wait for queued announcements to be published, then try to publish the outbox. Both share
+        a deadline `max_flush_seconds` away. Announcements still queued at the deadline are moved
+        to the outbox, and publishing the outbox stops at the deadline, or as soon as sns can't be
+        reached at all. Whatever is left is published on a later flush.
+        """
+        deadline = self.clock() + self.max_flush_seconds
+        if not self._join_queue(deadline):
+            self._write_outbox(self._take_queue())
+
+        messages = self._take_outbox()
+        for start in range(0, len(messages), PUBLISH_BATCH_SIZE):
+            end = start + PUBLISH_BATCH_SIZE
+            if self.clock() >= deadline:
+                self._write_outbox(messages[start:])
+                return
+
+            if not self._publish(messages[start:end], deadline):
+                self._write_outbox(messages[end:])
+                return
+
+    def outbox_size(self) -> int:
+        """Not part of the NotificationGatewayABC."""
+        with self._outbox_lock:
+            return len(self._read_outbox())
+
+    def _join_queue(self, deadline: float) -> bool:
+        """Wait until the queue is empty and the worker is done, or the deadline passes. Return
+        whether the queue was emptied."""
+        all_tasks_done = self._queue.all_tasks_done
+        with all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining_seconds = deadline - self.clock()
+                if remaining_seconds <= 0:
+                    return False
+                all_tasks_done.wait(remaining_seconds)
+            return True
+
+    def _take_queue(self) -> List[str]:
+        """Take the announcements the worker hasn't started on. A batch it is publishing stays
+        with it, and goes to the outbox if it can't be published."""
+        messages: List[str] = []
+        while True:
+            try:
+                messages.append(self._queue.get_nowait())
+            except queue.Empty:
+                return messages
+            self._queue.task_done()
+
+    def _start_worker(self) -> None:
+        with self._worker_lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._work,
+                name='sns-notification-worker',
+                daemon=True
+            )
+            self._worker.start()
+
+    def _work(self) -> None:
+        while True:
+            messages = [self._queue.get()]
+            while len(messages) < PUBLISH_BATCH_SIZE:
+                try:
+                    messages.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._publish(messages)
+            except Exception:
+                logger.exception('Unable to publish listen announcements.')
+                self._write_outbox(messages)
+            finally:
+                for _ in messages:
+                    self._queue.task_done()
+
+    def _publish(self, messages: List[str], deadline: Optional[float] = None) -> bool:
+        """Publish `messages` in one batch, retrying the entries sns failed to publish. Entries
+        that fail every attempt, or that sns rejected outright, are moved to the outbox. No retry
+        is started that would back off past `deadline`.
+
+        Return whether sns could be reached at all.
+        """
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        pending: Dict[str, str] = {str(i): message for i, message in enumerate(messages)}
+        rejected: List[str] = []
+        reached = False
+
+        for attempt in range(self.max_attempts):
+            if attempt:
+                backoff_seconds = self.backoff_seconds * 2 ** (attempt - 1)
+                if deadline is not None and self.clock() + backoff_seconds >= deadline:
+                    break
+                self.sleep(backoff_seconds)
+
+            try:
+                response = self.client.publish_batch(
+                    TopicArn=self.listen_added_topic_arn,
+                    PublishBatchRequestEntries=[
+                        {'Id': entry_id, 'Message': message}
+                        for entry_id, message in pending.items()
+                    ]
+                )
+            except (BotoCoreError, ClientError):
+                logger.warning('Unable to publish listen announcements.', exc_info=True)
+                continue
+
+            reached = True
+            failed_entries = response.get('Failed', [])
+            rejected += [
+                pending[entry['Id']] for entry in failed_entries if entry.get('SenderFault')
+            ]
+            pending = {
+                entry['Id']: pending[entry['Id']]
+                for entry in failed_entries if not entry.get('SenderFault')
+            }
+            if not pending:
+                break
+
+        unpublished = rejected + list(pending.values())
+        if unpublished:
+            logger.error(f'Moving {len(unpublished)} listen announcements to the outbox.')
+            self._write_outbox(unpublished)
+
+        return reached
+
+    def _write_outbox(self, messages: List[str]) -> None:
+        if not messages:
+            return
+
+        with self._outbox_lock:
+            outbox = self._read_outbox() + messages
+            dropped = outbox[:-self.max_outbox_size] if self.max_outbox_size else outbox
+            if dropped:
+                logger.error(f'The outbox is full. Dropped {len(dropped)} listen announcements: '
+                             f'{dropped}')
+                outbox = outbox[len(dropped):]
+
+            if not self.outbox_path:
+                self._outbox = outbox
+                return
+
+            if dropped:
+                with open(self.outbox_path, 'w') as outbox_file:
+                    outbox_file.writelines(message + '\n' for message in outbox)
+                return
+
+            with open(self.outbox_path, 'a') as outbox_file:
+                outbox_file.writelines(message + '\n' for message in messages)
+
+    def _take_outbox(self) -> List[str]:
+        with self._outbox_lock:
+            messages = self._read_outbox()
+            if not self.outbox_path:
+                self._outbox = []
+            elif messages:
+                os.remove(self.outbox_path)
+            return messages
+
+    def _read_outbox(self) -> List[str]:
+        if not self.outbox_path:
+            return list(self._outbox)
+
+        try:
+            with open(self.outbox_path) as outbox_file:
+                return [line.rstrip('\n') for line in outbox_file if line.strip()]
+        except FileNotFoundError:
+            return []
+
+
+@lru_cache(maxsize=1)
+def _sns_client() -> Any:
+    """The sns client is made on first publish, and boto3 imported with it, rather than when this
+    module is imported."""
+    import boto3
+    from botocore.config import Config
+    return boto3.client('sns', config=Config(
+        connect_timeout=SNS_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=SNS_READ_TIMEOUT_SECONDS,
+        retries={'max_attempts': 0}
+    ))
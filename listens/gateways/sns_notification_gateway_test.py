@@ -0,0 +1,200 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Generator, List
+from unittest.mock import patch
+
+import pytest
+
+from features.fixtures.sns import LocalSnsClient
+
+from listens.definitions import Listen, MusicProvider
+from listens.gateways.sns_notification_gateway import SnsNotificationGateway, _sns_client
+from listens.testing import FakeClock
+
+
+TOPIC_ARN = 'listen added topic arn'
+
+
+@pytest.fixture  # type: ignore
+def local_sns_client() -> Generator:
+    local_sns_client = LocalSnsClient()
+    with patch.object(SnsNotificationGateway, 'client', local_sns_client):
+        yield local_sns_client
+
+
+class TestSnsNotificationGateway:
+
+    def test_publishes_announcements_in_batches_of_ten(self,
+                                                       local_sns_client: LocalSnsClient) -> None:
+        # Given
+        gateway = SnsNotificationGateway(TOPIC_ARN)
+
+        # When
+        for listen_id in range(25):
+            gateway.announce_listen_added(listen_factory(str(listen_id)))
+        gateway.flush()
+
+        # Then
+        assert published_listen_ids(local_sns_client) == [str(i) for i in range(25)]
+        assert local_sns_client.calls <= 25
+
+    def test_retries_with_backoff_when_sns_is_unreachable(self,
+                                                          local_sns_client: LocalSnsClient) -> None:
+        # Given
+        sleeps: List[float] = []
+        gateway = SnsNotificationGateway(TOPIC_ARN, backoff_seconds=1, sleep=sleeps.append)
+        local_sns_client.fail_next_calls = 2
+
+        # When
+        gateway.announce_listen_added(listen_factory('1'))
+        gateway.flush()
+
+        # Then
+        assert published_listen_ids(local_sns_client) == ['1']
+        assert sleeps == [1, 2]
+
+    def test_retries_only_failed_entries(self, local_sns_client: LocalSnsClient) -> None:
+        # Given
+        gateway = SnsNotificationGateway(TOPIC_ARN, sleep=lambda _: None)
+        local_sns_client.reject_messages = ['{"listen_id": "2"}']
+
+        # When
+        for listen_id in ('1', '2', '3'):
+            gateway.announce_listen_added(listen_factory(listen_id))
+        gateway.flush()
+
+        # Then
+        assert sorted(published_listen_ids(local_sns_client)) == ['1', '3']
+        assert gateway.outbox_size() == 1
+
+    def test_publishes_the_outbox_once_sns_recovers(self,
+                                                    local_sns_client: LocalSnsClient) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            # Given an announcement that was moved to the outbox while sns was unreachable
+            outbox_path = os.path.join(directory, 'outbox.jsonl')
+            gateway = SnsNotificationGateway(TOPIC_ARN, outbox_path=outbox_path,
+                                             sleep=lambda _: None)
+            # the worker and then the flush of the outbox both fail every attempt
+            local_sns_client.fail_next_calls = 6
+            gateway.announce_listen_added(listen_factory('1'))
+            gateway.flush()
+            assert published_listen_ids(local_sns_client) == []
+
+            # When the outbox is published by a later gateway
+            SnsNotificationGateway(TOPIC_ARN, outbox_path=outbox_path).flush()
+
+            # Then
+            assert published_listen_ids(local_sns_client) == ['1']
+            assert gateway.outbox_size() == 0
+
+    def test_keeps_only_the_latest_announcements_in_a_full_outbox(
+            self, local_sns_client: LocalSnsClient) -> None:
+        # Given
+        gateway = SnsNotificationGateway(TOPIC_ARN, max_attempts=1, max_outbox_size=2)
+        local_sns_client.fail_next_calls = 100
+
+        # When
+        for listen_id in ('1', '2', '3'):
+            gateway.announce_listen_added(listen_factory(listen_id))
+            gateway.flush()
+
+        # Then
+        local_sns_client.fail_next_calls = 0
+        gateway.flush()
+        assert published_listen_ids(local_sns_client) == ['2', '3']
+
+    def test_stops_publishing_the_outbox_while_sns_is_unreachable(
+            self, local_sns_client: LocalSnsClient) -> None:
+        # Given an outbox of three batches of announcements
+        gateway = SnsNotificationGateway(TOPIC_ARN, sleep=lambda _: None)
+        gateway._write_outbox([json.dumps({'listen_id': str(i)}) for i in range(25)])
+        local_sns_client.fail_next_calls = 100
+
+        # When
+        gateway.flush()
+
+        # Then only the first batch was tried
+        assert local_sns_client.calls == 3
+        assert gateway.outbox_size() == 25
+
+    def test_stops_retrying_the_outbox_after_max_flush_seconds(
+            self, local_sns_client: LocalSnsClient) -> None:
+        # Given
+        clock = FakeClock()
+        gateway = SnsNotificationGateway(TOPIC_ARN, backoff_seconds=1, max_flush_seconds=1.5,
+                                         sleep=clock.sleep, clock=clock)
+        gateway._write_outbox([json.dumps({'listen_id': '1'})])
+        local_sns_client.fail_next_calls = 100
+
+        # When
+        gateway.flush()
+
+        # Then
+        assert clock.sleeps == [1]
+        assert local_sns_client.calls == 2
+        assert gateway.outbox_size() == 1
+
+    def test_moves_announcements_still_queued_at_the_deadline_to_the_outbox(
+            self, local_sns_client: LocalSnsClient) -> None:
+        # Given a worker stuck publishing the first announcement
+        publishing = threading.Event()
+        release = threading.Event()
+
+        def stuck_publish_batch(**kwargs: Any) -> Dict:
+            publishing.set()
+            release.wait(timeout=5)
+            return {'Successful': [], 'Failed': []}
+
+        local_sns_client.publish_batch = stuck_publish_batch  # type: ignore
+        gateway = SnsNotificationGateway(TOPIC_ARN, max_flush_seconds=0.1)
+        gateway.announce_listen_added(listen_factory('1'))
+        assert publishing.wait(timeout=5)
+        gateway.announce_listen_added(listen_factory('2'))
+        gateway.announce_listen_added(listen_factory('3'))
+
+        # When
+        started_at = time.monotonic()
+        gateway.flush()
+        elapsed_seconds = time.monotonic() - started_at
+        release.set()
+
+        # Then
+        assert elapsed_seconds < 1
+        assert gateway.outbox_size() == 2
+
+    def test_sns_calls_fail_fast(self) -> None:
+        # When
+        _sns_client.cache_clear()
+        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}):
+            config = _sns_client().meta.config
+        _sns_client.cache_clear()
+
+        # Then
+        assert config.connect_timeout <= 1
+        assert config.read_timeout <= 2
+        # newer botocores count the first attempt as well as the retries.
+        retries = config.retries
+        assert retries.get('total_max_attempts', retries.get('max_attempts')) in (0, 1)
+
+
+def published_listen_ids(local_sns_client: LocalSnsClient) -> List[str]:
+    return [
+        json.loads(message)['listen_id']
+        for message in local_sns_client.published_messages[TOPIC_ARN]
+    ]
+
+
+def listen_factory(listen_id: str) -> Listen:
+    return Listen(
+        id=listen_id,
+        song_id='0aq7ohTG6VDYQvsnAYtA5e',
+        song_provider=MusicProvider.SPOTIFY,
+        listener_name='geez',
+        listen_time_utc=datetime(2018, 11, 12, 5, 53, 38),
+        note=None,
+        iana_timezone='Asia/Tokyo'
+    )
@@ -1,24 +1,64 @@
-from typing import cast
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, ClassVar, Dict, List, NamedTuple, Optional, Tuple
 
 import requests
 
 from listens.abc import MusicGateway as MusicGatewayABC
 from listens.definitions import MusicProvider
-from listens.definitions.exceptions import SpotifyError
+from listens.definitions.exceptions import SpotifyError, SpotifyRateLimitedError
+from listens.http_client import (
+    HttpClient,
+    RateLimitExceeded,
+    Timeouts,
+    TokenBucket,
+    retry_after_seconds
+)
+from listens.metrics import Metrics, NULL_METRICS
+
+
+# the most ids spotify's several-tracks endpoint takes.
+MAX_IDS_PER_REQUEST = 50
+MAX_CONCURRENT_REQUESTS = 4
+_chunk_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_REQUESTS,
+    thread_name_prefix='spotify-tracks'
+)
 
 
 class SpotifyGateway(MusicGatewayABC):
+    """Checks songs exist with spotify's web api.
+
+    Lookups share a process-wide budget of `rate_per_second` requests (and bursts of `burst`),
+    so that bursts of submissions slow down rather than trip spotify's rate limit. A lookup that
+    would wait more than `max_wait_seconds` for the budget, or that spotify still answers with
+    a 429, raises SpotifyRateLimitedError.
+    """
     base_url = 'https://api.spotify.com/v1'
-    auth_url = 'https://accounts.spotify.com/api/token'
+    timeouts = Timeouts(connect_seconds=2, read_seconds=4)
 
-    def __init__(self, client_id: str, client_secret: str) -> None:
-        self.bearer_token = SpotifyGateway.fetch_bearer_token(client_id, client_secret)
+    def __init__(self,
+                 client_id: str,
+                 client_secret: str,
+                 http_client: Optional[HttpClient] = None,
+                 rate_per_second: float = 10,
+                 burst: float = 20,
+                 max_wait_seconds: float = 1,
+                 metrics: Metrics = NULL_METRICS) -> None:
+        self.http_client = http_client or HttpClient(
+            self.timeouts,
+            rate_limiter=TokenBucket.shared('spotify', rate_per_second, burst, max_wait_seconds)
+            if rate_per_second else None,
+            metrics=metrics,
+            metrics_name='spotify'
+        )
+        self.token_manager = SpotifyTokenManager.shared(client_id, client_secret)
 
     def song_exists(self,
                     song_id: str,
                     song_provider: MusicProvider = MusicProvider.SPOTIFY) -> bool:
-        r = requests.get(f'{self.base_url}/tracks/{song_id}',
-                         headers={'Authorization': f'Bearer {self.bearer_token}'})
+        r = self._get(f'{self.base_url}/tracks/{song_id}')
 
         if r.status_code == requests.codes.ok:
             return True
@@ -27,17 +67,156 @@ class SpotifyGateway(MusicGatewayABC):
             return False
 
         else:
-            raise SpotifyError(f'Unexpected error code from spotify. "{r.status_code}: {r.text}"')
+            raise _unexpected_response_error(r)
 
-    @staticmethod
-    def fetch_bearer_token(client_id: str, client_secret: str) -> str:
-        r = requests.post(
-            SpotifyGateway.auth_url,
-            auth=(client_id, client_secret),
-            data={'grant_type': 'client_credentials'}
-        )
+    def songs_exist(self,
+                    song_ids: List[str],
+                    song_provider: MusicProvider = MusicProvider.SPOTIFY) -> Dict[str, bool]:
+        """Look songs up with spotify's several-tracks endpoint, MAX_IDS_PER_REQUEST at a time,
+        fetching up to MAX_CONCURRENT_REQUESTS chunks at once."""
+        unique_song_ids = list(dict.fromkeys(song_ids))
+        chunks = [
+            unique_song_ids[start:start + MAX_IDS_PER_REQUEST]
+            for start in range(0, len(unique_song_ids), MAX_IDS_PER_REQUEST)
+        ]
+        if len(chunks) > 1:
+            chunk_results = list(_chunk_executor.map(self._tracks_exist, chunks))
+        else:
+            chunk_results = [self._tracks_exist(chunk) for chunk in chunks]
+
+        return {
+            song_id: exists
+            for chunk_result in chunk_results
+            for song_id, exists in chunk_result.items()
+        }
+
+    def _tracks_exist(self, song_ids: List[str]) -> Dict[str, bool]:
+        r = self._get(f'{self.base_url}/tracks', params={'ids': ','.join(song_ids)})
+
+        if r.status_code == requests.codes.ok:
+            # tracks come back in the order they were asked for, with null for missing tracks.
+            tracks = r.json()['tracks']
+            return {song_id: track is not None for song_id, track in zip(song_ids, tracks)}
+
+        elif r.status_code == requests.codes.bad_request:
+            # a single malformed id fails the whole request. look each song up on its own.
+            return {song_id: self.song_exists(song_id) for song_id in song_ids}
+
+        else:
+            raise _unexpected_response_error(r)
+
+    def _get(self, url: str, **kwargs: Any) -> requests.Response:
+        bearer_token = self.token_manager.bearer_token()
+        r = self._get_with_token(url, bearer_token, **kwargs)
+
+        if r.status_code == requests.codes.unauthorized:
+            # our token may have been revoked early. try once more with a fresh one.
+            self.token_manager.invalidate(bearer_token)
+            r = self._get_with_token(url, self.token_manager.bearer_token(), **kwargs)
+
+        return r
+
+    def _get_with_token(self, url: str, bearer_token: str, **kwargs: Any) -> requests.Response:
+        try:
+            return self.http_client.get(url,
+                                        headers={'Authorization': f'Bearer {bearer_token}'},
+                                        **kwargs)
+        except RateLimitExceeded as e:
+            raise SpotifyRateLimitedError(f'Too many requests to spotify. "{e}"',
+                                          retry_after_seconds=e.retry_after_seconds)
+        except requests.RequestException as e:
+            raise SpotifyError(f'Unable to reach spotify. "{e}"')
+
+
+def _unexpected_response_error(r: requests.Response) -> SpotifyError:
+    if r.status_code == requests.codes.too_many_requests:
+        return SpotifyRateLimitedError('Too many requests to spotify.',
+                                       retry_after_seconds=retry_after_seconds(r))
+    return SpotifyError(f'Unexpected error code from spotify. "{r.status_code}: {r.text}"')
+
+
+class SpotifyToken(NamedTuple):
+    access_token: str
+    expires_at: float
+
+
+class SpotifyTokenManager:
+    """Lazily fetches a client credentials bearer token and keeps it until shortly before it
+    expires. Only one thread fetches a token at a time; concurrent callers wait for its result.
+    """
+    auth_url = 'https://accounts.spotify.com/api/token'
+    default_expires_in = 3600
+    refresh_margin_seconds = 60
+    timeouts = Timeouts(connect_seconds=2, read_seconds=4)
+
+    _shared: ClassVar[Dict[Tuple[str, str], 'SpotifyTokenManager']] = {}
+    _shared_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self,
+                 client_id: str,
+                 client_secret: str,
+                 clock: Callable[[], float] = time.monotonic,
+                 http_client: Optional[HttpClient] = None) -> None:
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.clock = clock
+        self.http_client = http_client or HttpClient(self.timeouts)
+        self._token: Optional[SpotifyToken] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, client_id: str, client_secret: str) -> 'SpotifyTokenManager':
+        """Return the process-wide token manager for a set of client credentials."""
+        with cls._shared_lock:
+            key = (client_id, client_secret)
+            if key not in cls._shared:
+                cls._shared[key] = cls(client_id, client_secret)
+            return cls._shared[key]
+
+    @classmethod
+    def clear_shared(cls) -> None:
+        with cls._shared_lock:
+            cls._shared.clear()
+
+    def bearer_token(self) -> str:
+        token = self._token
+        if token and not self._needs_refresh(token):
+            return token.access_token
+
+        with self._lock:
+            # another thread may have refreshed the token while we waited on the lock.
+            token = self._token
+            if not token or self._needs_refresh(token):
+                token = self._fetch_token()
+                self._token = token
+
+        return token.access_token
+
+    def invalidate(self, bearer_token: str) -> None:
+        """Forget `bearer_token`, unless it has already been replaced by a newer token."""
+        with self._lock:
+            if self._token and self._token.access_token == bearer_token:
+                self._token = None
+
+    def _needs_refresh(self, token: SpotifyToken) -> bool:
+        return self.clock() >= token.expires_at - self.refresh_margin_seconds
+
+    def _fetch_token(self) -> SpotifyToken:
+        requested_at = self.clock()
+        try:
+            r = self.http_client.post(
+                self.auth_url,
+                auth=(self.client_id, self.client_secret),
+                data={'grant_type': 'client_credentials'}
+            )
+        except requests.RequestException as e:
+            raise SpotifyError(f'Unable to reach spotify. "{e}"')
 
         if not r.status_code == requests.codes.all_good:
             raise SpotifyError(f'Unexpected error code from spotify. "{r.status_code}: {r.text}"')
 
-        return cast(str, r.json()['access_token'])
+        raw_token = r.json()
+        return SpotifyToken(
+            access_token=raw_token['access_token'],
+            expires_at=requested_at + raw_token.get('expires_in', self.default_expires_in)
+        )
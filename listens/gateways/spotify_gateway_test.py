@@ -0,0 +1,199 @@
+import json
+import threading
+from typing import Generator, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import requests
+
+import responses
+
+from listens.definitions.exceptions import SpotifyError, SpotifyRateLimitedError
+from listens.gateways.spotify_gateway import SpotifyGateway, SpotifyTokenManager
+from listens.http_client import HttpClient, TokenBucket
+from listens.testing import FakeClock
+
+
+AUTH_URL = 'https://accounts.spotify.com/api/token'
+TRACK_URL = 'https://api.spotify.com/v1/tracks/4rNGLh1y5Kkvr4bT28yfHU'
+TRACKS_URL = 'https://api.spotify.com/v1/tracks'
+
+
+@pytest.fixture(autouse=True)  # type: ignore
+def clear_shared_token_managers() -> Generator:
+    SpotifyTokenManager.clear_shared()
+    TokenBucket.clear_shared()
+    yield
+    SpotifyTokenManager.clear_shared()
+    TokenBucket.clear_shared()
+
+
+class TestSpotifyGateway:
+
+    @responses.activate  # type: ignore
+    def test_doesnt_fetch_a_token_until_it_is_needed(self) -> None:
+        # When
+        SpotifyGateway('client id', 'client secret')
+
+        # Then
+        assert len(responses.calls) == 0
+
+    @responses.activate  # type: ignore
+    def test_shares_a_token_across_gateways(self) -> None:
+        # Given
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'a', 'expires_in': 3600})
+        responses.add(responses.GET, TRACK_URL)
+
+        # When
+        SpotifyGateway('client id', 'client secret').song_exists('4rNGLh1y5Kkvr4bT28yfHU')
+        SpotifyGateway('client id', 'client secret').song_exists('4rNGLh1y5Kkvr4bT28yfHU')
+
+        # Then
+        assert [call.request.method for call in responses.calls] == ['POST', 'GET', 'GET']
+
+    @responses.activate  # type: ignore
+    def test_retries_once_with_a_new_token_on_unauthorized(self) -> None:
+        # Given
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'revoked'})
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'fresh'})
+        responses.add(responses.GET, TRACK_URL, status=401)
+        responses.add(responses.GET, TRACK_URL, status=200)
+
+        # When
+        song_exists = SpotifyGateway('client id', 'client secret').song_exists(
+            '4rNGLh1y5Kkvr4bT28yfHU'
+        )
+
+        # Then
+        assert song_exists
+        assert responses.calls[3].request.headers['Authorization'] == 'Bearer fresh'
+
+    @responses.activate  # type: ignore
+    def test_raises_a_spotify_error_when_spotify_cant_be_reached(self) -> None:
+        # Given
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'a', 'expires_in': 3600})
+        responses.add(responses.GET, TRACK_URL, body=requests.ReadTimeout('read timed out'))
+        http_client = HttpClient(sleep=lambda _: None)
+        gateway = SpotifyGateway('client id', 'client secret', http_client=http_client)
+
+        # When / Then
+        with pytest.raises(SpotifyError):
+            gateway.song_exists('4rNGLh1y5Kkvr4bT28yfHU')
+        assert http_client.stats()['api.spotify.com'].attempts == http_client.max_attempts
+
+    @responses.activate  # type: ignore
+    def test_raises_a_rate_limited_error_when_spotify_keeps_answering_429(self) -> None:
+        # Given
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'a', 'expires_in': 3600})
+        responses.add(responses.GET, TRACK_URL, status=429, headers={'Retry-After': '1'})
+        http_client = HttpClient(max_attempts=1)
+        gateway = SpotifyGateway('client id', 'client secret', http_client=http_client)
+
+        # When / Then
+        with pytest.raises(SpotifyRateLimitedError) as e:
+            gateway.song_exists('4rNGLh1y5Kkvr4bT28yfHU')
+        assert e.value.retry_after_seconds == 1
+
+    @responses.activate  # type: ignore
+    def test_sheds_lookups_once_its_budget_runs_out(self) -> None:
+        # Given
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'a', 'expires_in': 3600})
+        responses.add(responses.GET, TRACK_URL, status=200)
+        gateway = SpotifyGateway('client id', 'client secret',
+                                 rate_per_second=0.1, burst=1, max_wait_seconds=0)
+        gateway.song_exists('4rNGLh1y5Kkvr4bT28yfHU')
+
+        # When / Then
+        with pytest.raises(SpotifyRateLimitedError):
+            gateway.song_exists('4rNGLh1y5Kkvr4bT28yfHU')
+        assert len([call for call in responses.calls if call.request.method == 'GET']) == 1
+
+    @responses.activate  # type: ignore
+    def test_checks_many_songs_fifty_at_a_time(self) -> None:
+        # Given
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'a', 'expires_in': 3600})
+        responses.add_callback(responses.GET, TRACKS_URL, callback=several_tracks)
+        song_ids = [f'song{i}' for i in range(120)] + ['missing']
+
+        # When
+        songs_exist = SpotifyGateway('client id', 'client secret').songs_exist(song_ids)
+
+        # Then
+        assert songs_exist == {**dict.fromkeys(song_ids, True), 'missing': False}
+        assert len([call for call in responses.calls if call.request.method == 'GET']) == 3
+
+    @responses.activate  # type: ignore
+    def test_checks_each_song_on_its_own_when_spotify_rejects_an_id(self) -> None:
+        # Given
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'a', 'expires_in': 3600})
+        responses.add(responses.GET, TRACKS_URL, status=400)
+        responses.add(responses.GET, TRACK_URL, status=200)
+        responses.add(responses.GET, 'https://api.spotify.com/v1/tracks/not%20an%20id', status=400)
+
+        # When
+        songs_exist = SpotifyGateway('client id', 'client secret').songs_exist(
+            ['4rNGLh1y5Kkvr4bT28yfHU', 'not an id']
+        )
+
+        # Then
+        assert songs_exist == {'4rNGLh1y5Kkvr4bT28yfHU': True, 'not an id': False}
+
+
+def several_tracks(request: requests.PreparedRequest) -> Tuple[int, dict, str]:
+    """Answer the several-tracks endpoint, knowing every track but `missing`."""
+    [ids] = parse_qs(urlparse(str(request.url)).query)['ids']
+    tracks = [None if song_id == 'missing' else {'id': song_id} for song_id in ids.split(',')]
+    return 200, {}, json.dumps({'tracks': tracks})
+
+
+class TestSpotifyTokenManager:
+
+    @responses.activate  # type: ignore
+    def test_refreshes_shortly_before_expiry(self) -> None:
+        # Given
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'old', 'expires_in': 3600})
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'new', 'expires_in': 3600})
+        clock = FakeClock()
+        token_manager = SpotifyTokenManager('client id', 'client secret', clock=clock)
+        assert token_manager.bearer_token() == 'old'
+
+        # When
+        clock.now = 3600 - SpotifyTokenManager.refresh_margin_seconds - 1
+        before_margin_token = token_manager.bearer_token()
+        clock.now = 3600 - SpotifyTokenManager.refresh_margin_seconds
+        after_margin_token = token_manager.bearer_token()
+
+        # Then
+        assert before_margin_token == 'old'
+        assert after_margin_token == 'new'
+
+    @responses.activate  # type: ignore
+    def test_only_one_thread_fetches_a_token(self) -> None:
+        # Given
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'a', 'expires_in': 3600})
+        token_manager = SpotifyTokenManager('client id', 'client secret')
+        threads = [threading.Thread(target=token_manager.bearer_token) for _ in range(8)]
+
+        # When
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Then
+        assert len(responses.calls) == 1
+
+    @responses.activate  # type: ignore
+    def test_ignores_invalidation_of_an_already_replaced_token(self) -> None:
+        # Given
+        responses.add(responses.POST, AUTH_URL, json={'access_token': 'a'})
+        token_manager = SpotifyTokenManager('client id', 'client secret')
+        token_manager.bearer_token()
+
+        # When
+        token_manager.invalidate('some older token')
+
+        # Then
+        assert token_manager.bearer_token() == 'a'
+        assert len(responses.calls) == 1
@@ -1 +1 @@
-from .sqlalchemy_db_gateway import SqlAlchemyDbGateway
+from .sqlalchemy_db_gateway import PoolConfig, PoolStats, SqlAlchemyDbGateway
@@ -0,0 +1,51 @@
+"""Bring databases created from older models up to date.
+
+`Base.metadata.create_all` creates missing tables along with their indexes, but never alters a
+table that already exists. Migrations cover the rest. Every migration is idempotent, so running
+all of them against any database is always safe.
+
+USAGE:
+DATABASE_CONNECTION_STRING=... python -m listens.gateways.sqlalchemy_db_gateway.migrations
+"""
+import os
+from typing import Callable, List
+
+from sqlalchemy import Index, create_engine, inspect
+from sqlalchemy.engine import Engine
+
+from listens.gateways.sqlalchemy_db_gateway.models import Base, SqlListen
+
+
+Migration = Callable[[Engine], None]
+
+
+def migrate(engine: Engine) -> None:
+    for migration in MIGRATIONS:
+        migration(engine)
+
+
+def _create_index_if_missing(index: Index) -> Migration:
+
+    def migration(engine: Engine) -> None:
+        existing_indexes = inspect(engine).get_indexes(index.table.name)
+        if index.name not in {existing_index['name'] for existing_index in existing_indexes}:
+            index.create(bind=engine)
+
+    return migration
+
+
+def _index(name: str) -> Index:
+    return next(index for index in SqlListen.__table__.indexes if index.name == name)
+
+
+MIGRATIONS: List[Migration] = [
+    _create_index_if_missing(_index('ix_listens_listen_time_utc_id')),
+    _create_index_if_missing(_index('ix_listens_listener_name_listen_time_utc_id')),
+    _create_index_if_missing(_index('ix_listens_song_id_listen_time_utc_id')),
+]
+
+
+if __name__ == '__main__':
+    engine = create_engine(os.environ['DATABASE_CONNECTION_STRING'])
+    Base.metadata.create_all(engine)
+    migrate(engine)
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import Column, DateTime, Enum, Integer, String
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 
 from listens.definitions import MusicProvider
@@ -9,16 +9,41 @@ from listens.definitions import MusicProvider
 
 Base: Any = declarative_base()
 
+# SqlListen.id is a postgres integer.
+MAX_LISTEN_ID = 2 ** 31 - 1
+
 
 class SqlListen(Base):
     __tablename__ = 'listens'
+    __table_args__ = (
+        # backs keyset pagination, which orders listens by (listen_time_utc, id).
+        Index('ix_listens_listen_time_utc_id', 'listen_time_utc', 'id'),
+        # back keyset pagination of one listener's listens, and of one song's listens.
+        Index('ix_listens_listener_name_listen_time_utc_id',
+              'listener_name', 'listen_time_utc', 'id'),
+        Index('ix_listens_song_id_listen_time_utc_id', 'song_id', 'listen_time_utc', 'id'),
+    )
 
     id = Column(Integer(), primary_key=True)
     song_id = Column(String(50), nullable=False)
     song_vendor = Column(Enum(MusicProvider), nullable=False)  # TODO: Change to song_provider.
     listener_name = Column(String(30), nullable=False)
     note = Column(String(100), nullable=True)
-    listen_time_utc = Column(DateTime(), nullable=False, index=True)
+    listen_time_utc = Column(DateTime(), nullable=False)
     iana_timezone = Column(String(40), nullable=False)
     created_at_utc = Column(DateTime(), nullable=False, default=datetime.utcnow)
     updated_on_utc = Column(DateTime(), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SqlIdempotencyKey(Base):
+    """The listen added by a request carrying an idempotency key, so that retries of the request
+    get the same listen back instead of adding another."""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        Index('ux_idempotency_keys_idempotency_key', 'idempotency_key', unique=True),
+    )
+
+    id = Column(Integer(), primary_key=True)
+    idempotency_key = Column(String(255), nullable=False)
+    listen_id = Column(Integer(), ForeignKey('listens.id'), nullable=False)
+    created_at_utc = Column(DateTime(), nullable=False, default=datetime.utcnow)
@@ -1,58 +1,245 @@
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Callable, Iterable, List, Optional, cast
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, cast
 
-from sqlalchemy import asc, create_engine, desc
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy import asc, create_engine, desc, event, func, literal, select, tuple_
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
 
 from listens.abc import DbGateway as DbGatewayABC
-from listens.definitions import Listen, ListenInput, SortOrder, exceptions
-from listens.gateways.sqlalchemy_db_gateway.models import Base, SqlListen
+from listens.definitions import Listen, ListenCursor, ListenInput, SortOrder, exceptions
+from listens.gateways.sqlalchemy_db_gateway import migrations
+from listens.gateways.sqlalchemy_db_gateway.models import (
+    Base,
+    MAX_LISTEN_ID,
+    SqlIdempotencyKey,
+    SqlListen
+)
+
+
+class PoolConfig(NamedTuple):
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout_seconds: float = 30
+    pool_recycle_seconds: int = 30 * 60
+    pool_pre_ping: bool = True
+    # leave pooling to an external pooler (e.g. pgbouncer) and open a connection per session.
+    external_pooler: bool = False
+
+
+class PoolStats(NamedTuple):
+    connections_opened: int
+    checkouts: int
+    checked_out: int
+    total_checkout_wait_seconds: float
+    max_checkout_wait_seconds: float
+
+
+# the columns of SqlListen that make up a Listen.
+LISTEN_COLUMNS = [
+    SqlListen.id,
+    SqlListen.song_id,
+    SqlListen.song_vendor,
+    SqlListen.listener_name,
+    SqlListen.listen_time_utc,
+    SqlListen.note,
+    SqlListen.iana_timezone
+]
 
 
 class SqlAlchemyDbGateway(DbGatewayABC):
+    fetch_batch_size = 500
 
-    def __init__(self, db_name: str, echo: bool = False) -> None:
-        self.engine = create_engine(db_name, echo=echo, poolclass=NullPool)
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+    def __init__(self,
+                 db_name: str,
+                 echo: bool = False,
+                 pool_config: Optional[PoolConfig] = None) -> None:
+        self.engine = create_engine(
+            db_name,
+            echo=echo,
+            **SqlAlchemyDbGateway._pool_arguments(db_name, pool_config or PoolConfig())
+        )
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self._pool_metrics = _PoolMetrics()
+        event.listen(self.engine, 'connect', self._pool_metrics.on_connect)
+        event.listen(self.engine, 'checkout', self._pool_metrics.on_checkout)
+        event.listen(self.engine, 'checkin', self._pool_metrics.on_checkin)
 
     def add_listen(self, listen_input: ListenInput) -> Listen:
-        sql_listen = SqlAlchemyDbGateway._build_sql_listen(listen_input)
-        self.session.add(sql_listen)
-        self.session.commit()
+        with self._session_scope() as session:
+            sql_listen = SqlAlchemyDbGateway._build_sql_listen(listen_input)
+            session.add(sql_listen)
+            session.flush()
 
-        return SqlAlchemyDbGateway._pluck_listen(sql_listen)
+            return SqlAlchemyDbGateway._pluck_listen(sql_listen)
 
-    def fetch_listen(self, listen_id: str) -> Listen:
-        query = self.session.query(SqlListen)
-        query = query.filter(SqlListen.id == listen_id)
+    def add_listens(self, listen_inputs: List[ListenInput]) -> List[Listen]:
+        if not listen_inputs:
+            return []
 
-        sql_listen = query.first()
-        if not sql_listen:
+        insert = SqlListen.__table__.insert()
+        rows = [
+            SqlAlchemyDbGateway._build_listen_row(listen_input)
+            for listen_input in listen_inputs
+        ]
+        with self._session_scope() as session:
+            connection = session.connection()
+            if connection.dialect.name == 'postgresql':
+                # RETURNING doesnt promise the rows back in VALUES order, so reserve the ids from
+                # the id sequence first, and insert every listen with its own id in one statement.
+                listen_ids = SqlAlchemyDbGateway._reserve_listen_ids(connection, len(rows))
+                connection.execute(insert.values([
+                    dict(row, id=listen_id) for listen_id, row in zip(listen_ids, rows)
+                ]))
+            else:
+                # other databases (e.g. sqlite) insert row by row in one transaction.
+                listen_ids = [
+                    connection.execute(insert, row).inserted_primary_key[0]
+                    for row in rows
+                ]
+
+            return [
+                Listen(id=str(listen_id), **listen_input._asdict())
+                for listen_id, listen_input in zip(listen_ids, listen_inputs)
+            ]
+
+    def add_listen_with_idempotency_key(self,
+                                        listen_input: ListenInput,
+                                        idempotency_key: str) -> Tuple[Listen, bool]:
+        try:
+            with self._session_scope() as session:
+                sql_listen = SqlAlchemyDbGateway._build_sql_listen(listen_input)
+                session.add(sql_listen)
+                session.flush()
+                session.add(SqlIdempotencyKey(idempotency_key=idempotency_key,
+                                              listen_id=sql_listen.id))
+                session.flush()
+
+                return SqlAlchemyDbGateway._pluck_listen(sql_listen), True
+
+        except IntegrityError:
+            # a concurrent request with the same key added its listen first. ours was rolled back.
+            listen = self.fetch_listen_by_idempotency_key(idempotency_key)
+            if not listen:
+                raise
+            return listen, False
+
+    def fetch_listen(self, listen_id: str) -> Listen:
+        sql_listen_id = SqlAlchemyDbGateway._pluck_listen_id(listen_id)
+        if sql_listen_id is None:
+            # postgres would reject the comparison outright, rather than find nothing.
             raise exceptions.ListenDoesntExistError(f'Listen with id {listen_id} doesnt exist.')
 
-        return SqlAlchemyDbGateway._pluck_listen(sql_listen)
+        with self._session_scope() as session:
+            query = session.query(SqlListen)
+            query = query.filter(SqlListen.id == sql_listen_id)
+
+            sql_listen = query.first()
+            if not sql_listen:
+                raise exceptions.ListenDoesntExistError(f'Listen with id {listen_id} doesnt exist.')
+
+            return SqlAlchemyDbGateway._pluck_listen(sql_listen)
+
+    def fetch_listen_by_idempotency_key(self, idempotency_key: str) -> Optional[Listen]:
+        query = select(LISTEN_COLUMNS).select_from(
+            SqlIdempotencyKey.__table__.join(SqlListen.__table__)
+        ).where(SqlIdempotencyKey.idempotency_key == idempotency_key)
+
+        with self._session_scope() as session:
+            row = session.connection().execute(query).first()
+
+        return SqlAlchemyDbGateway._pluck_listen_row(row) if row else None
 
     def fetch_listens(self,
                       limit: int,
                       sort_time: SortOrder,
                       before_utc: Optional[datetime] = None,
-                      after_utc: Optional[datetime] = None) -> List[Listen]:
-        query = self.session.query(SqlListen)
+                      after_utc: Optional[datetime] = None,
+                      cursor: Optional[ListenCursor] = None,
+                      listener_name: Optional[str] = None,
+                      song_id: Optional[str] = None) -> List[Listen]:
+        # listens are read with a core select of just the columns a Listen needs. this skips orm
+        # hydration, instrumentation and the identity map, none of which a read-only page uses.
+        query = select(LISTEN_COLUMNS)
+
+        # each filter has a (filter, listen_time_utc, id) index to seek and page through.
+        if listener_name is not None:
+            query = query.where(SqlListen.listener_name == listener_name)
+
+        if song_id is not None:
+            query = query.where(SqlListen.song_id == song_id)
 
         if after_utc:
-            query = query.filter(SqlListen.listen_time_utc > after_utc)
+            query = query.where(SqlListen.listen_time_utc > after_utc)
 
         if before_utc:
-            query = query.filter(SqlListen.listen_time_utc < before_utc)
+            query = query.where(SqlListen.listen_time_utc < before_utc)
+
+        if cursor:
+            query = query.where(SqlAlchemyDbGateway._after_cursor_clause(cursor, sort_time))
 
         sql_order_function = SqlAlchemyDbGateway._sql_order_function(sort_time)
-        query = query.order_by(sql_order_function(SqlListen.listen_time_utc))
+        query = query.order_by(
+            sql_order_function(SqlListen.listen_time_utc),
+            sql_order_function(SqlListen.id)
+        )
 
         query = query.limit(limit)
 
-        return SqlAlchemyDbGateway._pluck_listens(cast(Iterable[SqlListen], query))
+        listens: List[Listen] = []
+        with self._session_scope() as session:
+            connection = session.connection().execution_options(stream_results=True)
+            result = connection.execute(query)
+            while True:
+                rows = result.fetchmany(self.fetch_batch_size)
+                if not rows:
+                    break
+                listens.extend(SqlAlchemyDbGateway._pluck_listen_row(row) for row in rows)
+
+        return listens
+
+    @contextmanager
+    def _session_scope(self) -> Iterator[Session]:
+        """Provide a session for the length of a single operation, committing it on success."""
+        session = self.Session()
+        try:
+            started_at = time.monotonic()
+            session.connection()
+            self._pool_metrics.record_checkout_wait(time.monotonic() - started_at)
+
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    def _pool_arguments(db_name: str, pool_config: PoolConfig) -> Dict[str, Any]:
+        url = make_url(db_name)
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            # every connection to an in-memory sqlite database gets its own database.
+            return {
+                'poolclass': StaticPool,
+                'connect_args': {'check_same_thread': False}
+            }
+
+        if pool_config.external_pooler:
+            return {'poolclass': NullPool}
+
+        return {
+            'poolclass': QueuePool,
+            'pool_size': pool_config.pool_size,
+            'max_overflow': pool_config.max_overflow,
+            'pool_timeout': pool_config.pool_timeout_seconds,
+            'pool_recycle': pool_config.pool_recycle_seconds,
+            'pool_pre_ping': pool_config.pool_pre_ping
+        }
 
     @staticmethod
     def _build_sql_listen(listen_input: ListenInput) -> SqlListen:
@@ -66,8 +253,50 @@ class SqlAlchemyDbGateway(DbGatewayABC):
         )
 
     @staticmethod
-    def _pluck_listens(sql_listens: Iterable[SqlListen]) -> List[Listen]:
-        return [SqlAlchemyDbGateway._pluck_listen(sql_listen) for sql_listen in sql_listens]
+    def _reserve_listen_ids(connection: Any, count: int) -> List[int]:
+        id_sequence = func.pg_get_serial_sequence(SqlListen.__tablename__, SqlListen.id.name)
+        query = select([func.nextval(id_sequence)]).select_from(func.generate_series(1, count))
+        return [listen_id for listen_id, in connection.execute(query)]
+
+    @staticmethod
+    def _build_listen_row(listen_input: ListenInput) -> Dict[str, Any]:
+        return {
+            'song_id': listen_input.song_id,
+            'song_vendor': listen_input.song_provider,
+            'listener_name': listen_input.listener_name,
+            'listen_time_utc': listen_input.listen_time_utc,
+            'note': listen_input.note,
+            'iana_timezone': listen_input.iana_timezone
+        }
+
+    @staticmethod
+    def _pluck_listen_id(listen_id: str) -> Optional[int]:
+        """Return listen_id as the integer id column, or None if it can't be the id of a listen.
+
+        >>> SqlAlchemyDbGateway._pluck_listen_id('42')
+        42
+        >>> SqlAlchemyDbGateway._pluck_listen_id('abc') is None
+        True
+        >>> SqlAlchemyDbGateway._pluck_listen_id('99999999999') is None
+        True
+        """
+        try:
+            sql_listen_id = int(listen_id)
+        except ValueError:
+            return None
+        return sql_listen_id if 0 < sql_listen_id <= MAX_LISTEN_ID else None
+
+    @staticmethod
+    def _pluck_listen_row(row: Any) -> Listen:
+        return Listen(
+            id=str(row.id),
+            song_id=row.song_id,
+            song_provider=row.song_vendor,
+            listener_name=row.listener_name,
+            listen_time_utc=row.listen_time_utc,
+            note=row.note,
+            iana_timezone=row.iana_timezone,
+        )
 
     @staticmethod
     def _pluck_listen(sql_listen: SqlListen) -> Listen:
@@ -81,6 +310,24 @@ class SqlAlchemyDbGateway(DbGatewayABC):
             iana_timezone=sql_listen.iana_timezone,
         )
 
+    @staticmethod
+    def _after_cursor_clause(cursor: ListenCursor, sort_order: SortOrder) -> Any:
+        """Row value comparison lets the database seek straight to the cursor on the
+        (listen_time_utc, id) index."""
+        position = tuple_(SqlListen.listen_time_utc, SqlListen.id)
+        cursor_position = tuple_(
+            literal(cursor.listen_time_utc, SqlListen.listen_time_utc.type),
+            literal(int(cursor.id), SqlListen.id.type)
+        )
+        if sort_order == SortOrder.ASCENDING:
+            return position > cursor_position
+
+        elif sort_order == SortOrder.DESCENDING:
+            return position < cursor_position
+
+        else:
+            raise LookupError('Invalid sort_order')
+
     @staticmethod
     def _sql_order_function(sort_order: SortOrder) -> Callable:
         if sort_order == SortOrder.ASCENDING:
@@ -92,10 +339,56 @@ class SqlAlchemyDbGateway(DbGatewayABC):
         else:
             raise LookupError('Invalid sort_order')
 
+    def pool_stats(self) -> PoolStats:
+        """Not part of the DbGatewayABC."""
+        return self._pool_metrics.stats()
+
     def persist_schema(self) -> None:
         """Not part of the DbGatewayABC."""
         Base.metadata.create_all(self.engine)
+        migrations.migrate(self.engine)
 
     def close_connections(self) -> None:
-        """Not part of the DbGatewayABC."""
         self.engine.dispose()
+
+
+class _PoolMetrics:
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.checkouts = 0
+        self.checked_out = 0
+        self.total_checkout_wait_seconds = 0.0
+        self.max_checkout_wait_seconds = 0.0
+
+    def on_connect(self, dbapi_connection: Any, connection_record: Any) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def on_checkout(self,
+                    dbapi_connection: Any,
+                    connection_record: Any,
+                    connection_proxy: Any) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+
+    def on_checkin(self, dbapi_connection: Any, connection_record: Any) -> None:
+        with self._lock:
+            self.checked_out -= 1
+
+    def record_checkout_wait(self, wait_seconds: float) -> None:
+        with self._lock:
+            self.total_checkout_wait_seconds += wait_seconds
+            self.max_checkout_wait_seconds = max(self.max_checkout_wait_seconds, wait_seconds)
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            return PoolStats(
+                connections_opened=self.connections_opened,
+                checkouts=self.checkouts,
+                checked_out=self.checked_out,
+                total_checkout_wait_seconds=self.total_checkout_wait_seconds,
+                max_checkout_wait_seconds=self.max_checkout_wait_seconds
+            )
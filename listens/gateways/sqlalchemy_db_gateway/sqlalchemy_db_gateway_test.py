@@ -0,0 +1,190 @@
+import os
+import tempfile
+from datetime import datetime
+from typing import Generator, List, Optional
+
+import pytest
+
+from sqlalchemy import inspect
+
+from listens.definitions import Listen, ListenCursor, ListenInput, MusicProvider, SortOrder
+from listens.gateways.sqlalchemy_db_gateway import PoolConfig, SqlAlchemyDbGateway
+
+
+@pytest.fixture  # type: ignore
+def db_name() -> Generator:
+    with tempfile.TemporaryDirectory() as directory:
+        yield 'sqlite:///' + os.path.join(directory, 'listens.db')
+
+
+class TestSqlAlchemyDbGateway:
+
+    def test_reuses_pooled_connections_across_operations(self, db_name: str) -> None:
+        # Given
+        db_gateway = SqlAlchemyDbGateway(db_name)
+        db_gateway.persist_schema()
+        stats_before = db_gateway.pool_stats()
+
+        # When
+        listen = db_gateway.add_listen(listen_input_factory())
+        db_gateway.fetch_listen(listen.id)
+        db_gateway.fetch_listens(limit=10, sort_time=SortOrder.DESCENDING)
+
+        # Then
+        pool_stats = db_gateway.pool_stats()
+        assert pool_stats.connections_opened == stats_before.connections_opened
+        assert pool_stats.checkouts == stats_before.checkouts + 3
+        assert pool_stats.checked_out == 0
+
+    def test_opens_a_connection_per_operation_with_an_external_pooler(self, db_name: str) -> None:
+        # Given
+        db_gateway = SqlAlchemyDbGateway(db_name, pool_config=PoolConfig(external_pooler=True))
+        db_gateway.persist_schema()
+        stats_before = db_gateway.pool_stats()
+
+        # When
+        listen = db_gateway.add_listen(listen_input_factory())
+        db_gateway.fetch_listen(listen.id)
+
+        # Then
+        assert db_gateway.pool_stats().connections_opened == stats_before.connections_opened + 2
+
+    def test_listens_outlive_their_session(self) -> None:
+        # Given
+        db_gateway = SqlAlchemyDbGateway('sqlite://')
+        db_gateway.persist_schema()
+
+        # When
+        listen = db_gateway.add_listen(listen_input_factory())
+
+        # Then
+        assert db_gateway.fetch_listen(listen.id) == listen
+
+    @pytest.mark.parametrize('sort_order', [  # type: ignore
+        SortOrder.ASCENDING,
+        SortOrder.DESCENDING
+    ])
+    def test_pages_through_listens_that_share_a_listen_time(self, sort_order: SortOrder) -> None:
+        # Given five listens submitted at the same time
+        db_gateway = SqlAlchemyDbGateway('sqlite://')
+        db_gateway.persist_schema()
+        listens = [db_gateway.add_listen(listen_input_factory()) for _ in range(5)]
+
+        # When
+        paged_listens: List[Listen] = []
+        cursor: Optional[ListenCursor] = None
+        while True:
+            page = db_gateway.fetch_listens(limit=2, sort_time=sort_order, cursor=cursor)
+            if not page:
+                break
+            paged_listens += page
+            cursor = ListenCursor(page[-1].listen_time_utc, page[-1].id)
+
+        # Then every listen is fetched exactly once
+        if sort_order == SortOrder.DESCENDING:
+            listens.reverse()
+        assert paged_listens == listens
+
+    def test_adds_many_listens_at_once(self) -> None:
+        # Given
+        db_gateway = SqlAlchemyDbGateway('sqlite://')
+        db_gateway.persist_schema()
+        listen_inputs = [listen_input_factory(listener_name=name) for name in ('a', 'b', 'c')]
+
+        # When
+        listens = db_gateway.add_listens(listen_inputs)
+
+        # Then
+        assert [listen.listener_name for listen in listens] == ['a', 'b', 'c']
+        assert [db_gateway.fetch_listen(listen.id) for listen in listens] == listens
+
+    def test_pages_through_one_listeners_listens_of_a_song(self) -> None:
+        # Given
+        db_gateway = SqlAlchemyDbGateway('sqlite://')
+        db_gateway.persist_schema()
+        listens = db_gateway.add_listens([
+            listen_input_factory(listener_name=listener_name, song_id=song_id)
+            for listener_name in ('a', 'b')
+            for song_id in ('0aq7ohTG6VDYQvsnAYtA5e', '4rNGLh1y5Kkvr4bT28yfHU')
+            for _ in range(2)
+        ])
+
+        # When
+        first_page = db_gateway.fetch_listens(limit=1, sort_time=SortOrder.DESCENDING,
+                                              listener_name='b', song_id='4rNGLh1y5Kkvr4bT28yfHU')
+        second_page = db_gateway.fetch_listens(
+            limit=5,
+            sort_time=SortOrder.DESCENDING,
+            cursor=ListenCursor(first_page[0].listen_time_utc, first_page[0].id),
+            listener_name='b',
+            song_id='4rNGLh1y5Kkvr4bT28yfHU'
+        )
+        listeners_listens = db_gateway.fetch_listens(limit=10, sort_time=SortOrder.ASCENDING,
+                                                     listener_name='a')
+
+        # Then
+        assert first_page + second_page == [listens[7], listens[6]]
+        assert listeners_listens == listens[:4]
+
+    def test_adds_only_one_listen_per_idempotency_key(self) -> None:
+        # Given
+        db_gateway = SqlAlchemyDbGateway('sqlite://')
+        db_gateway.persist_schema()
+        listen, added = db_gateway.add_listen_with_idempotency_key(listen_input_factory(), 'key')
+
+        # When
+        retried_listen, retry_added = db_gateway.add_listen_with_idempotency_key(
+            listen_input_factory(),
+            'key'
+        )
+
+        # Then
+        assert (added, retry_added) == (True, False)
+        assert retried_listen == listen
+        assert db_gateway.fetch_listen_by_idempotency_key('key') == listen
+        assert db_gateway.fetch_listen_by_idempotency_key('other key') is None
+        assert db_gateway.fetch_listens(limit=10, sort_time=SortOrder.ASCENDING) == [listen]
+
+    def test_migrates_databases_created_before_an_index_was_added(self, db_name: str) -> None:
+        # Given a listens table without its keyset pagination index
+        db_gateway = SqlAlchemyDbGateway(db_name)
+        db_gateway.persist_schema()
+        db_gateway.engine.execute('DROP INDEX ix_listens_listen_time_utc_id')
+
+        # When
+        db_gateway.persist_schema()
+
+        # Then
+        index_names = {index['name'] for index in inspect(db_gateway.engine).get_indexes('listens')}
+        assert 'ix_listens_listen_time_utc_id' in index_names
+
+    def test_migrates_databases_created_before_the_filter_indexes_were_added(self,
+                                                                             db_name: str) -> None:
+        # Given
+        db_gateway = SqlAlchemyDbGateway(db_name)
+        db_gateway.persist_schema()
+        db_gateway.engine.execute('DROP INDEX ix_listens_listener_name_listen_time_utc_id')
+        db_gateway.engine.execute('DROP INDEX ix_listens_song_id_listen_time_utc_id')
+
+        # When
+        db_gateway.persist_schema()
+
+        # Then
+        index_names = {index['name'] for index in inspect(db_gateway.engine).get_indexes('listens')}
+        assert {
+            'ix_listens_listener_name_listen_time_utc_id',
+            'ix_listens_song_id_listen_time_utc_id'
+        } <= index_names
+
+
+def listen_input_factory(*,
+                         listener_name: str = 'geez',
+                         song_id: str = '0aq7ohTG6VDYQvsnAYtA5e') -> ListenInput:
+    return ListenInput(
+        song_id=song_id,
+        song_provider=MusicProvider.SPOTIFY,
+        listener_name=listener_name,
+        listen_time_utc=datetime(2018, 11, 12, 5, 53, 38),
+        note=None,
+        iana_timezone='Asia/Tokyo'
+    )
@@ -1,39 +1,55 @@
 from datetime import date, datetime
-from typing import Dict
+from typing import Dict, Optional
 
 import requests
 
 from listens.abc import SunlightGateway as SunlightGatewayABC
 from listens.definitions import SunlightWindow, exceptions
+from listens.http_client import HttpClient, Timeouts
+
+
+# statuses of lookups the sunlight service rejected, rather than failed to answer.
+REJECTED_STATUS_CODES = frozenset({400, 404, 422})
 
 
 class SunlightServiceGateway(SunlightGatewayABC):
     endpoint = 'https://micro.morningcd.com/sunlight'
+    timeouts = Timeouts(connect_seconds=2, read_seconds=4)
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(self, api_key: str, http_client: Optional[HttpClient] = None) -> None:
         self.api_key = api_key
+        self.http_client = http_client or HttpClient(self.timeouts)
 
     def fetch_sunlight_window(self, iana_timezone: str, on_date: date) -> SunlightWindow:
-        r = requests.get(
-            self.endpoint,
-            params={
-                'iana_timezone': iana_timezone,
-                'on_date': on_date.isoformat()
-            },
-            headers={'x-api-key': self.api_key}
-        )
+        try:
+            r = self.http_client.get(
+                self.endpoint,
+                params={
+                    'iana_timezone': iana_timezone,
+                    'on_date': on_date.isoformat()
+                },
+                headers={'x-api-key': self.api_key}
+            )
+        except requests.RequestException as e:
+            raise exceptions.SunlightServiceError(f'Unable to reach the sunlight service. "{e}"')
 
         if not r.status_code == requests.codes.ok:
             try:
                 message = r.json()['message']
             except (KeyError, ValueError):
                 message = ''
-            raise exceptions.SunlightServiceError(message)
+            raise build_sunlight_service_error(r.status_code, message)
+
+        return pluck_sunlight_window(r.json())
+
 
-        return _pluck_sunlight_window(r.json())
+def build_sunlight_service_error(status_code: int, message: str) -> exceptions.SunlightServiceError:
+    if status_code in REJECTED_STATUS_CODES:
+        return exceptions.SunlightServiceRejectedError(message)
+    return exceptions.SunlightServiceError(message)
 
 
-def _pluck_sunlight_window(raw_sunlight_window: Dict) -> SunlightWindow:
+def pluck_sunlight_window(raw_sunlight_window: Dict) -> SunlightWindow:
     return SunlightWindow(
         sunrise_utc=_pluck_datetime(raw_sunlight_window['sunrise_utc']),
         sunset_utc=_pluck_datetime(raw_sunlight_window['sunset_utc'])
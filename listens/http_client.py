@@ -0,0 +1,326 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Callable, ClassVar, DefaultDict, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from listens.metrics import Metrics, NULL_METRICS
+
+
+# keep-alive connections kept per host. enough for every lookup a request runs concurrently.
+POOL_MAXSIZE = 10
+
+# api gateway gives up on a request after 29 seconds, so a request and all its retries have to
+# be done well within that.
+DEADLINE_SECONDS = 25
+
+
+class Timeouts(NamedTuple):
+    connect_seconds: float = 3.05
+    read_seconds: float = 10
+
+
+class HostStats(NamedTuple):
+    attempts: int
+    retries: int
+    failures: int
+    total_seconds: float
+    max_seconds: float
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.attempts if self.attempts else 0.0
+
+
+class RateLimitExceeded(requests.RequestException):
+    """Raised instead of making a request that would have to wait too long for its rate limit."""
+
+    def __init__(self, message: str, retry_after_seconds: float) -> None:
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+
+class TokenBucketStats(NamedTuple):
+    acquired: int
+    # acquisitions that had to wait for a token.
+    throttled: int
+    # acquisitions refused because they would have waited longer than max_wait_seconds.
+    shed: int
+    # times the upstream asked us to back off.
+    pauses: int
+    wait_seconds: float
+
+
+class TokenBucket:
+    """Spaces out requests to an upstream, allowing bursts of up to `burst` requests and
+    `rate_per_second` on average.
+
+    A caller without a token waits its turn for one, unless the wait would be longer than
+    `max_wait_seconds`, in which case it is shed with RateLimitExceeded instead. Waiting callers
+    reserve their tokens, so they are served in the order they arrived. `pause` stops handing
+    out tokens for a while, e.g. when the upstream answers 429 with a Retry-After.
+    """
+
+    _shared: ClassVar[Dict[Tuple[str, float, float, float], 'TokenBucket']] = {}
+    _shared_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self,
+                 rate_per_second: float,
+                 burst: float,
+                 max_wait_seconds: float = 1,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_wait_seconds = max_wait_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        # negative when waiting callers have reserved tokens that haven't been refilled yet.
+        self._tokens = float(burst)
+        # in the future while paused.
+        self._refilled_at = clock()
+        self._stats = TokenBucketStats(0, 0, 0, 0, 0.0)
+
+    @classmethod
+    def shared(cls,
+               name: str,
+               rate_per_second: float,
+               burst: float,
+               max_wait_seconds: float = 1) -> 'TokenBucket':
+        """Return the process-wide token bucket for an upstream."""
+        with cls._shared_lock:
+            key = (name, rate_per_second, burst, max_wait_seconds)
+            if key not in cls._shared:
+                cls._shared[key] = cls(rate_per_second, burst, max_wait_seconds)
+            return cls._shared[key]
+
+    @classmethod
+    def clear_shared(cls) -> None:
+        with cls._shared_lock:
+            cls._shared.clear()
+
+    def acquire(self) -> float:
+        """Take a token, waiting for one if need be. Return the seconds waited."""
+        with self._lock:
+            now = self.clock()
+            if now > self._refilled_at:
+                elapsed = now - self._refilled_at
+                self._tokens = min(self.burst, self._tokens + elapsed * self.rate_per_second)
+                self._refilled_at = now
+
+            wait_seconds = (
+                self._refilled_at - now + max(0.0, 1 - self._tokens) / self.rate_per_second
+            )
+            if wait_seconds > self.max_wait_seconds:
+                self._stats = self._stats._replace(shed=self._stats.shed + 1)
+                raise RateLimitExceeded(
+                    f'Rate limited for another {wait_seconds:.2f} seconds.',
+                    retry_after_seconds=wait_seconds
+                )
+
+            self._tokens -= 1
+            self._stats = self._stats._replace(
+                acquired=self._stats.acquired + 1,
+                throttled=self._stats.throttled + (1 if wait_seconds else 0),
+                wait_seconds=self._stats.wait_seconds + wait_seconds
+            )
+
+        if wait_seconds:
+            self.sleep(wait_seconds)
+        return wait_seconds
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no more tokens for `seconds`."""
+        with self._lock:
+            paused_until = self.clock() + seconds
+            if paused_until > self._refilled_at:
+                self._refilled_at = paused_until
+                self._tokens = min(self._tokens, 0.0)
+            self._stats = self._stats._replace(pauses=self._stats.pauses + 1)
+
+    def stats(self) -> TokenBucketStats:
+        with self._lock:
+            return self._stats
+
+
+class HttpClient:
+    """Makes http requests over a shared, pooled keep-alive session, so connections (and their
+    tls sessions) are reused across requests and gateways.
+
+    Every request has a connect and a read timeout. GETs are idempotent, so GETs that fail to
+    connect, time out or get a 5xx gateway status are retried, up to `max_attempts` in all, after
+    a full-jitter exponential backoff. Other methods are only attempted once. A request and its
+    retries share a deadline of `deadline_seconds`: no attempt is given longer than what is left of
+    it, and no retry is started that would have to back off past it.
+
+    Given a `rate_limiter`, every attempt first takes a token from it, and a 429 pauses it for
+    the response's Retry-After (or the backoff) before a GET is retried. Time spent waiting for
+    tokens, requests shed and 429s are counted in `metrics` as `<metrics_name>.throttle_wait`,
+    `<metrics_name>.shed` and `<metrics_name>.rate_limited`.
+
+    The latency of every attempt is recorded per host.
+    """
+    retry_statuses = frozenset({500, 502, 503, 504})
+
+    def __init__(self,
+                 timeouts: Timeouts = Timeouts(),
+                 max_attempts: int = 3,
+                 backoff_seconds: float = 0.1,
+                 deadline_seconds: float = DEADLINE_SECONDS,
+                 session: Optional[requests.Session] = None,
+                 clock: Callable[[], float] = time.perf_counter,
+                 sleep: Callable[[float], None] = time.sleep,
+                 jitter: Callable[[], float] = random.random,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 metrics: Metrics = NULL_METRICS,
+                 metrics_name: str = 'http') -> None:
+        self.timeouts = timeouts
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.deadline_seconds = deadline_seconds
+        self.session = session or shared_session()
+        self.clock = clock
+        self.sleep = sleep
+        self.jitter = jitter
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.metrics_name = metrics_name
+        self._lock = threading.Lock()
+        self._stats: DefaultDict[str, HostStats] = defaultdict(lambda: HostStats(0, 0, 0, 0, 0))
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        host = urlsplit(url).netloc
+        max_attempts = self.max_attempts if method == 'GET' else 1
+
+        deadline = self.clock() + self.deadline_seconds
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                self._acquire(self.rate_limiter)
+
+            started_at = self.clock()
+            remaining_seconds = deadline - started_at
+            if remaining_seconds <= 0:
+                raise requests.Timeout(f'Ran out of time to {method} {url}.')
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    timeout=(min(self.timeouts.connect_seconds, remaining_seconds),
+                             min(self.timeouts.read_seconds, remaining_seconds)),
+                    **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(host, self.clock() - started_at, attempt, failed=True)
+                backoff_seconds = self._backoff_seconds(attempt)
+                if not self._retries(attempt, max_attempts, deadline, backoff_seconds):
+                    raise
+                self.sleep(backoff_seconds)
+                attempt += 1
+                continue
+
+            rate_limited = response.status_code == requests.codes.too_many_requests
+            if rate_limited:
+                self.metrics.increment(f'{self.metrics_name}.rate_limited')
+                if self.rate_limiter:
+                    self.rate_limiter.pause(retry_after_seconds(response) or self.backoff_seconds)
+
+            failed = (response.status_code in self.retry_statuses
+                      or rate_limited and self.rate_limiter is not None)
+            self._record(host, self.clock() - started_at, attempt, failed=failed)
+
+            # a rate limited retry waits on the rate limiter instead of backing off.
+            backoff_seconds = 0.0 if rate_limited else self._backoff_seconds(attempt)
+            if not failed or not self._retries(attempt, max_attempts, deadline, backoff_seconds):
+                return response
+
+            # hand the failed response's connection back to the pool before retrying.
+            response.close()
+            if backoff_seconds:
+                self.sleep(backoff_seconds)
+            attempt += 1
+
+    def stats(self) -> Dict[str, HostStats]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _backoff_seconds(self, attempt: int) -> float:
+        """The full-jitter backoff before retrying `attempt`."""
+        return self.jitter() * self.backoff_seconds * 2.0 ** attempt
+
+    def _retries(self,
+                 attempt: int,
+                 max_attempts: int,
+                 deadline: float,
+                 backoff_seconds: float) -> bool:
+        return attempt < max_attempts - 1 and self.clock() + backoff_seconds < deadline
+
+    def _acquire(self, rate_limiter: TokenBucket) -> None:
+        try:
+            wait_seconds = rate_limiter.acquire()
+        except RateLimitExceeded:
+            self.metrics.increment(f'{self.metrics_name}.shed')
+            raise
+        if wait_seconds:
+            self.metrics.record_duration(f'{self.metrics_name}.throttle_wait', wait_seconds)
+
+    def _record(self, host: str, seconds: float, attempt: int, failed: bool) -> None:
+        with self._lock:
+            stats = self._stats[host]
+            self._stats[host] = HostStats(
+                attempts=stats.attempts + 1,
+                retries=stats.retries + (1 if attempt else 0),
+                failures=stats.failures + (1 if failed else 0),
+                total_seconds=stats.total_seconds + seconds,
+                max_seconds=max(stats.max_seconds, seconds)
+            )
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Return how long a response's Retry-After header asks us to wait, if it says.
+
+    >>> response = requests.Response()
+    >>> response.headers['Retry-After'] = '3'
+    >>> retry_after_seconds(response)
+    3.0
+    """
+    retry_after = response.headers.get('Retry-After')
+    if not retry_after:
+        return None
+
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+@lru_cache(maxsize=1)
+def shared_session() -> requests.Session:
+    """The process-wide session every HttpClient uses unless given its own."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
@@ -0,0 +1,206 @@
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+import requests
+
+import responses
+
+from listens.http_client import HttpClient, RateLimitExceeded, TokenBucket
+from listens.metrics import InMemoryMetrics
+from listens.testing import FakeClock
+
+
+URL = 'https://micro.morningcd.com/sunlight'
+
+
+class RecordingSession(requests.Session):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.request_kwargs: List[Dict[str, Any]] = []
+        self.closed_responses: List[requests.Response] = []
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:  # type: ignore
+        self.request_kwargs.append(kwargs)
+        response = super().request(method, url, **kwargs)
+        close = response.close
+
+        def record_close() -> None:
+            self.closed_responses.append(response)
+            close()
+
+        response.close = record_close  # type: ignore
+        return response
+
+
+class TestHttpClient:
+
+    @responses.activate  # type: ignore
+    def test_retries_gets_with_jittered_backoff(self) -> None:
+        # Given
+        sleeps: List[float] = []
+        http_client = HttpClient(backoff_seconds=0.1, sleep=sleeps.append, jitter=lambda: 0.5)
+        responses.add(responses.GET, URL, body=requests.ConnectionError('connection reset'))
+        responses.add(responses.GET, URL, status=503)
+        responses.add(responses.GET, URL, status=200)
+
+        # When
+        response = http_client.get(URL)
+
+        # Then
+        assert response.status_code == 200
+        assert sleeps == [0.05, 0.1]
+        stats = http_client.stats()['micro.morningcd.com']
+        assert (stats.attempts, stats.retries, stats.failures) == (3, 2, 2)
+
+    @responses.activate  # type: ignore
+    def test_gives_up_after_max_attempts(self) -> None:
+        # Given
+        http_client = HttpClient(max_attempts=2, sleep=lambda _: None)
+        responses.add(responses.GET, URL, body=requests.ConnectTimeout('timed out'))
+
+        # When / Then
+        with pytest.raises(requests.ConnectTimeout):
+            http_client.get(URL)
+        assert len(responses.calls) == 2
+
+    @responses.activate  # type: ignore
+    def test_doesnt_retry_posts(self) -> None:
+        # Given
+        http_client = HttpClient(sleep=lambda _: None)
+        responses.add(responses.POST, URL, status=503)
+
+        # When
+        response = http_client.post(URL)
+
+        # Then
+        assert response.status_code == 503
+        assert len(responses.calls) == 1
+
+    @responses.activate  # type: ignore
+    def test_sends_connect_and_read_timeouts(self) -> None:
+        # Given
+        session = RecordingSession()
+        http_client = HttpClient(session=session)
+        responses.add(responses.GET, URL)
+
+        # When
+        http_client.get(URL)
+
+        # Then
+        assert session.request_kwargs[0]['timeout'] == (3.05, 10)
+
+    @responses.activate  # type: ignore
+    def test_closes_failed_responses_before_retrying(self) -> None:
+        # Given
+        session = RecordingSession()
+        http_client = HttpClient(session=session, sleep=lambda _: None)
+        responses.add(responses.GET, URL, status=503)
+        responses.add(responses.GET, URL, status=200)
+
+        # When
+        response = http_client.get(URL)
+
+        # Then
+        assert [r.status_code for r in session.closed_responses] == [503]
+        assert response not in session.closed_responses
+
+    @responses.activate  # type: ignore
+    def test_gives_up_retrying_at_its_deadline(self) -> None:
+        # Given
+        clock = FakeClock()
+        session = RecordingSession()
+        http_client = HttpClient(max_attempts=5, backoff_seconds=1, deadline_seconds=10,
+                                 session=session, clock=clock, sleep=clock.sleep,
+                                 jitter=lambda: 1)
+
+        def slow_503(request: requests.PreparedRequest) -> Tuple[int, Dict, str]:
+            clock.now += 4
+            return 503, {}, ''
+
+        responses.add_callback(responses.GET, URL, callback=slow_503)
+
+        # When
+        response = http_client.get(URL)
+
+        # Then the second attempt only gets what is left of the deadline, and there's no time to
+        # back off for a third
+        assert response.status_code == 503
+        assert [kwargs['timeout'] for kwargs in session.request_kwargs] == [(3.05, 10), (3.05, 5)]
+        assert clock.sleeps == [1]
+
+    @responses.activate  # type: ignore
+    def test_pauses_its_rate_limiter_for_retry_after_and_retries_gets(self) -> None:
+        # Given
+        clock = FakeClock()
+        rate_limiter = TokenBucket(10, burst=10, max_wait_seconds=5,
+                                   clock=clock, sleep=clock.sleep)
+        metrics = InMemoryMetrics()
+        http_client = HttpClient(rate_limiter=rate_limiter, metrics=metrics, metrics_name='spotify')
+        responses.add(responses.GET, URL, status=429, headers={'Retry-After': '2'})
+        responses.add(responses.GET, URL, status=200)
+
+        # When
+        response = http_client.get(URL)
+
+        # Then
+        assert response.status_code == 200
+        assert clock.sleeps == [2.1]
+        assert metrics.counters == {'spotify.rate_limited': 1}
+        assert metrics.durations['spotify.throttle_wait'] == [2.1]
+
+    @responses.activate  # type: ignore
+    def test_sheds_requests_that_would_wait_too_long_for_retry_after(self) -> None:
+        # Given
+        clock = FakeClock()
+        rate_limiter = TokenBucket(10, burst=10, max_wait_seconds=1,
+                                   clock=clock, sleep=clock.sleep)
+        http_client = HttpClient(rate_limiter=rate_limiter)
+        responses.add(responses.GET, URL, status=429, headers={'Retry-After': '30'})
+
+        # When / Then
+        with pytest.raises(RateLimitExceeded):
+            http_client.get(URL)
+        assert len(responses.calls) == 1
+        assert rate_limiter.stats().shed == 1
+
+
+class TestTokenBucket:
+
+    def test_allows_a_burst_then_spaces_out_the_rest(self) -> None:
+        # Given
+        clock = FakeClock()
+        token_bucket = TokenBucket(rate_per_second=4, burst=2, clock=clock, sleep=clock.sleep)
+
+        # When
+        waits = [token_bucket.acquire() for _ in range(4)]
+
+        # Then
+        assert waits == [0, 0, 0.25, 0.25]
+        assert token_bucket.stats().throttled == 2
+
+    def test_queued_callers_reserve_their_turns(self) -> None:
+        # Given callers that haven't finished waiting
+        clock = FakeClock()
+        token_bucket = TokenBucket(rate_per_second=4, burst=1, clock=clock, sleep=lambda _: None)
+
+        # When
+        waits = [token_bucket.acquire() for _ in range(3)]
+
+        # Then
+        assert waits == [0, 0.25, 0.5]
+
+    def test_sheds_callers_that_would_wait_too_long(self) -> None:
+        # Given
+        clock = FakeClock()
+        token_bucket = TokenBucket(rate_per_second=1, burst=1, max_wait_seconds=1,
+                                   clock=clock, sleep=lambda _: None)
+        token_bucket.acquire()
+        token_bucket.acquire()
+
+        # When / Then
+        with pytest.raises(RateLimitExceeded) as e:
+            token_bucket.acquire()
+        assert e.value.retry_after_seconds == 2
+        assert token_bucket.stats().shed == 1
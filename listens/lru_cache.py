@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, NamedTuple, Optional, Tuple, TypeVar
+
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LruCache(Generic[K, V]):
+    """A thread safe, bounded, least-recently-used cache whose entries may carry a ttl.
+
+    >>> cache: LruCache[str, int] = LruCache(capacity=2)
+    >>> cache.set('a', 1); cache.set('b', 2); cache.set('c', 3)
+    >>> cache.get('a') is None, cache.get('c')
+    (True, 3)
+    >>> cache.stats()
+    CacheStats(hits=1, misses=1, evictions=1, expirations=0, size=2)
+    """
+
+    def __init__(self, capacity: int, clock: Callable[[], float] = time.monotonic) -> None:
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1.')
+        self.capacity = capacity
+        self.clock = clock
+        self._entries: 'OrderedDict[K, Tuple[V, Optional[float]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: K, value: V, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = self.clock() + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def discard(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def evict_where(self, predicate: Callable[[K], bool]) -> int:
+        """Evict every entry whose key matches `predicate`, returning the number evicted."""
+        with self._lock:
+            doomed_keys = [key for key in self._entries if predicate(key)]
+            for key in doomed_keys:
+                del self._entries[key]
+            self._evictions += len(doomed_keys)
+            return len(doomed_keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                size=len(self._entries)
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
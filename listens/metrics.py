@@ -0,0 +1,212 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, DefaultDict, Dict, Iterator, List, Optional
+
+
+# the most values cloudwatch accepts for one metric in one embedded metric format document.
+EMF_MAX_VALUES = 100
+
+
+class Metrics(ABC):
+    """A hook for timing the stages of the listens service and counting what happens in them.
+
+    Durations are recorded under a name, in seconds. A cache `name` counts its lookups as
+    `<name>.hit` and `<name>.miss`.
+    """
+
+    @abstractmethod
+    def record_duration(self, name: str, seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    def increment(self, name: str, count: int = 1) -> None:
+        ...
+
+    def timer(self, name: str) -> ContextManager[None]:
+        """Time a block as `name`, counting blocks that raise as `<name>.error`."""
+        return self._timer(name)
+
+    def flush(self) -> None:
+        """Send on whatever has been recorded since the last flush. Called at the end of each
+        invocation."""
+        ...
+
+    @contextmanager
+    def _timer(self, name: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.increment(f'{name}.error')
+            raise
+        finally:
+            self.record_duration(name, time.perf_counter() - started_at)
+
+
+class _NullTimer:
+
+    def __enter__(self) -> None:
+        ...
+
+    def __exit__(self, *exc_info: Any) -> None:
+        ...
+
+
+class NullMetrics(Metrics):
+    """Records nothing, as cheaply as possible. The default."""
+
+    def record_duration(self, name: str, seconds: float) -> None:
+        ...
+
+    def increment(self, name: str, count: int = 1) -> None:
+        ...
+
+    def timer(self, name: str) -> ContextManager[None]:
+        return _NULL_TIMER
+
+
+_NULL_TIMER = _NullTimer()
+NULL_METRICS = NullMetrics()
+
+
+class InMemoryMetrics(Metrics):
+    """Keeps every duration and count in memory, for tests and benchmarks.
+
+    >>> metrics = InMemoryMetrics()
+    >>> metrics.increment('song_cache.hit', 3); metrics.increment('song_cache.miss')
+    >>> metrics.hit_rate('song_cache')
+    0.75
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.durations: DefaultDict[str, List[float]] = defaultdict(list)
+        self.counters: DefaultDict[str, int] = defaultdict(int)
+
+    def record_duration(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.durations[name].append(seconds)
+
+    def increment(self, name: str, count: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += count
+
+    def histogram(self, name: str, bounds_seconds: List[float]) -> List[int]:
+        """Count the durations of `name` at or under each bound, and over the last.
+
+        >>> metrics = InMemoryMetrics()
+        >>> for seconds in (0.001, 0.02, 0.03, 2): metrics.record_duration('add_listen', seconds)
+        >>> metrics.histogram('add_listen', [0.01, 0.1, 1])
+        [1, 2, 0, 1]
+        """
+        counts = [0] * (len(bounds_seconds) + 1)
+        with self._lock:
+            for seconds in self.durations[name]:
+                bucket = next(
+                    (i for i, bound in enumerate(bounds_seconds) if seconds <= bound),
+                    len(bounds_seconds)
+                )
+                counts[bucket] += 1
+        return counts
+
+    def hit_rate(self, name: str) -> Optional[float]:
+        with self._lock:
+            hits, misses = self.counters[f'{name}.hit'], self.counters[f'{name}.miss']
+        return hits / (hits + misses) if hits + misses else None
+
+
+class EmfMetrics(Metrics):
+    """Collects durations and counts, and writes them on flush as cloudwatch embedded metric
+    format log lines, which cloudwatch turns into metrics without any api calls.
+
+    Durations are written as lists of milliseconds, which cloudwatch keeps as distributions, and
+    the hit rate of each cache as a percentage.
+    """
+
+    def __init__(self,
+                 namespace: str = 'listens',
+                 dimensions: Optional[Dict[str, str]] = None,
+                 emit: Callable[[str], None] = print,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.namespace = namespace
+        self.dimensions = dimensions or {'service': 'listens'}
+        self.emit = emit
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._durations_ms: DefaultDict[str, List[float]] = defaultdict(list)
+        self._counters: DefaultDict[str, int] = defaultdict(int)
+
+    def record_duration(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._durations_ms[name].append(seconds * 1000)
+
+    def increment(self, name: str, count: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += count
+
+    def flush(self) -> None:
+        with self._lock:
+            durations_ms, self._durations_ms = self._durations_ms, defaultdict(list)
+            counters, self._counters = self._counters, defaultdict(int)
+
+        values: Dict[str, Any] = {}
+        units: Dict[str, str] = {}
+        for name, count in counters.items():
+            values[name], units[name] = count, 'Count'
+            if name.endswith('.hit') or name.endswith('.miss'):
+                cache = name.rsplit('.', 1)[0]
+                hits, misses = counters.get(f'{cache}.hit', 0), counters.get(f'{cache}.miss', 0)
+                values[f'{cache}.hit_rate'] = 100 * hits / (hits + misses)
+                units[f'{cache}.hit_rate'] = 'Percent'
+
+        documents: List[Dict[str, Any]] = [values] if values else []
+        for name, milliseconds in durations_ms.items():
+            for start in range(0, len(milliseconds), EMF_MAX_VALUES):
+                chunk = milliseconds[start:start + EMF_MAX_VALUES]
+                if start // EMF_MAX_VALUES >= len(documents):
+                    documents.append({})
+                documents[start // EMF_MAX_VALUES][name] = chunk
+                units[name] = 'Milliseconds'
+
+        for document in documents:
+            self.emit(json.dumps(self._emf_document(document, units)))
+
+    def _emf_document(self, values: Dict[str, Any], units: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            '_aws': {
+                'Timestamp': int(self.clock() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [list(self.dimensions)],
+                    'Metrics': [{'Name': name, 'Unit': units[name]} for name in values]
+                }]
+            },
+            **self.dimensions,
+            **values
+        }
+
+
+class MeteredGateway:
+    """Stands in for a gateway, timing each of its public method calls as `<name>.<method>`."""
+
+    def __init__(self, gateway: Any, name: str, metrics: Metrics) -> None:
+        self._gateway = gateway
+        self._name = name
+        self._metrics = metrics
+
+    def __getattr__(self, attribute: str) -> Any:
+        value = getattr(self._gateway, attribute)
+        if attribute.startswith('_') or not callable(value):
+            return value
+
+        timer_name = f'{self._name}.{attribute}'
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            with self._metrics.timer(timer_name):
+                return value(*args, **kwargs)
+
+        return timed
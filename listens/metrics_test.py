@@ -0,0 +1,81 @@
+import json
+from typing import List
+
+import pytest
+
+from listens.metrics import EmfMetrics, InMemoryMetrics, MeteredGateway
+
+
+class FlakyGateway:
+
+    def __init__(self) -> None:
+        self.built = True
+
+    def fetch(self, fail: bool = False) -> str:
+        if fail:
+            raise RuntimeError('connection reset')
+        return 'fetched'
+
+
+class TestEmfMetrics:
+
+    def test_writes_durations_counts_and_hit_rates_as_emf(self) -> None:
+        # Given
+        lines: List[str] = []
+        metrics = EmfMetrics(namespace='listens', emit=lines.append, clock=lambda: 1542036600)
+        metrics.record_duration('submit_listen.add_listen', 0.012)
+        metrics.increment('song_cache.hit', 3)
+        metrics.increment('song_cache.miss')
+
+        # When
+        metrics.flush()
+        metrics.flush()
+
+        # Then
+        [document] = [json.loads(line) for line in lines]
+        assert document['_aws']['Timestamp'] == 1542036600000
+        assert document['_aws']['CloudWatchMetrics'][0]['Namespace'] == 'listens'
+        assert {
+            metric['Name']: metric['Unit']
+            for metric in document['_aws']['CloudWatchMetrics'][0]['Metrics']
+        } == {
+            'submit_listen.add_listen': 'Milliseconds',
+            'song_cache.hit': 'Count',
+            'song_cache.miss': 'Count',
+            'song_cache.hit_rate': 'Percent'
+        }
+        assert document['submit_listen.add_listen'] == [12.0]
+        assert document['song_cache.hit_rate'] == 75.0
+        assert document['service'] == 'listens'
+
+    def test_splits_long_distributions_across_documents(self) -> None:
+        # Given
+        lines: List[str] = []
+        metrics = EmfMetrics(emit=lines.append)
+        for _ in range(150):
+            metrics.record_duration('submit_listen.validate', 0.001)
+
+        # When
+        metrics.flush()
+
+        # Then
+        documents = [json.loads(line) for line in lines]
+        assert [len(document['submit_listen.validate']) for document in documents] == [100, 50]
+
+
+class TestMeteredGateway:
+
+    def test_times_method_calls_and_counts_errors(self) -> None:
+        # Given
+        metrics = InMemoryMetrics()
+        gateway = MeteredGateway(FlakyGateway(), 'db_gateway', metrics)
+
+        # When
+        gateway.fetch()
+        with pytest.raises(RuntimeError):
+            gateway.fetch(fail=True)
+
+        # Then
+        assert gateway.built
+        assert len(metrics.durations['db_gateway.fetch']) == 2
+        assert metrics.counters == {'db_gateway.fetch.error': 1}
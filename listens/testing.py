@@ -0,0 +1,295 @@
+"""In-memory fakes of the clock and the gateways, shared by the tests and benchmarks.
+
+The stub gateways record their calls, and each can be made to fail, block or take a while, so that
+tests can check how the listens service behaves around them.
+"""
+import asyncio
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from listens.abc import (
+    AsyncDbGateway as AsyncDbGatewayABC,
+    AsyncMusicGateway as AsyncMusicGatewayABC,
+    AsyncNotificationGateway as AsyncNotificationGatewayABC,
+    AsyncSunlightGateway as AsyncSunlightGatewayABC,
+    DbGateway as DbGatewayABC,
+    MusicGateway as MusicGatewayABC,
+    NotificationGateway as NotificationGatewayABC,
+    SunlightGateway as SunlightGatewayABC
+)
+from listens.definitions import (
+    Listen,
+    ListenCursor,
+    ListenInput,
+    MusicProvider,
+    SortOrder,
+    SunlightWindow,
+    exceptions
+)
+
+
+# a sunlight window that every listen falls in, whatever its time.
+ALWAYS_DAY = SunlightWindow(sunrise_utc=datetime.min, sunset_utc=datetime.max)
+
+
+class FakeClock:
+    """A clock that only moves when it is set, or when something sleeps."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class InMemoryDbGateway(DbGatewayABC):
+    """Keeps listens in a list, in the order they were added, with ids counting up from 1."""
+
+    def __init__(self) -> None:
+        self.listens: List[Listen] = []
+        self.listens_by_idempotency_key: Dict[str, Listen] = {}
+        self.fetches = 0
+
+    def add_listen(self, listen_input: ListenInput) -> Listen:
+        return self.add_listens([listen_input])[0]
+
+    def add_listens(self, listen_inputs: List[ListenInput]) -> List[Listen]:
+        listens = _build_listens(len(self.listens), listen_inputs)
+        self.listens += listens
+        return listens
+
+    def add_listen_with_idempotency_key(self,
+                                        listen_input: ListenInput,
+                                        idempotency_key: str) -> Tuple[Listen, bool]:
+        if idempotency_key in self.listens_by_idempotency_key:
+            return self.listens_by_idempotency_key[idempotency_key], False
+        listen = self.add_listen(listen_input)
+        self.listens_by_idempotency_key[idempotency_key] = listen
+        return listen, True
+
+    def fetch_listen(self, listen_id: str) -> Listen:
+        return _find_listen(self.listens, listen_id)
+
+    def fetch_listen_by_idempotency_key(self, idempotency_key: str) -> Optional[Listen]:
+        return self.listens_by_idempotency_key.get(idempotency_key)
+
+    def fetch_listens(self,
+                      limit: int,
+                      sort_time: SortOrder,
+                      before_utc: Optional[datetime] = None,
+                      after_utc: Optional[datetime] = None,
+                      cursor: Optional[ListenCursor] = None,
+                      listener_name: Optional[str] = None,
+                      song_id: Optional[str] = None) -> List[Listen]:
+        self.fetches += 1
+        return _page(self.listens, limit, sort_time, before_utc, after_utc, cursor,
+                     listener_name, song_id)
+
+
+class AsyncInMemoryDbGateway(AsyncDbGatewayABC):
+    """The AsyncDbGateway of InMemoryDbGateway."""
+
+    def __init__(self) -> None:
+        self.listens: List[Listen] = []
+
+    async def add_listen(self, listen_input: ListenInput) -> Listen:
+        return (await self.add_listens([listen_input]))[0]
+
+    async def add_listens(self, listen_inputs: List[ListenInput]) -> List[Listen]:
+        listens = _build_listens(len(self.listens), listen_inputs)
+        self.listens += listens
+        return listens
+
+    async def fetch_listen(self, listen_id: str) -> Listen:
+        return _find_listen(self.listens, listen_id)
+
+    async def fetch_listens(self,
+                            limit: int,
+                            sort_time: SortOrder,
+                            before_utc: Optional[datetime] = None,
+                            after_utc: Optional[datetime] = None,
+                            cursor: Optional[ListenCursor] = None,
+                            listener_name: Optional[str] = None,
+                            song_id: Optional[str] = None) -> List[Listen]:
+        return _page(self.listens, limit, sort_time, before_utc, after_utc, cursor,
+                     listener_name, song_id)
+
+
+class StubMusicGateway(MusicGatewayABC):
+    """Only `existing_song_ids` exist. Every lookup raises `error` while it is set."""
+
+    def __init__(self, *existing_song_ids: str, latency_seconds: float = 0) -> None:
+        self.existing_song_ids = existing_song_ids
+        self.latency_seconds = latency_seconds
+        self.lookups: List[str] = []
+        self.batch_lookups: List[List[str]] = []
+        self.error: Optional[exceptions.SpotifyError] = None
+
+    def song_exists(self, song_id: str, song_provider: MusicProvider) -> bool:
+        self.lookups.append(song_id)
+        _wait(self.latency_seconds)
+        if self.error:
+            raise self.error
+        return song_id in self.existing_song_ids
+
+    def songs_exist(self, song_ids: List[str], song_provider: MusicProvider) -> Dict[str, bool]:
+        self.batch_lookups.append(list(song_ids))
+        self.lookups += song_ids
+        _wait(self.latency_seconds)
+        if self.error:
+            raise self.error
+        return {song_id: song_id in self.existing_song_ids for song_id in song_ids}
+
+
+class StubNotificationGateway(NotificationGatewayABC):
+
+    def __init__(self, latency_seconds: float = 0) -> None:
+        self.latency_seconds = latency_seconds
+        self.announced_listens: List[Listen] = []
+
+    def announce_listen_added(self, listen: Listen) -> None:
+        _wait(self.latency_seconds)
+        self.announced_listens.append(listen)
+
+
+class StubSunlightGateway(SunlightGatewayABC):
+    """The sun rises at 6am utc and sets at 6pm utc, everywhere, unless a fixed `sunlight_window`
+    is given.
+
+    Lookups set `started` and then block until `released` is set, which it is to begin with.
+    While the gateway is `down`, and for `unavailable_timezones`, lookups raise a
+    SunlightServiceError. Lookups of `unknown_timezones` are rejected.
+    """
+
+    def __init__(self,
+                 sunlight_window: Optional[SunlightWindow] = None,
+                 latency_seconds: float = 0) -> None:
+        self.sunlight_window = sunlight_window
+        self.latency_seconds = latency_seconds
+        self.lookups: List[Tuple[str, date]] = []
+        self.lookup_threads: List[str] = []
+        self.down = False
+        self.unavailable_timezones: Set[str] = set()
+        self.unknown_timezones: Set[str] = set()
+        self.started = threading.Event()
+        self.released = threading.Event()
+        self.released.set()
+
+    def fetch_sunlight_window(self, iana_timezone: str, on_date: date) -> SunlightWindow:
+        self.lookups.append((iana_timezone, on_date))
+        self.lookup_threads.append(threading.current_thread().name)
+        self.started.set()
+        self.released.wait(timeout=5)
+        _wait(self.latency_seconds)
+        if self.down or iana_timezone in self.unavailable_timezones:
+            raise exceptions.SunlightServiceError('502: bad gateway')
+        if iana_timezone in self.unknown_timezones:
+            raise exceptions.SunlightServiceRejectedError(f'Unknown timezone {iana_timezone}.')
+        return self.sunlight_window or _six_to_six(on_date)
+
+
+class AsyncStubMusicGateway(AsyncMusicGatewayABC):
+    """Only `existing_song_ids` exist."""
+
+    def __init__(self, *existing_song_ids: str) -> None:
+        self.existing_song_ids = existing_song_ids
+
+    async def song_exists(self, song_id: str, song_provider: MusicProvider) -> bool:
+        await asyncio.sleep(0)
+        return song_id in self.existing_song_ids
+
+
+class AsyncStubNotificationGateway(AsyncNotificationGatewayABC):
+
+    def __init__(self) -> None:
+        self.announced_listens: List[Listen] = []
+
+    async def announce_listen_added(self, listen: Listen) -> None:
+        self.announced_listens.append(listen)
+
+
+class AsyncStubSunlightGateway(AsyncSunlightGatewayABC):
+    """The sun rises at 6am utc and sets at 6pm utc, everywhere, unless a fixed `sunlight_window`
+    is given.
+
+    Lookups block until `released` is set, which it is to begin with, and note whether they were
+    `cancelled` while they waited.
+    """
+
+    def __init__(self, sunlight_window: Optional[SunlightWindow] = None) -> None:
+        self.sunlight_window = sunlight_window
+        self.released = asyncio.Event()
+        self.released.set()
+        self.cancelled = False
+
+    async def fetch_sunlight_window(self, iana_timezone: str, on_date: date) -> SunlightWindow:
+        try:
+            await self.released.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.sunlight_window or _six_to_six(on_date)
+
+
+def _build_listens(listen_count: int, listen_inputs: List[ListenInput]) -> List[Listen]:
+    return [
+        Listen(id=str(listen_count + i + 1), **listen_input._asdict())
+        for i, listen_input in enumerate(listen_inputs)
+    ]
+
+
+def _find_listen(listens: List[Listen], listen_id: str) -> Listen:
+    for listen in listens:
+        if listen.id == listen_id:
+            return listen
+    raise exceptions.ListenDoesntExistError(f'Listen with id {listen_id} doesnt exist.')
+
+
+def _page(listens: List[Listen],
+          limit: int,
+          sort_time: SortOrder,
+          before_utc: Optional[datetime],
+          after_utc: Optional[datetime],
+          cursor: Optional[ListenCursor],
+          listener_name: Optional[str],
+          song_id: Optional[str]) -> List[Listen]:
+    descending = sort_time == SortOrder.DESCENDING
+    listens = sorted(
+        listens,
+        key=lambda listen: (listen.listen_time_utc, int(listen.id)),
+        reverse=descending
+    )
+    if listener_name is not None:
+        listens = [listen for listen in listens if listen.listener_name == listener_name]
+    if song_id is not None:
+        listens = [listen for listen in listens if listen.song_id == song_id]
+    if before_utc:
+        listens = [listen for listen in listens if listen.listen_time_utc < before_utc]
+    if after_utc:
+        listens = [listen for listen in listens if listen.listen_time_utc > after_utc]
+    if cursor:
+        cursor_position = (cursor.listen_time_utc, int(cursor.id))
+        listens = [
+            listen for listen in listens
+            if ((listen.listen_time_utc, int(listen.id)) < cursor_position) == descending
+        ]
+    return listens[:limit]
+
+
+def _six_to_six(on_date: date) -> SunlightWindow:
+    return SunlightWindow(
+        sunrise_utc=datetime(on_date.year, on_date.month, on_date.day, 6),
+        sunset_utc=datetime(on_date.year, on_date.month, on_date.day, 18)
+    )
+
+
+def _wait(seconds: float) -> None:
+    if seconds:
+        time.sleep(seconds)
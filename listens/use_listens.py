@@ -1,10 +1,21 @@
-from datetime import datetime
-from typing import List, Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
 
-from listens.context import Context
-from listens.definitions import Listen, ListenInput, SortOrder
-from listens.definitions.exceptions import InvalidListenInputError, \
-    InvalidSongError, SunlightError
+from listens.context import AsyncContext, Context
+from listens.definitions import (
+    Listen,
+    ListenCursor,
+    ListenInput,
+    MusicProvider,
+    SortOrder,
+    SubmissionResult,
+    SunlightWindow
+)
+from listens.definitions.exceptions import BatchTooLargeError, IdempotencyKeyReusedError, \
+    InvalidListenInputError, InvalidSongError, ListensServiceException, SpotifyError, \
+    SunlightError, SunlightServiceError
 from listens.entities import day as day_entity, listen as listen_entity
 
 
@@ -16,34 +27,278 @@ def get_listens(context: Context,
                 limit: int,
                 sort_order: SortOrder,
                 before_utc: Optional[datetime] = None,
-                after_utc: Optional[datetime] = None) -> List[Listen]:
+                after_utc: Optional[datetime] = None,
+                cursor: Optional[ListenCursor] = None,
+                listener_name: Optional[str] = None,
+                song_id: Optional[str] = None) -> List[Listen]:
     return context.db_gateway.fetch_listens(
         before_utc=before_utc,
         after_utc=after_utc,
+        cursor=cursor,
+        listener_name=listener_name,
+        song_id=song_id,
         sort_time=sort_order,
         limit=limit
     )
 
 
-def submit_listen(context: Context, listen_input: ListenInput) -> Listen:
-    """Submit a Listen to the database."""
-    invalid_reason = listen_entity.check_invalid(listen_input)
+# bounds the lookups submit_listen runs alongside the requests that started them, for contexts
+# without a lookup executor of their own.
+MAX_CONCURRENT_LOOKUPS = 4
+_default_lookup_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_LOOKUPS,
+    thread_name_prefix='listens-lookup'
+)
+
+
+def submit_listen(context: Context,
+                  listen_input: ListenInput,
+                  idempotency_key: Optional[str] = None) -> Listen:
+    """Submit a Listen to the database.
+
+    The song and the sunlight window are looked up concurrently. The song is still checked first:
+    a listen of a song that doesnt exist raises InvalidSongError without waiting on the sunlight
+    window, whatever the time of day. A sunlight lookup that has already started still runs to
+    completion in the background; its window is just discarded.
+
+    Sunlight lookups run on the context's `lookup_executor`, or on a small process-wide pool of
+    MAX_CONCURRENT_LOOKUPS threads if it has none.
+
+    A listen submitted with an `idempotency_key` is only added and announced once. Submitting it
+    again with the same key returns the listen that was added, without any lookups.
+    """
+    metrics = context.metrics
+
+    if idempotency_key:
+        with metrics.timer('submit_listen.idempotency_lookup'):
+            added_listen = context.db_gateway.fetch_listen_by_idempotency_key(idempotency_key)
+        if added_listen:
+            metrics.increment('submit_listen.replayed')
+            return _replayed_listen(added_listen, listen_input)
+
+    with metrics.timer('submit_listen.validate'):
+        invalid_reason = listen_entity.check_invalid(listen_input)
     if invalid_reason:
         raise InvalidListenInputError(invalid_reason)
 
-    if not context.music_gateway.song_exists(listen_input.song_id, listen_input.song_provider):
+    lookup_executor = context.lookup_executor or _default_lookup_executor
+    sunlight_window_future = lookup_executor.submit(_fetch_sunlight_window, context, listen_input)
+    try:
+        with metrics.timer('submit_listen.song_lookup'):
+            song_exists = context.music_gateway.song_exists(
+                listen_input.song_id,
+                listen_input.song_provider
+            )
+    except BaseException:
+        # only keeps a lookup that hasnt started from running. a running one can't be stopped.
+        sunlight_window_future.cancel()
+        raise
+
+    if not song_exists:
+        # as above, a lookup that has already started finishes and its window is discarded.
+        sunlight_window_future.cancel()
         raise InvalidSongError(f'Song {listen_input.song_id} doesnt exist.')
 
-    sunlight_window = context.sunlight_gateway.fetch_sunlight_window(
-        iana_timezone=listen_input.iana_timezone,
-        on_date=day_entity.local_date(listen_input.listen_time_utc, listen_input.iana_timezone)
+    # how much longer the sunlight lookup took than the song lookup it ran alongside.
+    with metrics.timer('submit_listen.sunlight_wait'):
+        sunlight_window = sunlight_window_future.result()
+
+    if not day_entity.is_day(listen_input.listen_time_utc, sunlight_window):
+        raise SunlightError('Listens can only be submitted during the day.')
+
+    with metrics.timer('submit_listen.add_listen'):
+        if idempotency_key:
+            listen, added = context.db_gateway.add_listen_with_idempotency_key(listen_input,
+                                                                               idempotency_key)
+            if not added:
+                # a concurrent retry got there first, and announces the listen itself.
+                metrics.increment('submit_listen.replayed')
+                return _replayed_listen(listen, listen_input)
+        else:
+            listen = context.db_gateway.add_listen(listen_input)
+
+    with metrics.timer('submit_listen.announce'):
+        context.notification_gateway.announce_listen_added(listen)
+
+    return listen
+
+
+def _replayed_listen(listen: Listen, listen_input: ListenInput) -> Listen:
+    # a retry is submitted later than the original, so only its time may differ.
+    if listen_input._replace(listen_time_utc=listen.listen_time_utc) != ListenInput(
+        **{field: getattr(listen, field) for field in ListenInput._fields}
+    ):
+        raise IdempotencyKeyReusedError('Idempotency key was already used for another listen.')
+    return listen
+
+
+def _fetch_sunlight_window(context: Context, listen_input: ListenInput) -> SunlightWindow:
+    with context.metrics.timer('submit_listen.sunlight_lookup'):
+        return context.sunlight_gateway.fetch_sunlight_window(
+            iana_timezone=listen_input.iana_timezone,
+            on_date=day_entity.local_date(listen_input.listen_time_utc, listen_input.iana_timezone)
+        )
+
+
+MAX_BATCH_SIZE = 100
+
+
+def submit_listens(context: Context, listen_inputs: List[ListenInput]) -> List[SubmissionResult]:
+    """Submit a batch of Listens to the database.
+
+    Each listen is validated just as in `submit_listen`, but the songs of each provider are looked
+    up together, every distinct sunlight window in the batch is only looked up once, and all valid
+    listens are added at once. A result is returned for each listen input, in order.
+
+    A lookup that fails because spotify or the sunlight service is unavailable only fails the
+    listens that needed it, with that error as their result.
+    """
+    if len(listen_inputs) > MAX_BATCH_SIZE:
+        raise BatchTooLargeError(f'Batches can contain at most {MAX_BATCH_SIZE} listens.')
+
+    errors: Dict[int, ListensServiceException] = {}
+    local_dates: Dict[int, date] = {}
+    for i, listen_input in enumerate(listen_inputs):
+        invalid_reason = listen_entity.check_invalid(listen_input)
+        if invalid_reason:
+            errors[i] = InvalidListenInputError(invalid_reason)
+            continue
+
+        try:
+            local_dates[i] = day_entity.local_date(listen_input.listen_time_utc,
+                                                   listen_input.iana_timezone)
+        except ListensServiceException as e:
+            errors[i] = e
+
+    song_ids_by_provider: Dict[MusicProvider, Set[str]] = {}
+    for i in local_dates:
+        song_ids_by_provider.setdefault(listen_inputs[i].song_provider, set()).add(
+            listen_inputs[i].song_id
+        )
+    song_exists: Dict[Tuple[str, MusicProvider], bool] = {}
+    song_errors: Dict[MusicProvider, ListensServiceException] = {}
+    for song_provider, song_ids in song_ids_by_provider.items():
+        try:
+            looked_up = context.music_gateway.songs_exist(sorted(song_ids), song_provider)
+        except SpotifyError as e:
+            song_errors[song_provider] = e
+            continue
+        song_exists.update(
+            ((song_id, song_provider), exists) for song_id, exists in looked_up.items()
+        )
+
+    for i in list(local_dates):
+        listen_input = listen_inputs[i]
+        if listen_input.song_provider in song_errors:
+            errors[i] = song_errors[listen_input.song_provider]
+            del local_dates[i]
+        elif not song_exists[(listen_input.song_id, listen_input.song_provider)]:
+            errors[i] = InvalidSongError(f'Song {listen_input.song_id} doesnt exist.')
+            del local_dates[i]
+
+    sunlight_keys: Set[Tuple[str, date]] = {
+        (listen_inputs[i].iana_timezone, local_date) for i, local_date in local_dates.items()
+    }
+    sunlight_windows: Dict[Tuple[str, date], SunlightWindow] = {}
+    sunlight_errors: Dict[Tuple[str, date], ListensServiceException] = {}
+    for iana_timezone, on_date in sunlight_keys:
+        try:
+            sunlight_windows[(iana_timezone, on_date)] = (
+                context.sunlight_gateway.fetch_sunlight_window(
+                    iana_timezone=iana_timezone,
+                    on_date=on_date
+                )
+            )
+        except SunlightServiceError as e:
+            sunlight_errors[(iana_timezone, on_date)] = e
+
+    valid_indexes: List[int] = []
+    for i, local_date in local_dates.items():
+        listen_input = listen_inputs[i]
+        sunlight_key = (listen_input.iana_timezone, local_date)
+        if sunlight_key in sunlight_errors:
+            errors[i] = sunlight_errors[sunlight_key]
+            continue
+
+        sunlight_window = sunlight_windows[sunlight_key]
+        if day_entity.is_day(listen_input.listen_time_utc, sunlight_window):
+            valid_indexes.append(i)
+        else:
+            errors[i] = SunlightError('Listens can only be submitted during the day.')
+
+    listens = context.db_gateway.add_listens([listen_inputs[i] for i in valid_indexes])
+    listens_by_index = dict(zip(valid_indexes, listens))
+
+    for listen in listens:
+        context.notification_gateway.announce_listen_added(listen)
+
+    return [
+        SubmissionResult(listen=listens_by_index.get(i), error=errors.get(i))
+        for i in range(len(listen_inputs))
+    ]
+
+
+async def get_listen_async(context: AsyncContext, listen_id: str) -> Listen:
+    return await context.db_gateway.fetch_listen(listen_id)
+
+
+async def get_listens_async(context: AsyncContext,
+                            limit: int,
+                            sort_order: SortOrder,
+                            before_utc: Optional[datetime] = None,
+                            after_utc: Optional[datetime] = None,
+                            cursor: Optional[ListenCursor] = None,
+                            listener_name: Optional[str] = None,
+                            song_id: Optional[str] = None) -> List[Listen]:
+    return await context.db_gateway.fetch_listens(
+        before_utc=before_utc,
+        after_utc=after_utc,
+        cursor=cursor,
+        listener_name=listener_name,
+        song_id=song_id,
+        sort_time=sort_order,
+        limit=limit
     )
 
+
+async def submit_listen_async(context: AsyncContext, listen_input: ListenInput) -> Listen:
+    """Submit a Listen to the database, as `submit_listen` does."""
+    invalid_reason = listen_entity.check_invalid(listen_input)
+    if invalid_reason:
+        raise InvalidListenInputError(invalid_reason)
+
+    sunlight_window_task = asyncio.ensure_future(
+        _fetch_sunlight_window_async(context, listen_input)
+    )
+    try:
+        song_exists = await context.music_gateway.song_exists(
+            listen_input.song_id,
+            listen_input.song_provider
+        )
+        if not song_exists:
+            raise InvalidSongError(f'Song {listen_input.song_id} doesnt exist.')
+    except BaseException:
+        if not sunlight_window_task.cancel():
+            # the lookup already finished. retrieve its outcome so a failure isnt reported as
+            # never retrieved.
+            sunlight_window_task.exception()
+        raise
+
+    sunlight_window = await sunlight_window_task
+
     if not day_entity.is_day(listen_input.listen_time_utc, sunlight_window):
         raise SunlightError('Listens can only be submitted during the day.')
 
-    listen = context.db_gateway.add_listen(listen_input)
+    listen = await context.db_gateway.add_listen(listen_input)
 
-    context.notification_gateway.announce_listen_added(listen)
+    await context.notification_gateway.announce_listen_added(listen)
 
     return listen
+
+
+async def _fetch_sunlight_window_async(context: AsyncContext,
+                                       listen_input: ListenInput) -> SunlightWindow:
+    return await context.sunlight_gateway.fetch_sunlight_window(
+        iana_timezone=listen_input.iana_timezone,
+        on_date=day_entity.local_date(listen_input.listen_time_utc, listen_input.iana_timezone)
+    )
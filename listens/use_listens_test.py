@@ -0,0 +1,320 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Tuple
+
+import pytest
+
+from listens.context import AsyncContext, Context
+from listens.definitions import Listen, ListenInput, MusicProvider, exceptions
+from listens.metrics import InMemoryMetrics
+from listens.testing import (
+    AsyncInMemoryDbGateway,
+    AsyncStubMusicGateway,
+    AsyncStubNotificationGateway,
+    AsyncStubSunlightGateway,
+    InMemoryDbGateway,
+    StubMusicGateway,
+    StubNotificationGateway,
+    StubSunlightGateway
+)
+from listens.use_listens import (
+    get_listen_async,
+    submit_listen,
+    submit_listen_async,
+    submit_listens
+)
+
+
+class TestSubmitListen:
+
+    def test_looks_up_song_and_sunlight_window_concurrently(self) -> None:
+        # Given a sunlight lookup that doesnt finish until the song lookup has finished
+        context = context_factory()
+        context.sunlight_gateway.released.clear()  # type: ignore
+        song_exists = context.music_gateway.song_exists
+
+        def song_exists_once_sunlight_started(song_id: str, song_provider: MusicProvider) -> bool:
+            assert context.sunlight_gateway.started.wait(timeout=5)  # type: ignore
+            context.sunlight_gateway.released.set()  # type: ignore
+            return song_exists(song_id, song_provider)
+
+        context.music_gateway.song_exists = song_exists_once_sunlight_started  # type: ignore
+
+        # When
+        listen = submit_listen(context, listen_input_factory())
+
+        # Then
+        assert listen.id == '1'
+
+    def test_runs_sunlight_lookups_on_the_contexts_executor(self) -> None:
+        # Given
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='context-lookup') as executor:
+            context = context_factory()._replace(lookup_executor=executor)
+
+            # When
+            submit_listen(context, listen_input_factory())
+
+        # Then
+        assert context.sunlight_gateway.lookup_threads == ['context-lookup_0']  # type: ignore
+
+    def test_doesnt_wait_on_sunlight_window_for_missing_songs(self) -> None:
+        # Given a sunlight lookup that hangs
+        context = context_factory()
+        context.sunlight_gateway.released.clear()  # type: ignore
+
+        # When
+        started_at = time.monotonic()
+        with pytest.raises(exceptions.InvalidSongError):
+            submit_listen(context, listen_input_factory(song_id='missing'))
+        elapsed_seconds = time.monotonic() - started_at
+        context.sunlight_gateway.released.set()  # type: ignore
+
+        # Then
+        assert elapsed_seconds < 1
+
+    def test_missing_songs_take_precedence_over_nighttime(self) -> None:
+        # Given
+        context = context_factory()
+        listen_input = listen_input_factory(song_id='missing',
+                                            listen_time_utc=datetime(2018, 11, 12, 23))
+
+        # When / Then
+        with pytest.raises(exceptions.InvalidSongError):
+            submit_listen(context, listen_input)
+
+    def test_raises_sunlight_error_at_night(self) -> None:
+        # Given
+        context = context_factory()
+        listen_input = listen_input_factory(listen_time_utc=datetime(2018, 11, 12, 23))
+
+        # When / Then
+        with pytest.raises(exceptions.SunlightError):
+            submit_listen(context, listen_input)
+
+    def test_times_each_stage(self) -> None:
+        # Given
+        metrics = InMemoryMetrics()
+        context = context_factory()._replace(metrics=metrics)
+
+        # When
+        submit_listen(context, listen_input_factory())
+
+        # Then
+        assert set(metrics.durations) == {
+            'submit_listen.validate',
+            'submit_listen.song_lookup',
+            'submit_listen.sunlight_lookup',
+            'submit_listen.sunlight_wait',
+            'submit_listen.add_listen',
+            'submit_listen.announce'
+        }
+
+    def test_replays_listens_submitted_with_the_same_idempotency_key(self) -> None:
+        # Given
+        context = context_factory()
+        listen = submit_listen(context, listen_input_factory(), idempotency_key='key')
+
+        # When
+        retried_listen = submit_listen(
+            context,
+            listen_input_factory(listen_time_utc=datetime(2018, 11, 12, 15, 31)),
+            idempotency_key='key'
+        )
+
+        # Then
+        assert retried_listen == listen
+        assert context.db_gateway.listens == [listen]  # type: ignore
+        assert context.notification_gateway.announced_listens == [listen]  # type: ignore
+        assert len(context.music_gateway.lookups) == 1  # type: ignore
+        assert len(context.sunlight_gateway.lookups) == 1  # type: ignore
+
+    def test_refuses_an_idempotency_key_reused_for_another_listen(self) -> None:
+        # Given
+        context = context_factory()
+        submit_listen(context, listen_input_factory(), idempotency_key='key')
+
+        # When / Then
+        with pytest.raises(exceptions.IdempotencyKeyReusedError):
+            submit_listen(context, listen_input_factory(listener_name='zach'),
+                          idempotency_key='key')
+
+
+class TestSubmitListens:
+
+    def test_reports_an_error_or_listen_for_each_listen_input(self) -> None:
+        # Given
+        context = context_factory()
+        listen_inputs = [
+            listen_input_factory(),
+            listen_input_factory(listener_name='a' * 31),
+            listen_input_factory(song_id='missing'),
+            listen_input_factory(listen_time_utc=datetime(2018, 11, 12, 23)),
+            listen_input_factory(iana_timezone='Mars/Olympus_Mons')
+        ]
+
+        # When
+        submission_results = submit_listens(context, listen_inputs)
+
+        # Then
+        assert submission_results[0].listen
+        assert [type(result.error) for result in submission_results[1:]] == [
+            exceptions.InvalidListenInputError,
+            exceptions.InvalidSongError,
+            exceptions.SunlightError,
+            exceptions.InvalidIanaTimezoneError
+        ]
+
+    def test_adds_and_announces_only_valid_listens(self) -> None:
+        # Given
+        context = context_factory()
+        listen_inputs = [listen_input_factory(), listen_input_factory(song_id='missing')]
+
+        # When
+        submission_results = submit_listens(context, listen_inputs)
+
+        # Then
+        assert context.db_gateway.listens == [submission_results[0].listen]  # type: ignore
+        assert context.notification_gateway.announced_listens == [  # type: ignore
+            submission_results[0].listen
+        ]
+
+    def test_an_unavailable_sunlight_service_only_fails_the_listens_that_needed_it(self) -> None:
+        # Given
+        context = context_factory()
+        context.sunlight_gateway.unavailable_timezones.add('Asia/Tokyo')  # type: ignore
+        listen_inputs = [
+            listen_input_factory(),
+            listen_input_factory(iana_timezone='Asia/Tokyo',
+                                 listen_time_utc=datetime(2018, 11, 12, 3))
+        ]
+
+        # When
+        submission_results = submit_listens(context, listen_inputs)
+
+        # Then
+        assert submission_results[0].listen
+        assert isinstance(submission_results[1].error, exceptions.SunlightServiceError)
+        assert context.db_gateway.listens == [submission_results[0].listen]  # type: ignore
+
+    def test_being_rate_limited_by_spotify_fails_its_listens_rather_than_the_batch(self) -> None:
+        # Given
+        context = context_factory()
+        context.music_gateway.error = exceptions.SpotifyRateLimitedError(  # type: ignore
+            'Too many requests to spotify.'
+        )
+        listen_inputs = [listen_input_factory(), listen_input_factory(listener_name='a' * 31)]
+
+        # When
+        submission_results = submit_listens(context, listen_inputs)
+
+        # Then
+        assert [type(result.error) for result in submission_results] == [
+            exceptions.SpotifyRateLimitedError,
+            exceptions.InvalidListenInputError
+        ]
+        assert context.db_gateway.listens == []  # type: ignore
+
+    def test_an_unavailable_spotify_only_fails_the_listens_that_needed_it(self) -> None:
+        # Given
+        context = context_factory()
+        context.music_gateway.error = exceptions.SpotifyError(  # type: ignore
+            'Unexpected error code from spotify. "502: Bad Gateway"'
+        )
+        listen_inputs = [
+            listen_input_factory(),
+            listen_input_factory(listener_name='a' * 31),
+            listen_input_factory(listen_time_utc=datetime(2018, 11, 12, 3))
+        ]
+
+        # When
+        submission_results = submit_listens(context, listen_inputs)
+
+        # Then
+        assert [type(result.error) for result in submission_results] == [
+            exceptions.SpotifyError,
+            exceptions.InvalidListenInputError,
+            exceptions.SpotifyError
+        ]
+        assert context.db_gateway.listens == []  # type: ignore
+
+    def test_looks_up_each_song_and_sunlight_window_once(self) -> None:
+        # Given
+        context = context_factory()
+        listen_inputs = [listen_input_factory() for _ in range(10)]
+
+        # When
+        submit_listens(context, listen_inputs)
+
+        # Then
+        assert len(context.music_gateway.lookups) == 1  # type: ignore
+        assert len(context.sunlight_gateway.lookups) == 1  # type: ignore
+
+
+class TestSubmitListenAsync:
+
+    def test_adds_and_announces_listens(self) -> None:
+        async def submit_and_get_listen() -> Tuple[AsyncContext, Listen, Listen]:
+            # Given
+            context = async_context_factory()
+
+            # When
+            listen = await submit_listen_async(context, listen_input_factory())
+            return context, listen, await get_listen_async(context, listen.id)
+
+        context, listen, fetched_listen = asyncio.run(submit_and_get_listen())
+
+        # Then
+        assert fetched_listen == listen
+        assert context.notification_gateway.announced_listens == [listen]  # type: ignore
+
+    def test_cancels_the_sunlight_lookup_for_missing_songs(self) -> None:
+        async def submit_listen_of_missing_song() -> AsyncContext:
+            # Given a sunlight lookup that hangs
+            context = async_context_factory()
+            context.sunlight_gateway.released.clear()  # type: ignore
+
+            # When
+            with pytest.raises(exceptions.InvalidSongError):
+                await submit_listen_async(context, listen_input_factory(song_id='missing'))
+            await asyncio.sleep(0)
+            return context
+
+        context = asyncio.run(submit_listen_of_missing_song())
+
+        # Then
+        assert context.sunlight_gateway.cancelled  # type: ignore
+
+
+def context_factory() -> Context:
+    return Context(
+        db_gateway=InMemoryDbGateway(),
+        music_gateway=StubMusicGateway('4rNGLh1y5Kkvr4bT28yfHU'),
+        notification_gateway=StubNotificationGateway(),
+        sunlight_gateway=StubSunlightGateway()
+    )
+
+
+def async_context_factory() -> AsyncContext:
+    return AsyncContext(
+        db_gateway=AsyncInMemoryDbGateway(),
+        music_gateway=AsyncStubMusicGateway('4rNGLh1y5Kkvr4bT28yfHU'),
+        notification_gateway=AsyncStubNotificationGateway(),
+        sunlight_gateway=AsyncStubSunlightGateway()
+    )
+
+
+def listen_input_factory(*,
+                         song_id: str = '4rNGLh1y5Kkvr4bT28yfHU',
+                         listener_name: str = 'geez',
+                         listen_time_utc: datetime = datetime(2018, 11, 12, 15, 30),
+                         iana_timezone: str = 'America/New_York') -> ListenInput:
+    return ListenInput(
+        song_id=song_id,
+        song_provider=MusicProvider.SPOTIFY,
+        listener_name=listener_name,
+        listen_time_utc=listen_time_utc,
+        note=None,
+        iana_timezone=iana_timezone
+    )